@@ -5,7 +5,6 @@ Configuración de conexión a SQL Server
 import os
 from dataclasses import dataclass
 from typing import Optional
-from sqlalchemy import create_engine, text
 from sqlalchemy.engine import Engine
 import logging
 from dotenv import load_dotenv
@@ -62,26 +61,11 @@ class DatabaseConfig:
         return conn_str
     
     def create_engine(self) -> Engine:
-        """Crear engine de SQLAlchemy"""
+        """Obtener el engine compartido del proceso (un único pool por cadena de conexión)"""
+        from .engine_registry import engine_registry
         try:
-            conn_str = self.get_connection_string()
             logger.info(f"🔗 Intentando conectar a: {self.server}/{self.database}")
-            
-            engine = create_engine(
-                conn_str,
-                echo=False,
-                pool_pre_ping=True,
-                pool_recycle=3600,
-                pool_size=int(os.getenv('CONNECTION_POOL_SIZE', '5')),
-                max_overflow=int(os.getenv('CONNECTION_POOL_SIZE', '5')),
-                connect_args={
-                    'timeout': self.connection_timeout,
-                    'command_timeout': self.command_timeout
-                }
-            )
-            # Test connection
-            with engine.connect() as conn:
-                conn.execute(text("SELECT 1"))
+            engine = engine_registry.get_verified_engine(self.get_connection_string(), self.get_connect_args())
             logger.info("✅ Conexión a base de datos establecida correctamente")
             return engine
         except Exception as e:
@@ -89,6 +73,25 @@ class DatabaseConfig:
             # No mostrar la cadena de conexión completa por seguridad
             logger.error(f"🔗 Servidor: {self.server}, Base de datos: {self.database}")
             raise
+    
+    def get_connect_args(self) -> dict:
+        """Argumentos del driver para cada conexión"""
+        return {
+            'timeout': self.connection_timeout,
+            'command_timeout': self.command_timeout
+        }
+
+_db_config: Optional[DatabaseConfig] = None
+
+def get_db_config() -> DatabaseConfig:
+    """Configuración global, leída del entorno en el primer uso"""
+    global _db_config
+    if _db_config is None:
+        _db_config = DatabaseConfig.from_env()
+    return _db_config
 
-# Instancia global
-db_config = DatabaseConfig.from_env()
\ No newline at end of file
+def __getattr__(name):
+    # Compatibilidad: `from config.database import db_config` sin efectos al importar el módulo
+    if name == 'db_config':
+        return get_db_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
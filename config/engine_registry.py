@@ -0,0 +1,144 @@
+"""
+Registro de engines SQLAlchemy compartidos por todo el proceso
+
+Un único pool por cadena de conexión, creado de forma perezosa en el primer uso
+(importar el módulo no conecta ni lee la configuración de base de datos). El
+pool registra métricas de uso: conexiones prestadas, overflow y tiempo de espera
+para obtener una conexión.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool que mide el tiempo de espera de cada checkout"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.checkouts += 1
+                self.total_wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def metrics(self) -> Dict:
+        """Estado actual del pool y métricas acumuladas de espera"""
+        with self._stats_lock:
+            return {
+                'pool_size': self.size(),
+                'checked_out': self.checkedout(),
+                'checked_in': self.checkedin(),
+                'overflow': max(0, self.overflow()),
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'avg_wait_ms': round(self.total_wait_seconds / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                'max_wait_ms': round(self.max_wait_seconds * 1000, 3)
+            }
+
+class EngineRegistry:
+    """Engines creados bajo demanda y compartidos por cadena de conexión"""
+
+    def __init__(self):
+        self.pool_size = int(os.getenv('CONNECTION_POOL_SIZE', '5'))
+        self.max_overflow = int(os.getenv('CONNECTION_POOL_MAX_OVERFLOW', str(self.pool_size)))
+        self.pool_timeout = float(os.getenv('CONNECTION_POOL_TIMEOUT_SECONDS', '30'))
+        self.pool_recycle = int(os.getenv('CONNECTION_POOL_RECYCLE_SECONDS', '3600'))
+        self._engines: Dict[str, Engine] = {}
+        self._verified: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+
+    def get_engine(self, url: str, connect_args: Optional[Dict] = None) -> Engine:
+        """Obtener (o crear una única vez) el engine de la cadena de conexión"""
+        engine = self._engines.get(url)
+        if engine is not None:
+            return engine
+
+        with self._lock:
+            engine = self._engines.get(url)
+            if engine is None:
+                engine = create_engine(
+                    url,
+                    echo=False,
+                    poolclass=InstrumentedQueuePool,
+                    pool_pre_ping=True,
+                    pool_recycle=self.pool_recycle,
+                    pool_size=self.pool_size,
+                    max_overflow=self.max_overflow,
+                    pool_timeout=self.pool_timeout,
+                    connect_args=connect_args or {}
+                )
+                self._engines[url] = engine
+                logger.info(f"🔗 Pool de conexiones creado (tamaño {self.pool_size}, overflow {self.max_overflow})")
+            return engine
+
+    def get_verified_engine(self, url: str, connect_args: Optional[Dict] = None) -> Engine:
+        """Engine compartido con una única prueba SELECT 1 por proceso"""
+        engine = self.get_engine(url, connect_args)
+        if not self._verified.get(url):
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            self._verified[url] = True
+        return engine
+
+    def warm_up(self, url: str, connect_args: Optional[Dict] = None) -> threading.Thread:
+        """Abrir la primera conexión en segundo plano (los errores solo se registran)"""
+        def run():
+            start = time.perf_counter()
+            try:
+                self.get_verified_engine(url, connect_args)
+                logger.info(f"🔥 Conexión precalentada en {time.perf_counter() - start:.2f}s")
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo precalentar la conexión: {e}")
+
+        thread = threading.Thread(target=run, name='db-warm-up', daemon=True)
+        thread.start()
+        return thread
+
+    def metrics(self) -> Dict[str, Dict]:
+        """Métricas de cada pool (la clave omite credenciales)"""
+        return {
+            engine.url.render_as_string(hide_password=True): engine.pool.metrics()
+            for engine in list(self._engines.values())
+            if isinstance(engine.pool, InstrumentedQueuePool)
+        }
+
+    def dispose_all(self):
+        """Cerrar todos los pools"""
+        with self._lock:
+            for engine in self._engines.values():
+                engine.dispose()
+            self._engines.clear()
+            self._verified.clear()
+        logger.info("🔒 Pools de conexiones cerrados")
+
+# Instancia global (sin conexiones hasta el primer uso)
+engine_registry = EngineRegistry()
+
+def get_pool_metrics() -> Dict[str, Dict]:
+    """Métricas de los pools de conexiones del proceso"""
+    return engine_registry.metrics()
@@ -27,6 +27,7 @@ class AppSettings:
     DEFAULT_SLA_TARGET: float = 90.0
     DEFAULT_ANSWER_TIME_SECONDS: int = 20
     DEFAULT_SHRINKAGE_PERCENTAGE: float = 15.0
+    DEFAULT_MEAN_PATIENCE_SECONDS: float = 120.0  # Paciencia media para Erlang A
     MIN_START_TIME: str = "11:45"
     MAX_END_TIME: str = "14:30"
     
@@ -54,7 +55,20 @@ class AppSettings:
             DEFAULT_SLA_TARGET=float(os.getenv('DEFAULT_SLA_TARGET', cls.DEFAULT_SLA_TARGET)),
             DEFAULT_ANSWER_TIME_SECONDS=int(os.getenv('DEFAULT_ANSWER_TIME', cls.DEFAULT_ANSWER_TIME_SECONDS)),
             DEFAULT_SHRINKAGE_PERCENTAGE=float(os.getenv('DEFAULT_SHRINKAGE_PCT', cls.DEFAULT_SHRINKAGE_PERCENTAGE)),
+            DEFAULT_MEAN_PATIENCE_SECONDS=float(os.getenv('DEFAULT_MEAN_PATIENCE_SECONDS', cls.DEFAULT_MEAN_PATIENCE_SECONDS)),
         )
 
-# Instancia global
-settings = AppSettings.from_env()
\ No newline at end of file
+_settings: Optional[AppSettings] = None
+
+def get_settings() -> AppSettings:
+    """Configuración global, leída del entorno en el primer uso"""
+    global _settings
+    if _settings is None:
+        _settings = AppSettings.from_env()
+    return _settings
+
+def __getattr__(name):
+    # Compatibilidad: `from config.settings import settings` sin exigir ACCESS_KEY al importar
+    if name == 'settings':
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
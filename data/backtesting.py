@@ -0,0 +1,329 @@
+"""
+Backtesting con origen móvil de los escenarios de dimensionamiento
+
+_find_best_scenario compara el ASA predicho con el TME del mismo período con el
+que se construyeron los escenarios. Aquí cada escenario se construye con una
+ventana de W días y se evalúa contra los H días siguientes; el origen avanza
+step días y se repite sobre toda la historia:
+
+    [---- ventana W ----][-- H --]
+            [---- ventana W ----][-- H --]
+                    [---- ventana W ----][-- H --]
+
+Las ventanas salen de los resúmenes diarios (data.daily_stats), así que la fuente
+se consulta a lo sumo una vez por día. Los bloques de ventanas se evalúan en un
+ProcessPoolExecutor y la dotación de todas las ventanas y escenarios se calcula
+con una sola llamada a calculate_erlang_c_batch. El informe da la distribución
+del error de cada escenario (volumen, ASA, SLA y agentes frente a los que Erlang C
+hubiera pedido con la demanda real).
+"""
+
+import logging
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Agregar paths
+sys.path.append(str(Path(__file__).parent.parent))
+
+from data.call_aggregates import CallAggregates, CallAggregatesAccumulator
+from data.data_analyzer import SCENARIO_NAMES, scenario_demand
+from engines.erlang_calculator import erlang_calculator
+from engines.forecaster import seasonal_forecaster
+
+logger = logging.getLogger(__name__)
+
+# Escenario adicional: pronóstico estacional (engines.forecaster) para los días evaluados
+FORECAST_SCENARIO = 'pronostico'
+BACKTEST_SCENARIOS = SCENARIO_NAMES + [FORECAST_SCENARIO]
+
+# Métricas de error por fila del backtest (predicho - real)
+ERROR_METRICS = ['error_volumen_pct', 'error_asa', 'error_sla', 'error_agentes']
+
+def rolling_origins(num_days: int, window_days: int, horizon_days: int, step_days: int) -> List[int]:
+    """Índices de día de cada origen: ventana [origen - W, origen), evaluación [origen, origen + H)"""
+    if min(window_days, horizon_days, step_days) < 1:
+        raise ValueError("window_days, horizon_days y step_days deben ser al menos 1")
+    return list(range(window_days, num_days - horizon_days + 1, step_days))
+
+@contextmanager
+def _quiet_loggers(*names: str):
+    """Subir a WARNING los logs por ventana (análisis histórico, pronóstico, Erlang por lote)"""
+    loggers = [logging.getLogger(name) for name in names]
+    levels = [log.level for log in loggers]
+    for log in loggers:
+        log.setLevel(logging.WARNING)
+    try:
+        yield
+    finally:
+        for log, level in zip(loggers, levels):
+            log.setLevel(level)
+
+def _hourly_volume(calls: np.ndarray, interval_minutes: int) -> float:
+    """Llamadas por hora promedio en las horas con tráfico de los días operativos (como avg_calls_per_hour)"""
+    calls = calls[calls.sum(axis=1) > 0]
+    if len(calls) == 0:
+        return 0.0
+    per_hour = calls.reshape(calls.shape[0], 24, -1).sum(axis=2).mean(axis=0)
+    operating = per_hour > 0
+    return float(per_hour[operating].mean()) if operating.any() else 0.0
+
+def _forecast_demand(train: CallAggregates, origin_date: date, horizon_days: int) -> Tuple[float, float]:
+    """Llamadas por hora y TMO del pronóstico estacional para los días evaluados (desde origin_date)"""
+    # La ventana termina el día anterior al origen aunque sus últimos días no tengan llamadas
+    forecast = seasonal_forecaster.fit_matrix(train.matrix, math.ceil(horizon_days / 7),
+                                              last_day=origin_date - timedelta(days=1))
+    calls = forecast.calls[0, :horizon_days]
+    total = calls.sum()
+    aht = float((calls * forecast.aht[0, :horizon_days]).sum() / total) if total > 0 else train.matrix.average_aht()
+    return _hourly_volume(calls, forecast.interval_minutes), aht
+
+def _actual_demand(test: CallAggregates) -> Dict[str, float]:
+    """Demanda y desempeño reales de los días evaluados"""
+    tmo_mean, _ = test.tmo_mean_std()
+    tme_mean, _ = test.tme_mean_std()
+    return {
+        'llamadas_hora': _hourly_volume(test.matrix.calls, test.matrix.interval_minutes),
+        'tmo': tmo_mean,
+        'tme': tme_mean,
+        'sla': test.answered_in_target() / test.total_calls * 100,
+        'agentes_dia': float(test.agents_per_day.mean()) if len(test.agents_per_day) else 0.0
+    }
+
+def _evaluate_windows(days: List[CallAggregatesAccumulator], origins: List[int],
+                      window_days: int, horizon_days: int, first_date: date) -> List[Dict]:
+    """
+    Demanda de cada escenario (con la ventana) y demanda real (días siguientes) por origen
+
+    Se ejecuta en un proceso aparte con los resúmenes diarios que cubren sus orígenes
+    (los índices de origins son relativos a days, cuyo primer día es first_date). Omite
+    orígenes sin llamadas en la ventana o en los días evaluados.
+    """
+    windows = []
+    with _quiet_loggers('engines.erlang_calculator', 'engines.forecaster'):
+        for origin in origins:
+            # Sin t-digest: los escenarios no usan percentiles por intervalo
+            train = CallAggregatesAccumulator.combine(days[origin - window_days:origin], sketches=False).result()
+            test = CallAggregatesAccumulator.combine(days[origin:origin + horizon_days], sketches=False).result()
+            if train.total_calls == 0 or test.total_calls == 0:
+                continue
+
+            demand = scenario_demand(erlang_calculator.analyze_historical_aggregates(train))
+            demand[FORECAST_SCENARIO] = _forecast_demand(train, first_date + timedelta(days=origin), horizon_days)
+            windows.append({
+                'origin': origin,
+                'demand': demand,
+                'actual': _actual_demand(test)
+            })
+    return windows
+
+@dataclass
+class BacktestResults:
+    """Una fila por (origen, escenario) con lo predicho, lo real y el error"""
+    records: pd.DataFrame
+    window_days: int
+    horizon_days: int
+    step_days: int
+    wall_time_seconds: float
+
+    @property
+    def windows(self) -> int:
+        return int(self.records['origen'].nunique()) if len(self.records) else 0
+
+    def summary(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """
+        Distribución del error de cada escenario: promedio (sesgo), error absoluto medio
+        y percentiles 10/50/90 de cada métrica; además el % de orígenes en que los agentes
+        predichos cubrieron los que Erlang C pedía con la demanda real
+        """
+        summary = {}
+        for scenario, rows in self.records.groupby('escenario', sort=False):
+            summary[scenario] = {
+                metric: {
+                    'sesgo': round(float(rows[metric].mean()), 2),
+                    'mae': round(float(rows[metric].abs().mean()), 2),
+                    'p10': round(float(rows[metric].quantile(0.10)), 2),
+                    'p50': round(float(rows[metric].quantile(0.50)), 2),
+                    'p90': round(float(rows[metric].quantile(0.90)), 2)
+                }
+                for metric in ERROR_METRICS
+            }
+            summary[scenario]['cubre_demanda_pct'] = round(float((rows['error_agentes'] >= 0).mean() * 100), 1)
+        return summary
+
+    def best_scenario(self, metric: str = 'error_agentes') -> Optional[str]:
+        """Escenario con menor error absoluto medio en la métrica (por defecto agentes)"""
+        if not len(self.records):
+            return None
+        return str(self.records[metric].abs().groupby(self.records['escenario']).mean().idxmin())
+
+    def to_dict(self) -> Dict:
+        return {
+            'window_days': self.window_days,
+            'horizon_days': self.horizon_days,
+            'step_days': self.step_days,
+            'windows': self.windows,
+            'summary': self.summary(),
+            'best_scenario': {
+                'agentes': self.best_scenario('error_agentes'),
+                'asa': self.best_scenario('error_asa'),
+                'volumen': self.best_scenario('error_volumen_pct')
+            },
+            'wall_time_seconds': round(self.wall_time_seconds, 3)
+        }
+
+class Backtester:
+    """Evaluación de escenarios con origen móvil sobre los resúmenes diarios"""
+
+    def __init__(self, data_source=None, window_days: Optional[int] = None,
+                 horizon_days: Optional[int] = None, step_days: Optional[int] = None,
+                 max_workers: Optional[int] = None):
+        if data_source is None:
+            from data.data_sources import get_data_source
+            data_source = get_data_source()
+        self.data_source = data_source
+        self.window_days = window_days or int(os.getenv('BACKTEST_WINDOW_DAYS', '28'))
+        self.horizon_days = horizon_days or int(os.getenv('BACKTEST_HORIZON_DAYS', '7'))
+        self.step_days = step_days or int(os.getenv('BACKTEST_STEP_DAYS', '7'))
+        self.max_workers = max_workers or int(os.getenv('BACKTEST_MAX_WORKERS', str(os.cpu_count() or 1)))
+
+    def _map_windows(self, days: List[CallAggregatesAccumulator], origins: List[int],
+                     start_date: date) -> List[Dict]:
+        """Repartir los orígenes en bloques contiguos; cada proceso recibe solo los días de su bloque"""
+        workers = min(self.max_workers, len(origins))
+        if workers <= 1:
+            return _evaluate_windows(days, origins, self.window_days, self.horizon_days, start_date)
+
+        tasks = []
+        for block in np.array_split(np.asarray(origins), workers):
+            first_day = int(block[0]) - self.window_days
+            last_day = int(block[-1]) + self.horizon_days
+            tasks.append((days[first_day:last_day], [int(origin) - first_day for origin in block], first_day))
+
+        windows = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_evaluate_windows, block_days, block_origins,
+                                       self.window_days, self.horizon_days,
+                                       start_date + timedelta(days=first_day))
+                       for block_days, block_origins, first_day in tasks]
+            for future, (_, _, first_day) in zip(futures, tasks):
+                for window in future.result():
+                    window['origin'] += first_day
+                    windows.append(window)
+        return windows
+
+    def run(self, start_date: date, end_date: date, sla_target: float = 0.90,
+            answer_time_target: int = 20, shrinkage_pct: float = 15.0, store=None) -> BacktestResults:
+        """
+        Evaluar los escenarios en todos los orígenes del rango
+
+        Args:
+            start_date: Primer día de historia
+            end_date: Último día de historia (el último origen deja H días para evaluar)
+            sla_target: Objetivo SLA (0.90 = 90%)
+            answer_time_target: Tiempo de respuesta objetivo en segundos
+            shrinkage_pct: Porcentaje de shrinkage
+            store: DailyStatsStore con los resúmenes diarios (por defecto data.daily_stats.daily_stats)
+        """
+        if store is None:
+            from data.daily_stats import daily_stats as store
+
+        start = time.perf_counter()
+        days = store.ensure(self.data_source, start_date, end_date, answer_time_target)
+        origins = rolling_origins(len(days), self.window_days, self.horizon_days, self.step_days)
+        if not origins:
+            raise ValueError(f"El rango necesita al menos {self.window_days + self.horizon_days} días "
+                             f"(ventana de {self.window_days} + evaluación de {self.horizon_days})")
+
+        windows = self._map_windows(days, origins, start_date)
+        if not windows:
+            raise ValueError("Ningún origen tiene llamadas en la ventana y en los días evaluados")
+
+        # Una sola llamada Erlang C: (orígenes x escenarios) + la demanda real de cada origen
+        demand = np.array([[window['demand'][name] for name in BACKTEST_SCENARIOS] for window in windows])
+        actual = pd.DataFrame([window['actual'] for window in windows])
+        calls = np.column_stack([demand[:, :, 0], actual['llamadas_hora']])
+        aht = np.column_stack([demand[:, :, 1], actual['tmo']])
+        with _quiet_loggers('engines.erlang_calculator'):
+            batch = erlang_calculator.calculate_erlang_c_batch(
+                calls, aht, sla_target, answer_time_target, shrinkage_pct, use_cache=False
+            )
+        needed_agents = batch.agents_required[:, -1]
+
+        origin_dates = [start_date + timedelta(days=window['origin']) for window in windows]
+        records = []
+        for index, scenario in enumerate(BACKTEST_SCENARIOS):
+            predicted_calls = demand[:, index, 0]
+            records.append(pd.DataFrame({
+                'origen': origin_dates,
+                'escenario': scenario,
+                'llamadas_hora_predichas': predicted_calls,
+                'llamadas_hora_reales': actual['llamadas_hora'],
+                'error_volumen_pct': (predicted_calls - actual['llamadas_hora']) / actual['llamadas_hora'] * 100,
+                'asa_predicho': batch.average_wait_time[:, index],
+                'tme_real': actual['tme'],
+                'error_asa': batch.average_wait_time[:, index] - actual['tme'],
+                'sla_predicho': batch.service_level[:, index] * 100,
+                'sla_real': actual['sla'],
+                'error_sla': batch.service_level[:, index] * 100 - actual['sla'],
+                'agentes_predichos': batch.agents_required[:, index],
+                'agentes_necesarios': needed_agents,
+                'error_agentes': batch.agents_required[:, index] - needed_agents,
+                'agentes_reales_dia': actual['agentes_dia']
+            }))
+
+        results = BacktestResults(
+            records=pd.concat(records, ignore_index=True),
+            window_days=self.window_days,
+            horizon_days=self.horizon_days,
+            step_days=self.step_days,
+            wall_time_seconds=time.perf_counter() - start
+        )
+        logger.info(f"🔁 Backtest: {results.windows} orígenes x {len(BACKTEST_SCENARIOS)} escenarios "
+                    f"(ventana {self.window_days}d, evaluación {self.horizon_days}d) en "
+                    f"{results.wall_time_seconds:.2f}s; mejor por agentes: {results.best_scenario()}")
+        return results
+
+def benchmark_backtest(data_source, start_date: date, end_date: date,
+                       worker_counts: Tuple[int, ...] = (1, 2, 4), **options) -> Dict[int, Dict]:
+    """
+    Tiempo del backtest según la cantidad de procesos (resúmenes diarios ya calculados)
+
+    Returns:
+        Dict por cantidad de procesos con orígenes evaluados, segundos y orígenes/s
+    """
+    import tempfile
+    from data.daily_stats import DailyStatsStore
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        store = DailyStatsStore(directory)
+        store.ensure(data_source, start_date, end_date, options.get('answer_time_target', 20))
+        for workers in worker_counts:
+            backtest = Backtester(data_source, max_workers=workers).run(start_date, end_date, store=store, **options)
+            results[workers] = {
+                'windows': backtest.windows,
+                'seconds': round(backtest.wall_time_seconds, 3),
+                'windows_per_second': round(backtest.windows / backtest.wall_time_seconds, 1)
+            }
+            logger.info(f"⏱️ Backtest con {workers} procesos: {results[workers]}")
+    return results
+
+if __name__ == "__main__":
+    from data.data_sources import get_data_source
+    logging.basicConfig(level=logging.INFO)
+    source = get_data_source(os.getenv('BENCHMARK_DATA_SOURCE', 'sqlite'))
+    available = source.get_available_date_range()
+    print(benchmark_backtest(
+        source, pd.to_datetime(available['fecha_min']).date(), pd.to_datetime(available['fecha_max']).date()
+    ))
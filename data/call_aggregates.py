@@ -0,0 +1,431 @@
+"""
+Agregados de llamadas para el análisis histórico
+
+Todo lo que DataAnalyzer necesita (volúmenes, medias y desviaciones de TMO/TME,
+asesores distintos, SLA real y percentiles) se puede obtener de:
+
+- La matriz (día x intervalo de 15 min) con conteos y sumas/sumas de cuadrados.
+- Asesores distintos por día, por hora del día y en todo el período.
+- Histogramas de TMO y TME en segundos enteros (percentiles exactos del período).
+- t-digest de TMO y TME por intervalo del día (percentiles por intervalo u hora,
+  ver data.quantile_sketch); no disponibles para el GROUP BY en SQL Server.
+
+Los agregados se construyen desde filas crudas (DataFrame) o desde el GROUP BY
+que SQLConnector.get_interval_aggregates ejecuta en SQL Server, de modo que el
+análisis no depende de traer cada llamada ni del límite MAX_RECORDS_PER_QUERY.
+"""
+
+import logging
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Agregar paths
+sys.path.append(str(Path(__file__).parent.parent))
+
+from data.call_frame import CallFeatures
+from data.demand_matrix import DemandMatrix
+from data.quantile_sketch import GroupedTDigest
+
+logger = logging.getLogger(__name__)
+
+# Los histogramas agrupan en segundos enteros; el último bin acumula las duraciones mayores
+HISTOGRAM_MAX_SECONDS = 7200
+
+# Sumas por celda de DemandMatrix que un acumulador guarda en disco
+MATRIX_FIELDS = ('calls', 'aht_sum', 'aht_sq_sum', 'wait_sum', 'wait_sq_sum', 'answered_in_target')
+
+def duration_histogram(values: np.ndarray, max_seconds: int = HISTOGRAM_MAX_SECONDS) -> np.ndarray:
+    """Conteo de duraciones por segundo entero (bin i = [i, i+1), el último incluye el resto)"""
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    bins = np.clip(np.floor(values), 0, max_seconds).astype(np.int64)
+    return np.bincount(bins, minlength=max_seconds + 1)
+
+def histogram_percentile(histogram: np.ndarray, q: float) -> float:
+    """
+    Percentil q (0-100) de un histograma por segundo con la interpolación lineal de np.percentile
+
+    Exacto cuando las duraciones son segundos enteros (como en la tabla de origen).
+    """
+    total = int(histogram.sum())
+    if total == 0:
+        return float('nan')
+    position = q / 100 * (total - 1)
+    cumulative = np.cumsum(histogram)
+    lower_rank, upper_rank = int(np.floor(position)), int(np.ceil(position))
+    lower = float(np.searchsorted(cumulative, lower_rank, side='right'))
+    upper = float(np.searchsorted(cumulative, upper_rank, side='right'))
+    return lower + (upper - lower) * (position - lower_rank)
+
+def interval_sketch(features: CallFeatures, values: Optional[np.ndarray]) -> Optional[GroupedTDigest]:
+    """t-digest por intervalo del día de una duración (None si la columna no existe)"""
+    if values is None:
+        return None
+    return GroupedTDigest.from_values(features.flat_index % features.intervals_per_day, values,
+                                      features.intervals_per_day)
+
+def merge_sketches(sketches: List[Optional[GroupedTDigest]]) -> Optional[GroupedTDigest]:
+    """Combinar t-digest de bloques o días; None si alguno falta"""
+    if not sketches or any(sketch is None for sketch in sketches):
+        return None
+    return GroupedTDigest.merge_all(sketches)
+
+@dataclass
+class CallAggregates:
+    """Agregados suficientes para el análisis completo de una campaña"""
+    matrix: DemandMatrix                 # Conteos y sumas por (día, intervalo de 15 min)
+    agents_per_day: pd.Series            # Asesores distintos por fecha (solo días con llamadas)
+    agents_per_hour: np.ndarray          # Asesores distintos por hora del día en todo el período (24)
+    unique_agents: int                   # Asesores distintos en todo el período
+    tmo_histogram: np.ndarray            # Conteo de TMO por segundo
+    tme_histogram: np.ndarray            # Conteo de TME por segundo
+    answer_time_target: int = 20         # Objetivo usado para contar atendidas en objetivo
+    source: str = 'raw'                  # 'raw' (filas), 'sql' (GROUP BY en el servidor) o 'stream' (bloques)
+    tmo_sketch: Optional[GroupedTDigest] = None  # t-digest de TMO por intervalo del día
+    tme_sketch: Optional[GroupedTDigest] = None  # t-digest de TME por intervalo del día
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, answer_time_target: int = 20) -> 'CallAggregates':
+        """Construir los agregados desde filas crudas (fecha, asesor, hora_inicio_contrata, tme, tmo)"""
+        return cls.from_features(CallFeatures.from_dataframe(df), answer_time_target)
+
+    @classmethod
+    def from_features(cls, features: CallFeatures, answer_time_target: int = 20) -> 'CallAggregates':
+        """
+        Todos los agregados desde un único CallFeatures
+
+        Las marcas de tiempo se parsean y los asesores se factorizan una sola vez;
+        conteos y sumas salen de np.bincount y los asesores distintos de todos los
+        niveles (celda, día, hora, total) de un mismo mapa de presencia.
+        """
+        matrix = DemandMatrix.from_features(features, answer_time_target)
+        if matrix.num_days:
+            agents = features.distinct_agents()
+            matrix.agents = agents['cells']
+            has_calls = matrix.calls.sum(axis=1) > 0
+            agents_per_day = pd.Series(agents['days'][has_calls].astype(np.int64),
+                                       index=pd.to_datetime(matrix.dates[has_calls]))
+            agents_per_hour, unique_agents = agents['hours'].astype(np.int64), agents['total']
+        else:
+            agents_per_day = pd.Series([], index=pd.DatetimeIndex([]), dtype=np.int64)
+            agents_per_hour, unique_agents = np.zeros(24, dtype=np.int64), 0
+
+        return cls(
+            matrix=matrix,
+            agents_per_day=agents_per_day,
+            agents_per_hour=agents_per_hour,
+            unique_agents=unique_agents,
+            tmo_histogram=duration_histogram(features.tmo),
+            tme_histogram=duration_histogram(features.tme),
+            answer_time_target=answer_time_target,
+            source='raw',
+            tmo_sketch=interval_sketch(features, features.tmo),
+            tme_sketch=interval_sketch(features, features.tme)
+        )
+
+    @classmethod
+    def from_sql_frames(cls, frames: Dict[str, pd.DataFrame], answer_time_target: int = 20) -> 'CallAggregates':
+        """
+        Construir los agregados desde el resultado de SQLConnector.get_interval_aggregates
+
+        Args:
+            frames: {'intervals', 'days', 'hours', 'total', 'histograms'} (ver SQLConnector)
+        """
+        histograms = frames['histograms']
+
+        def histogram_for(metric: str) -> np.ndarray:
+            rows = histograms[histograms['metrica'] == metric]
+            histogram = np.zeros(HISTOGRAM_MAX_SECONDS + 1, dtype=np.int64)
+            np.add.at(histogram, np.clip(rows['segundos'].to_numpy(dtype=np.int64), 0, HISTOGRAM_MAX_SECONDS),
+                      rows['llamadas'].to_numpy(dtype=np.int64))
+            return histogram
+
+        days, hours = frames['days'], frames['hours']
+        agents_per_hour = np.zeros(24, dtype=np.int64)
+        agents_per_hour[hours['hora'].to_numpy(dtype=np.int64)] = hours['asesores'].to_numpy(dtype=np.int64)
+
+        return cls(
+            matrix=DemandMatrix.from_interval_frame(frames['intervals']),
+            agents_per_day=pd.Series(days['asesores'].to_numpy(dtype=np.int64),
+                                     index=pd.to_datetime(days['dia'])).sort_index(),
+            agents_per_hour=agents_per_hour,
+            unique_agents=int(frames['total']['asesores'].iloc[0]) if len(frames['total']) else 0,
+            tmo_histogram=histogram_for('tmo'),
+            tme_histogram=histogram_for('tme'),
+            answer_time_target=answer_time_target,
+            source='sql'
+        )
+
+    @property
+    def total_calls(self) -> int:
+        return int(self.matrix.calls.sum())
+
+    @staticmethod
+    def _mean_std(total_calls: int, values_sum: float, values_sq_sum: float):
+        """Media y desviación estándar muestral desde sumas"""
+        if total_calls == 0:
+            return 0.0, 0.0
+        mean = values_sum / total_calls
+        if total_calls < 2:
+            return mean, 0.0
+        variance = (values_sq_sum - values_sum ** 2 / total_calls) / (total_calls - 1)
+        return mean, float(np.sqrt(max(variance, 0.0)))
+
+    def tmo_mean_std(self):
+        """(TMO promedio, desviación estándar) de todo el período"""
+        return self._mean_std(self.total_calls, float(self.matrix.aht_sum.sum()), float(self.matrix.aht_sq_sum.sum()))
+
+    def tme_mean_std(self):
+        """(TME promedio, desviación estándar) de todo el período"""
+        return self._mean_std(self.total_calls, float(self.matrix.wait_sum.sum()), float(self.matrix.wait_sq_sum.sum()))
+
+    def tmo_percentile(self, q: float) -> float:
+        return histogram_percentile(self.tmo_histogram, q)
+
+    def tme_percentile(self, q: float) -> float:
+        return histogram_percentile(self.tme_histogram, q)
+
+    def answered_in_target(self) -> int:
+        """Llamadas con TME <= answer_time_target"""
+        return int(self.matrix.answered_in_target.sum())
+
+    def interval_percentile(self, metric: str, q: float, minutes: Optional[int] = None) -> Optional[np.ndarray]:
+        """
+        Percentil q (0-100) de 'tmo' o 'tme' en cada intervalo del día, desde los t-digest
+
+        Args:
+            minutes: Granularidad (p.ej. 60 para horas); por defecto la de la matriz
+
+        Returns:
+            Un valor por intervalo (NaN sin llamadas), o None si los agregados no tienen sketches
+        """
+        sketch = self.tmo_sketch if metric == 'tmo' else self.tme_sketch
+        if sketch is None:
+            return None
+        factor = (minutes or self.matrix.interval_minutes) // self.matrix.interval_minutes
+        if factor > 1:
+            sketch = sketch.regroup(np.arange(sketch.groups) // factor, sketch.groups // factor)
+        return sketch.percentile(q)
+
+class CallAggregatesAccumulator:
+    """
+    Acumulador mergeable de CallAggregates para plegar bloques de filas crudas
+
+    Cada bloque se suma a la matriz y a los histogramas y luego puede descartarse.
+    Los asesores distintos no son sumables, así que se guarda un mapa de bits
+    (intervalo x asesor) por día: la memoria crece con los pares asesor-intervalo
+    distintos, no con la cantidad de filas. Dos acumuladores (p.ej. de rangos de
+    fechas distintos) se combinan con merge().
+    """
+
+    def __init__(self, answer_time_target: int = 20, interval_minutes: int = 15):
+        self.answer_time_target = answer_time_target
+        self.interval_minutes = interval_minutes
+        self.matrix = DemandMatrix.empty(interval_minutes)
+        self.tmo_histogram = np.zeros(HISTOGRAM_MAX_SECONDS + 1, dtype=np.int64)
+        self.tme_histogram = np.zeros(HISTOGRAM_MAX_SECONDS + 1, dtype=np.int64)
+        self.tmo_sketch: Optional[GroupedTDigest] = GroupedTDigest(self.intervals_per_day)
+        self.tme_sketch: Optional[GroupedTDigest] = GroupedTDigest(self.intervals_per_day)
+        self.rows = 0
+        self.chunks = 0
+        self._agent_labels = pd.Index([])
+        self._agent_bitmaps: Dict[np.datetime64, np.ndarray] = {}
+
+    @property
+    def intervals_per_day(self) -> int:
+        return 24 * 60 // self.interval_minutes
+
+    def _agent_codes(self, labels: np.ndarray) -> np.ndarray:
+        """Código estable de cada asesor (los nuevos se agregan al final)"""
+        codes = self._agent_labels.get_indexer(labels)
+        if (codes < 0).any():
+            new_labels = pd.unique(labels[codes < 0])
+            self._agent_labels = self._agent_labels.append(pd.Index(new_labels))
+            codes = self._agent_labels.get_indexer(labels)
+        return codes
+
+    def _day_bitmap(self, day: np.datetime64) -> np.ndarray:
+        """Mapa de bits del día con columnas para todos los asesores conocidos"""
+        bitmap = self._agent_bitmaps.get(day)
+        agents = len(self._agent_labels)
+        if bitmap is None:
+            bitmap = np.zeros((self.intervals_per_day, agents), dtype=bool)
+        elif bitmap.shape[1] < agents:
+            bitmap = np.pad(bitmap, ((0, 0), (0, agents - bitmap.shape[1])))
+        self._agent_bitmaps[day] = bitmap
+        return bitmap
+
+    def add(self, df: pd.DataFrame) -> 'CallAggregatesAccumulator':
+        """Plegar un bloque de filas (fecha, asesor, hora_inicio_contrata, tme, tmo)"""
+        if len(df) == 0:
+            return self
+
+        # Marcas de tiempo y asesores se procesan una sola vez para matriz, histogramas y mapas de bits
+        features = CallFeatures.from_dataframe(df, self.interval_minutes)
+        self.matrix = self.matrix.merge(DemandMatrix.from_features(features, self.answer_time_target))
+        self.tmo_histogram += duration_histogram(features.tmo)
+        self.tme_histogram += duration_histogram(features.tme)
+        if self.tmo_sketch is not None and self.tme_sketch is not None:
+            slots_of_day = features.flat_index % self.intervals_per_day
+            self.tmo_sketch.add(slots_of_day, features.tmo)
+            self.tme_sketch.add(slots_of_day, features.tme)
+
+        # Resolver solo los asesores distintos del bloque y expandir con sus códigos
+        known = features.agent_codes >= 0
+        codes = self._agent_codes(features.agent_labels)[features.agent_codes[known]]
+        day_index, slots = np.divmod(features.flat_index[known], self.intervals_per_day)
+
+        for offset in np.unique(day_index):
+            in_day = day_index == offset
+            self._day_bitmap(features.first_day + offset)[slots[in_day], codes[in_day]] = True
+
+        self.rows += len(df)
+        self.chunks += 1
+        return self
+
+    def merge(self, other: 'CallAggregatesAccumulator') -> 'CallAggregatesAccumulator':
+        """Combinar con otro acumulador (mismo objetivo de respuesta)"""
+        self.matrix = self.matrix.merge(other.matrix)
+        self.tmo_histogram += other.tmo_histogram
+        self.tme_histogram += other.tme_histogram
+        self.tmo_sketch = merge_sketches([self.tmo_sketch, other.tmo_sketch])
+        self.tme_sketch = merge_sketches([self.tme_sketch, other.tme_sketch])
+
+        codes = self._agent_codes(other._agent_labels.to_numpy())
+        for day, other_bitmap in other._agent_bitmaps.items():
+            self._day_bitmap(day)[:, codes[:other_bitmap.shape[1]]] |= other_bitmap
+
+        self.rows += other.rows
+        self.chunks += other.chunks
+        return self
+
+    @classmethod
+    def combine(cls, accumulators: List['CallAggregatesAccumulator'],
+                sketches: bool = True) -> 'CallAggregatesAccumulator':
+        """
+        Combinar muchos acumuladores de una vez (p.ej. los resúmenes diarios de un rango)
+
+        La matriz se arma con una sola asignación y los mapas de bits se alinean a la
+        unión de asesores: el costo es proporcional a días x asesores, no a llamadas.
+        Con sketches=False no se combinan los t-digest (sin percentiles por intervalo).
+        """
+        accumulators = list(accumulators)
+        if not accumulators:
+            return cls()
+        first = accumulators[0]
+        combined = cls(first.answer_time_target, first.interval_minutes)
+        combined.matrix = DemandMatrix.merge_all([accumulator.matrix for accumulator in accumulators],
+                                                 first.interval_minutes)
+        combined._agent_labels = pd.Index([]).append(
+            [accumulator._agent_labels for accumulator in accumulators]
+        ).unique()
+        agents = len(combined._agent_labels)
+        if sketches:
+            combined.tmo_sketch = merge_sketches([accumulator.tmo_sketch for accumulator in accumulators])
+            combined.tme_sketch = merge_sketches([accumulator.tme_sketch for accumulator in accumulators])
+        else:
+            combined.tmo_sketch = combined.tme_sketch = None
+
+        for accumulator in accumulators:
+            combined.tmo_histogram += accumulator.tmo_histogram
+            combined.tme_histogram += accumulator.tme_histogram
+            combined.rows += accumulator.rows
+            combined.chunks += accumulator.chunks
+            codes = combined._agent_labels.get_indexer(accumulator._agent_labels)
+            for day, bitmap in accumulator._agent_bitmaps.items():
+                target = combined._agent_bitmaps.get(day)
+                if target is None:
+                    target = combined._agent_bitmaps[day] = np.zeros((combined.intervals_per_day, agents), dtype=bool)
+                target[:, codes[:bitmap.shape[1]]] |= bitmap
+        return combined
+
+    def save(self, path: Path):
+        """Guardar el acumulador en un .npz comprimido (escritura atómica)"""
+        days = sorted(self._agent_bitmaps)
+        matrix = self.matrix
+        arrays = {
+            'answer_time_target': np.asarray(self.answer_time_target),
+            'interval_minutes': np.asarray(self.interval_minutes),
+            'rows': np.asarray(self.rows),
+            'dates': matrix.dates.astype('datetime64[D]'),
+            'tmo_histogram': self.tmo_histogram,
+            'tme_histogram': self.tme_histogram,
+            'agent_labels': np.asarray(self._agent_labels, dtype=str),
+            'bitmap_days': np.array(days, dtype='datetime64[D]'),
+            'bitmaps': np.stack([self._day_bitmap(day) for day in days]) if days
+                       else np.zeros((0, self.intervals_per_day, len(self._agent_labels)), dtype=bool)
+        }
+        for field in MATRIX_FIELDS:
+            if getattr(matrix, field) is not None:
+                arrays[field] = getattr(matrix, field)
+        for name, sketch in (('tmo_sketch', self.tmo_sketch), ('tme_sketch', self.tme_sketch)):
+            if sketch is not None:
+                arrays.update(sketch.to_arrays(name))
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f".{path.name}.tmp")
+        with open(temp_path, 'wb') as file:
+            np.savez_compressed(file, **arrays)
+        temp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> 'CallAggregatesAccumulator':
+        """Leer un acumulador guardado con save()"""
+        with np.load(path, allow_pickle=False) as data:
+            accumulator = cls(int(data['answer_time_target']), int(data['interval_minutes']))
+            accumulator.rows = int(data['rows'])
+            if data['dates'].size:
+                accumulator.matrix = DemandMatrix(
+                    dates=data['dates'], interval_minutes=accumulator.interval_minutes,
+                    **{field: data[field] if field in data.files else None for field in MATRIX_FIELDS}
+                )
+            accumulator.tmo_histogram = data['tmo_histogram'].astype(np.int64)
+            accumulator.tme_histogram = data['tme_histogram'].astype(np.int64)
+            # Resúmenes guardados antes de los t-digest no los tienen: los combinados quedan sin sketches
+            accumulator.tmo_sketch = GroupedTDigest.from_arrays(data, 'tmo_sketch')
+            accumulator.tme_sketch = GroupedTDigest.from_arrays(data, 'tme_sketch')
+            accumulator._agent_labels = pd.Index(data['agent_labels'])
+            accumulator._agent_bitmaps = dict(zip(data['bitmap_days'], data['bitmaps']))
+        return accumulator
+
+    def result(self) -> CallAggregates:
+        """Agregados finales del período"""
+        matrix = self.matrix
+        agents = len(self._agent_labels)
+        days = sorted(self._agent_bitmaps)
+        bitmaps = [self._day_bitmap(day) for day in days]
+
+        if matrix.num_days:
+            matrix.agents = np.zeros_like(matrix.calls)
+            for day, bitmap in zip(days, bitmaps):
+                matrix.agents[int((day - matrix.dates[0]).astype(int))] = bitmap.sum(axis=1)
+
+        slots_per_hour = self.intervals_per_day // 24
+        by_hour = np.zeros((24, agents), dtype=bool)
+        for bitmap in bitmaps:
+            by_hour |= bitmap.reshape(24, slots_per_hour, agents).any(axis=1)
+
+        return CallAggregates(
+            matrix=matrix,
+            agents_per_day=pd.Series([int(bitmap.any(axis=0).sum()) for bitmap in bitmaps],
+                                     index=pd.to_datetime(np.array(days, dtype='datetime64[D]')), dtype=np.int64),
+            agents_per_hour=by_hour.sum(axis=1),
+            unique_agents=int(by_hour.any(axis=0).sum()),
+            tmo_histogram=self.tmo_histogram.copy(),
+            tme_histogram=self.tme_histogram.copy(),
+            answer_time_target=self.answer_time_target,
+            source='stream',
+            tmo_sketch=self.tmo_sketch,
+            tme_sketch=self.tme_sketch
+        )
+
+    def memory_bytes(self) -> int:
+        """Memoria retenida por el acumulador (independiente de las filas ya plegadas)"""
+        return (self.matrix.memory_bytes() + self.tmo_histogram.nbytes + self.tme_histogram.nbytes
+                + sum(bitmap.nbytes for bitmap in self._agent_bitmaps.values()))
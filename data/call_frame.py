@@ -0,0 +1,249 @@
+"""
+Esquema compacto del DataFrame de llamadas
+
+Las filas se cargan una sola vez con tipos explícitos:
+
+- fecha y hora_inicio_contrata como datetime64 (se parsean solo aquí)
+- asesor como categórico (un código por fila en lugar de un objeto Python)
+- tmo y tme como int32 si son enteros sin nulos, si no float32
+- intervalo: código int8 del intervalo de 15 minutos del día (0-95, -1 si no hay hora)
+
+Las consultas multi-mes ocupan así una fracción de la memoria del DataFrame
+devuelto por el driver (ver benchmark_call_frame_memory).
+
+CallFeatures deriva de esas filas, una sola vez, las columnas que necesitan todos
+los agregados (celda día x intervalo, código de asesor, TMO/TME como float64), para
+que matriz, histogramas y asesores distintos salgan de la misma pasada.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+logger = logging.getLogger(__name__)
+
+CALL_FRAME_INTERVAL_MINUTES = 15
+
+def _compact_duration(values: pd.Series) -> pd.Series:
+    """Segundos como int32 si todos son enteros representables, si no float32"""
+    numeric = pd.to_numeric(values, errors='coerce')
+    array = numeric.to_numpy(dtype=np.float64)
+    if (not np.isnan(array).any() and np.array_equal(array, np.round(array))
+            and (array.size == 0 or np.abs(array).max() <= np.iinfo(np.int32).max)):
+        return pd.Series(array.astype(np.int32), index=values.index, name=values.name)
+    return pd.Series(array.astype(np.float32), index=values.index, name=values.name)
+
+def datetime_values(values: pd.Series) -> np.ndarray:
+    """Marcas de tiempo como datetime64[ns], sin volver a parsear columnas que ya son datetime"""
+    if pd.api.types.is_datetime64_dtype(values):
+        return values.to_numpy(dtype='datetime64[ns]')
+    return pd.to_datetime(values).to_numpy(dtype='datetime64[ns]')
+
+def interval_codes(timestamps: pd.Series, interval_minutes: int = CALL_FRAME_INTERVAL_MINUTES) -> np.ndarray:
+    """Código int8 del intervalo del día para cada marca de tiempo (-1 si es NaT)"""
+    values = timestamps.to_numpy(dtype='datetime64[ns]')
+    valid = ~np.isnat(values)
+    minutes = (values - values.astype('datetime64[D]')).astype('timedelta64[m]').astype(np.int64)
+    return np.where(valid, minutes // interval_minutes, -1).astype(np.int8)
+
+def is_compact(df: pd.DataFrame) -> bool:
+    """True si el DataFrame ya tiene el esquema compacto"""
+    return 'intervalo' in df.columns and isinstance(df['asesor'].dtype, pd.CategoricalDtype)
+
+def compact_call_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convertir filas crudas (fecha, asesor, hora_inicio_contrata, tme, tmo) al esquema compacto
+
+    Retorna un DataFrame nuevo; el original no se modifica.
+    """
+    if is_compact(df):
+        return df
+
+    timestamps = pd.to_datetime(df['hora_inicio_contrata'])
+    dates = pd.to_datetime(df['fecha']) if 'fecha' in df.columns else timestamps.dt.normalize()
+
+    return pd.DataFrame({
+        'fecha': dates,
+        'asesor': df['asesor'].astype('category'),
+        'hora_inicio_contrata': timestamps,
+        'tme': _compact_duration(df['tme']),
+        'tmo': _compact_duration(df['tmo']),
+        'intervalo': interval_codes(timestamps)
+    }, index=df.index)
+
+def concat_call_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """Unir bloques compactos conservando asesor como categórico (unión de categorías)"""
+    frames = [frame for frame in frames if len(frame)]
+    if not frames:
+        return pd.DataFrame(columns=['fecha', 'asesor', 'hora_inicio_contrata', 'tme', 'tmo', 'intervalo'])
+    if not all(is_compact(frame) for frame in frames):
+        return compact_call_frame(pd.concat(frames, ignore_index=True))
+
+    agents = union_categoricals([frame['asesor'] for frame in frames])
+    combined = pd.concat([frame.drop(columns='asesor') for frame in frames], ignore_index=True)
+    combined.insert(1, 'asesor', pd.Series(agents, index=combined.index))
+    return combined
+
+# Máximo de celdas (día x intervalo x asesor) del mapa de presencia; por encima se usan pares únicos
+AGENT_BITMAP_MAX_CELLS = 64_000_000
+
+@dataclass
+class CallFeatures:
+    """Columnas derivadas de las filas con marca de tiempo válida (una entrada por fila)"""
+    first_day: np.datetime64             # Primer día con llamadas
+    num_days: int                        # Días del calendario continuo desde first_day
+    interval_minutes: int
+    flat_index: np.ndarray               # día * intervalos_por_día + intervalo (int64)
+    tmo: np.ndarray                      # TMO en segundos (float64, NaN si falta)
+    tme: Optional[np.ndarray] = None     # TME en segundos (si hay columna 'tme')
+    agent_codes: Optional[np.ndarray] = None   # Código de asesor 0..n-1 (-1 si falta)
+    agent_labels: Optional[np.ndarray] = None  # Asesor de cada código
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, interval_minutes: int = CALL_FRAME_INTERVAL_MINUTES) -> 'CallFeatures':
+        """
+        Parsear marcas de tiempo y factorizar asesores una sola vez
+
+        Usa los códigos 'intervalo' del esquema compacto si están. Las filas sin
+        hora_inicio_contrata se descartan.
+        """
+        intervals_per_day = 24 * 60 // interval_minutes
+        timestamps = datetime_values(df['hora_inicio_contrata'])
+        valid = ~np.isnat(timestamps)
+        all_valid = bool(valid.all())
+
+        def valid_rows(values: np.ndarray) -> np.ndarray:
+            return values if all_valid else values[valid]
+
+        timestamps = valid_rows(timestamps)
+        days = timestamps.astype('datetime64[D]')
+        if days.size:
+            first_day = days.min()
+            day_index = (days - first_day).astype(np.int64)
+            num_days = int(day_index.max()) + 1
+        else:
+            first_day, day_index, num_days = np.datetime64('NaT', 'D'), np.zeros(0, dtype=np.int64), 0
+
+        if 'intervalo' in df.columns and interval_minutes == CALL_FRAME_INTERVAL_MINUTES:
+            slots = valid_rows(df['intervalo'].to_numpy()).astype(np.int64)
+        else:
+            slots = (timestamps - days).astype('timedelta64[m]').astype(np.int64) // interval_minutes
+
+        features = cls(
+            first_day=first_day,
+            num_days=num_days,
+            interval_minutes=interval_minutes,
+            flat_index=day_index * intervals_per_day + slots,
+            tmo=valid_rows(df['tmo'].to_numpy(dtype=np.float64))
+        )
+        if 'tme' in df.columns:
+            features.tme = valid_rows(df['tme'].to_numpy(dtype=np.float64))
+        if 'asesor' in df.columns:
+            # factorize sobre la Serie reutiliza los códigos si asesor es categórico
+            codes, labels = pd.factorize(df['asesor'])
+            features.agent_codes = valid_rows(codes)
+            features.agent_labels = np.asarray(labels)
+        return features
+
+    @property
+    def intervals_per_day(self) -> int:
+        return 24 * 60 // self.interval_minutes
+
+    @property
+    def rows(self) -> int:
+        return len(self.flat_index)
+
+    @property
+    def dates(self) -> np.ndarray:
+        """Fechas (datetime64[D]) del calendario continuo"""
+        return self.first_day + np.arange(self.num_days)
+
+    def distinct_agents(self) -> Dict[str, np.ndarray]:
+        """
+        Asesores distintos por celda, por día, por hora del día y en total, en una pasada
+
+        Con un mapa de presencia (día x intervalo x asesor) si cabe en
+        AGENT_BITMAP_MAX_CELLS; si no, con los pares (celda, asesor) únicos.
+
+        Returns:
+            {'cells': (días x intervalos), 'days': (días,), 'hours': (24,), 'total': int}
+        """
+        slots_per_hour = self.intervals_per_day // 24
+        known = self.agent_codes >= 0
+        flat_index, codes = self.flat_index[known], self.agent_codes[known]
+        agents = len(self.agent_labels)
+
+        if self.num_days * self.intervals_per_day * agents <= AGENT_BITMAP_MAX_CELLS:
+            present = np.zeros((self.num_days, self.intervals_per_day, agents), dtype=bool)
+            present.reshape(-1, agents)[flat_index, codes] = True
+            by_hour = present.reshape(self.num_days, 24, slots_per_hour, agents).any(axis=2)
+            agents_by_hour = by_hour.any(axis=0)
+            return {
+                'cells': present.sum(axis=2),
+                'days': by_hour.any(axis=1).sum(axis=1),
+                'hours': agents_by_hour.sum(axis=1),
+                'total': int(agents_by_hour.any(axis=0).sum())
+            }
+
+        # Pares únicos (celda, asesor); los demás niveles salen de esos pares, no de las filas
+        pairs = np.unique(flat_index * agents + codes)
+        cells, pair_agents = pairs // agents, pairs % agents
+        day_pairs = np.unique((cells // self.intervals_per_day) * agents + pair_agents)
+        hour_pairs = np.unique(((cells % self.intervals_per_day) // slots_per_hour) * agents + pair_agents)
+        return {
+            'cells': np.bincount(cells, minlength=self.num_days * self.intervals_per_day)
+                       .reshape(self.num_days, self.intervals_per_day),
+            'days': np.bincount(day_pairs // agents, minlength=self.num_days),
+            'hours': np.bincount(hour_pairs // agents, minlength=24),
+            'total': int(np.unique(pair_agents).size)
+        }
+
+def frame_memory_bytes(df: pd.DataFrame) -> int:
+    """Memoria real del DataFrame (incluye objetos Python)"""
+    return int(df.memory_usage(deep=True).sum())
+
+def synthetic_call_frame(rows: int = 1_000_000, agents: int = 400, days: int = 90, seed: int = 42) -> pd.DataFrame:
+    """
+    Llamadas sintéticas tal como las entrega el driver (para benchmarks)
+
+    Imita a pyodbc: asesor como texto, fecha como objetos date, hora_inicio_contrata
+    datetime64 y tmo/tme como int64.
+    """
+    rng = np.random.default_rng(seed)
+    timestamps = pd.Timestamp('2025-01-01') + pd.to_timedelta(np.sort(rng.integers(0, days * 86400, rows)), unit='s')
+    return pd.DataFrame({
+        'asesor': pd.Series(rng.integers(0, agents, rows)).map(lambda code: f"usuario_{code:04d}"),
+        'hora_inicio_contrata': timestamps,
+        'fecha': timestamps.date,
+        'tme': rng.exponential(20, rows).round().astype(np.int64),
+        'tmo': rng.gamma(4, 60, rows).round().astype(np.int64)
+    })
+
+def benchmark_call_frame_memory(rows: int = 1_000_000, agents: int = 400, seed: int = 42) -> Dict:
+    """Comparar la memoria del DataFrame tal como lo entrega el driver con el esquema compacto"""
+    raw = synthetic_call_frame(rows, agents, seed=seed)
+
+    start = pd.Timestamp.now()
+    compact = compact_call_frame(raw)
+    convert_seconds = (pd.Timestamp.now() - start).total_seconds()
+
+    raw_bytes, compact_bytes = frame_memory_bytes(raw), frame_memory_bytes(compact)
+    results = {
+        'rows': rows,
+        'raw_mb': round(raw_bytes / 1e6, 1),
+        'compact_mb': round(compact_bytes / 1e6, 1),
+        'reduction': round(raw_bytes / compact_bytes, 1),
+        'convert_seconds': round(convert_seconds, 3),
+        'dtypes': {column: str(dtype) for column, dtype in compact.dtypes.items()}
+    }
+    logger.info(f"💾 {rows:,} filas: {results['raw_mb']} MB -> {results['compact_mb']} MB "
+                f"({results['reduction']}x menos) en {results['convert_seconds']}s")
+    return results
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(benchmark_call_frame_memory())
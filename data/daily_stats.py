@@ -0,0 +1,239 @@
+"""
+Resúmenes diarios mergeables para re-análisis incremental
+
+Por cada fecha se guarda un CallAggregatesAccumulator de un solo día: llamadas,
+sumas y sumas de cuadrados de TMO/TME por intervalo, atendidas en objetivo, el
+mapa de bits exacto de asesores por intervalo y los histogramas de TMO/TME por
+segundo. Todo es sumable (o combinable con OR), así que los agregados de cualquier
+rango salen de combinar sus resúmenes diarios: extender el rango un día o
+desplazar la ventana solo consulta en la fuente los días que aún no tienen
+resumen, y el costo de responder es proporcional a los días, no a las llamadas.
+
+Los resúmenes se guardan en DAILY_STATS_DIR/source=<fuente>/att=<objetivo>/AAAA-MM-DD.npz
+(cada fuente tiene su propio historial y las atendidas en objetivo dependen del tiempo
+de respuesta objetivo); los días cerrados se guardan como una marca vacía AAAA-MM-DD.empty.
+Los días de los últimos DAILY_STATS_LAG_DAYS (que aún pueden recibir registros tardíos)
+se calculan pero no se guardan. Las fuentes
+descartan los resúmenes de las fechas que cambian al cargar o sincronizar datos
+(invalidate_query_cache).
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Agregar paths
+sys.path.append(str(Path(__file__).parent.parent))
+
+from data.call_aggregates import CallAggregates, CallAggregatesAccumulator
+from data.call_frame import datetime_values
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATS_DIR = Path(__file__).parent.parent / 'cache' / 'daily_stats'
+EMPTY_DAY_SUFFIX = '.empty'  # Marca sin contenido de un día sin llamadas ya asentado
+
+def source_key(data_source) -> str:
+    """Nombre de la fuente usado en la ruta de sus resúmenes (p.ej. 'sqlite')"""
+    return getattr(data_source, 'name', None) or type(data_source).__name__.lower()
+
+def missing_spans(days: List[date]) -> List[Tuple[date, date]]:
+    """Agrupar fechas ordenadas en rangos contiguos [inicio, fin]"""
+    spans = []
+    for day in days:
+        if spans and day == spans[-1][1] + timedelta(days=1):
+            spans[-1] = (spans[-1][0], day)
+        else:
+            spans.append((day, day))
+    return spans
+
+class DailyStatsStore:
+    """Resúmenes por día en disco, con un LRU en memoria de los más usados"""
+
+    def __init__(self, directory: Optional[str] = None, memory_days: Optional[int] = None):
+        self.directory = Path(directory or os.getenv('DAILY_STATS_DIR', str(DEFAULT_STATS_DIR)))
+        self.memory_days = memory_days or int(os.getenv('DAILY_STATS_MEMORY_DAYS', '400'))
+        # Días recientes que aún pueden recibir registros tardíos: se recalculan en cada consulta
+        self.lag_days = int(os.getenv('DAILY_STATS_LAG_DAYS', '2'))
+        self._loaded: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _day_path(self, source: str, day: date, answer_time_target: int, suffix: str = '.npz') -> Path:
+        return self.directory / f"source={source}" / f"att={answer_time_target}" / f"{day.isoformat()}{suffix}"
+
+    def _remember(self, key: Tuple[str, date, int], accumulator: CallAggregatesAccumulator):
+        with self._lock:
+            self._loaded[key] = accumulator
+            self._loaded.move_to_end(key)
+            while len(self._loaded) > self.memory_days:
+                self._loaded.popitem(last=False)
+
+    def _get(self, source: str, day: date, answer_time_target: int) -> Optional[CallAggregatesAccumulator]:
+        """Resumen guardado del día (memoria o disco), o None si aún no existe"""
+        key = (source, day, answer_time_target)
+        with self._lock:
+            accumulator = self._loaded.get(key)
+            if accumulator is not None:
+                self._loaded.move_to_end(key)
+                return accumulator
+        path = self._day_path(source, day, answer_time_target)
+        if path.exists():
+            accumulator = CallAggregatesAccumulator.load(path)
+        elif path.with_suffix(EMPTY_DAY_SUFFIX).exists():
+            accumulator = CallAggregatesAccumulator(answer_time_target)
+        else:
+            return None
+        self._remember(key, accumulator)
+        return accumulator
+
+    def summarize(self, data_source, start_date: date, end_date: date,
+                  answer_time_target: int = 20) -> Dict[date, CallAggregatesAccumulator]:
+        """
+        Leer filas del rango y plegarlas en un acumulador por fecha (incluye días sin llamadas)
+
+        Las filas se asignan por la columna fecha, igual que el filtro de las consultas.
+        """
+        daily = {
+            start_date + timedelta(days=offset): CallAggregatesAccumulator(answer_time_target)
+            for offset in range((end_date - start_date).days + 1)
+        }
+        for chunk in data_source.iter_campaign_data(start_date, end_date):
+            fechas = datetime_values(chunk['fecha']).astype('datetime64[D]')
+            for day in np.unique(fechas):
+                accumulator = daily.get(pd.Timestamp(day).date())
+                if accumulator is not None:
+                    accumulator.add(chunk[fechas == day])
+        return daily
+
+    def ensure(self, data_source, start_date: date, end_date: date,
+               answer_time_target: int = 20) -> List[CallAggregatesAccumulator]:
+        """
+        Resúmenes de cada día del rango, consultando en la fuente solo los que faltan
+
+        Los días faltantes se leen agrupados en rangos contiguos. Se guardan en disco los
+        días anteriores a la ventana de DAILY_STATS_LAG_DAYS (los vacíos como marca, para no
+        volver a consultarlos); los recientes solo se usan en esta llamada.
+        """
+        source = source_key(data_source)
+        settled_before = date.today() - timedelta(days=self.lag_days)
+        days = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+        summaries = {day: self._get(source, day, answer_time_target) for day in days if day < settled_before}
+        missing = [day for day in days if summaries.get(day) is None]
+
+        for first, last in missing_spans(missing):
+            start = time.perf_counter()
+            for day, accumulator in self.summarize(data_source, first, last, answer_time_target).items():
+                summaries[day] = accumulator
+                if day < settled_before:
+                    path = self._day_path(source, day, answer_time_target)
+                    if accumulator.rows > 0:
+                        accumulator.save(path)
+                    else:
+                        path.parent.mkdir(parents=True, exist_ok=True)
+                        path.with_suffix(EMPTY_DAY_SUFFIX).touch()
+                    self._remember((source, day, answer_time_target), accumulator)
+            logger.info(f"🗓️ Resúmenes diarios {first} - {last} calculados en {time.perf_counter() - start:.2f}s")
+
+        return [summaries[day] for day in days]
+
+    def aggregate(self, data_source, start_date: date, end_date: date,
+                  answer_time_target: int = 20) -> CallAggregates:
+        """Agregados del rango combinando sus resúmenes diarios"""
+        start = time.perf_counter()
+        accumulators = self.ensure(data_source, start_date, end_date, answer_time_target)
+        aggregates = CallAggregatesAccumulator.combine(accumulators).result()
+        aggregates.source = 'daily'
+        logger.info(f"🗓️ {len(accumulators)} resúmenes diarios combinados en {time.perf_counter() - start:.2f}s "
+                    f"({aggregates.total_calls:,} llamadas)")
+        return aggregates
+
+    def invalidate(self, start_date: Optional[date] = None, end_date: Optional[date] = None,
+                   source: Optional[str] = None):
+        """Descartar los resúmenes del rango y la fuente (todos si no se indican) para recalcularlos"""
+        def selected(key_source: str, day: date) -> bool:
+            return ((source is None or key_source == source)
+                    and (start_date is None or day >= start_date) and (end_date is None or day <= end_date))
+
+        with self._lock:
+            for key in [key for key in self._loaded if selected(key[0], key[1])]:
+                del self._loaded[key]
+        for path in self.directory.glob(f"source={source or '*'}/att=*/*-*-*.*"):
+            if selected(path.parent.parent.name.split('=', 1)[1], date.fromisoformat(path.stem)):
+                path.unlink()
+        logger.info(f"🔄 Resúmenes diarios invalidados ({source or 'todas las fuentes'}: "
+                    f"{start_date or 'inicio'} - {end_date or 'fin'})")
+
+    def stats(self) -> Dict:
+        """Días guardados (con llamadas o vacíos) por fuente y objetivo, tamaño en disco y días en memoria"""
+        files = list(self.directory.glob('source=*/att=*/*-*-*.*'))
+        targets: Dict[str, int] = {}
+        for path in files:
+            target = f"{path.parent.parent.name}/{path.parent.name}"
+            targets[target] = targets.get(target, 0) + 1
+        with self._lock:
+            in_memory = len(self._loaded)
+        return {
+            'days_by_target': targets,
+            'disk_mb': round(sum(path.stat().st_size for path in files) / 1e6, 2),
+            'days_in_memory': in_memory
+        }
+
+# Instancia global
+daily_stats = DailyStatsStore()
+
+def benchmark_incremental_analysis(data_source, start_date: date, end_date: date,
+                                   answer_time_target: int = 20) -> Dict:
+    """
+    Comparar el re-análisis desde filas con el de resúmenes diarios
+
+    Mide la primera construcción (lee todas las filas), la respuesta con todos los
+    días ya resumidos y una ventana desplazada un día (solo se lee el día nuevo).
+    """
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = DailyStatsStore(directory)
+        timings = {}
+
+        start = time.perf_counter()
+        accumulator = CallAggregatesAccumulator(answer_time_target)
+        for chunk in data_source.iter_campaign_data(start_date, end_date - timedelta(days=1)):
+            accumulator.add(chunk)
+        rows = accumulator.result().total_calls
+        timings['rows_seconds'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        store.aggregate(data_source, start_date, end_date - timedelta(days=1), answer_time_target)
+        timings['first_build_seconds'] = time.perf_counter() - start
+
+        store._loaded.clear()
+        start = time.perf_counter()
+        store.aggregate(data_source, start_date, end_date - timedelta(days=1), answer_time_target)
+        timings['cached_seconds'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        store.aggregate(data_source, start_date + timedelta(days=1), end_date, answer_time_target)
+        timings['slide_one_day_seconds'] = time.perf_counter() - start
+
+    results = {'rows': rows, 'days': (end_date - start_date).days,
+               **{name: round(seconds, 3) for name, seconds in timings.items()}}
+    logger.info(f"⏱️ Re-análisis incremental: {results}")
+    return results
+
+if __name__ == "__main__":
+    from data.data_sources import get_data_source
+    logging.basicConfig(level=logging.INFO)
+    source = get_data_source(os.getenv('BENCHMARK_DATA_SOURCE', 'sqlite'))
+    available = source.get_available_date_range()
+    print(benchmark_incremental_analysis(
+        source, pd.to_datetime(available['fecha_min']).date(), pd.to_datetime(available['fecha_max']).date()
+    ))
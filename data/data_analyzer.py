@@ -6,8 +6,13 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, date, timedelta
 from typing import Dict, List, Optional, Tuple
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
 import logging
+import os
 import sys
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
 
 # Agregar paths
@@ -18,18 +23,56 @@ logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(name)s:%(message
 logger = logging.getLogger(__name__)
 
 try:
-    from data.sql_connector import sql_connector
+    from data.data_sources import get_data_source
+    from data.call_aggregates import CallAggregates, CallAggregatesAccumulator
+    from data.daily_stats import daily_stats
+    from data.history_cache import history_cache
+    from data.parallel_fetch import PartitionedFetcher
+    from data.query_metrics import query_metrics
     from engines.erlang_calculator import erlang_calculator, ErlangInputs, ErlangResults
 except ImportError as e:
     logger.error(f"❌ Error importando módulos: {e}")
     print(f"❌ Error importando módulos: {e}")
     exit(1)
 
+# Escenarios de dimensionamiento en el orden en que se calculan
+SCENARIO_NAMES = ['promedio', 'hora_pico', 'conservador', 'optimista']
+
+def scenario_demand(historical_analysis: Dict) -> Dict[str, Tuple[float, float]]:
+    """
+    Llamadas por hora y TMO que usa cada escenario, desde analyze_historical_aggregates
+
+    - promedio: volumen horario promedio de los días operativos con el TMO promedio
+    - hora_pico: volumen de la hora pico con el TMO de esa hora
+    - conservador / optimista: percentil 90 / 75 de cada hora entre días operativos,
+      promediado en las horas con tráfico
+    """
+    # Todos los volúmenes salen de la matriz días x intervalos (llamadas/hora de un día operativo)
+    demand_matrix = historical_analysis['demand_matrix']
+    volume_analysis = historical_analysis['volume_analysis']
+    hourly_aht = demand_matrix.aht(minutes=60)
+    avg_tmo = demand_matrix.average_aht()
+    
+    # TMO específico de hora pico (el promedio si la hora no tiene llamadas)
+    peak_hour = volume_analysis['peak_hour']
+    peak_tmo = float(hourly_aht[peak_hour]) if not np.isnan(hourly_aht[peak_hour]) else avg_tmo
+    
+    return {
+        'promedio': (volume_analysis['avg_calls_per_hour'], avg_tmo),
+        'hora_pico': (volume_analysis['peak_volume'], peak_tmo),
+        'conservador': (volume_analysis['interval_percentiles']['90'], avg_tmo),
+        'optimista': (volume_analysis['interval_percentiles']['75'], avg_tmo)
+    }
+
 class DataAnalyzer:
     """Analizador integrado de datos históricos y dimensionamiento"""
     
-    def __init__(self):
-        self.sql_connector = sql_connector
+    def __init__(self, data_source=None):
+        # SQL Server, SQLite o Parquet según DATA_SOURCE (ver data.data_sources)
+        self.data_source = data_source or get_data_source()
+        # Agregados precargados en segundo plano (un solo período a la vez)
+        self._prefetched: Dict[Tuple, Future] = {}
+        self._prefetch_lock = threading.Lock()
         self.erlang_calculator = erlang_calculator
         
     def analyze_campaign_complete(self, 
@@ -37,7 +80,8 @@ class DataAnalyzer:
                                  end_date: date,
                                  sla_target: float = 0.90,
                                  answer_time_target: int = 20,
-                                 shrinkage_pct: float = 15.0) -> Dict:
+                                 shrinkage_pct: float = 15.0,
+                                 source: Optional[str] = None) -> Dict:
         """
         Análisis completo de campaña: datos históricos + dimensionamiento + validación
         
@@ -47,45 +91,63 @@ class DataAnalyzer:
             sla_target: Objetivo SLA (0.90 = 90%)
             answer_time_target: Tiempo respuesta objetivo en segundos
             shrinkage_pct: Porcentaje de shrinkage
+            source: 'aggregates' (GROUP BY en la fuente de datos), 'stream' (filas por bloques),
+                'parallel' (particiones de fecha en paralelo),
+                'daily' (resúmenes diarios mergeables: solo se consultan los días sin resumen),
+                'cache' (Parquet local con sincronización incremental) o 'raw' (filas crudas con TOP);
+                por defecto ANALYSIS_SOURCE
             
         Returns:
-            Dict con análisis completo
+            Dict con análisis completo; 'timings' incluye el tiempo de cada etapa y las
+            consultas SQL registradas durante el análisis (ver data.query_metrics)
         """
+        stage_seconds: Dict[str, float] = {}
+        first_query = query_metrics.last_sequence
+        started = time.perf_counter()
         try:
             print(f"🔍 Iniciando análisis completo de campaña...")
             print(f"📅 Período: {start_date} - {end_date}")
             print(f"🎯 SLA objetivo: {sla_target*100}% en {answer_time_target}s")
             
-            # 1. Obtener datos históricos
-            print("📊 1. Obteniendo datos históricos...")
-            df = self.sql_connector.get_campaign_data(start_date, end_date)
+            # 1. Obtener datos históricos (agregados en el servidor o filas crudas)
+            source = source or os.getenv('ANALYSIS_SOURCE', 'aggregates')
+            print(f"📊 1. Obteniendo datos históricos ({source})...")
+            with self._stage(stage_seconds, 'load'):
+                aggregates = self._take_prefetched(start_date, end_date, answer_time_target, source)
+                if aggregates is None:
+                    aggregates = self._load_aggregates(start_date, end_date, answer_time_target, source)
             
-            if len(df) == 0:
+            if aggregates.total_calls == 0:
                 raise ValueError("No se encontraron datos para el período especificado")
             
             # 2. Análisis de datos históricos
             print("📈 2. Analizando patrones históricos...")
-            historical_analysis = self.erlang_calculator.analyze_historical_data(df)
+            with self._stage(stage_seconds, 'historical'):
+                historical_analysis = self.erlang_calculator.analyze_historical_aggregates(aggregates)
             
             # 3. Análisis por intervalos (hora pico vs promedio)
             print("⏰ 3. Analizando por intervalos...")
-            interval_analysis = self._analyze_by_intervals(df)
+            with self._stage(stage_seconds, 'intervals'):
+                interval_analysis = self._analyze_by_intervals(aggregates)
             
             # 4. Dimensionamiento con Erlang C
             print("🧮 4. Calculando dimensionamiento...")
-            dimensioning_results = self._calculate_dimensioning_scenarios(
-                historical_analysis, interval_analysis, sla_target, answer_time_target, shrinkage_pct
-            )
+            with self._stage(stage_seconds, 'dimensioning'):
+                dimensioning_results = self._calculate_dimensioning_scenarios(
+                    historical_analysis, interval_analysis, sla_target, answer_time_target, shrinkage_pct
+                )
             
             # 5. Validación contra TME real
             print("✅ 5. Validando contra datos reales...")
-            validation_results = self._validate_against_reality(df, dimensioning_results)
+            with self._stage(stage_seconds, 'validation'):
+                validation_results = self._validate_against_reality(aggregates, dimensioning_results)
             
             # 6. Recomendaciones
             print("💡 6. Generando recomendaciones...")
-            recommendations = self._generate_recommendations(
-                historical_analysis, dimensioning_results, validation_results
-            )
+            with self._stage(stage_seconds, 'recommendations'):
+                recommendations = self._generate_recommendations(
+                    historical_analysis, dimensioning_results, validation_results
+                )
             
             # 7. Compilar resultados finales
             complete_analysis = {
@@ -106,7 +168,13 @@ class DataAnalyzer:
                 'recommendations': recommendations,
                 'summary': self._create_executive_summary(
                     historical_analysis, dimensioning_results, validation_results
-                )
+                ),
+                'timings': {
+                    'stages': stage_seconds,
+                    'total_seconds': round(time.perf_counter() - started, 4),
+                    'source': source,
+                    'queries': query_metrics.since(first_query)
+                }
             }
             
             self._log_complete_results(complete_analysis)
@@ -118,34 +186,218 @@ class DataAnalyzer:
             print(f"❌ Error en análisis completo: {e}")
             raise
     
-    def _analyze_by_intervals(self, df: pd.DataFrame) -> Dict:
-        """Análisis detallado por intervalos de tiempo"""
+    @staticmethod
+    @contextmanager
+    def _stage(stage_seconds: Dict[str, float], name: str):
+        """Registrar el tiempo de pared de una etapa del análisis en stage_seconds"""
+        start = time.perf_counter()
         try:
-            df['hora_inicio_contrata'] = pd.to_datetime(df['hora_inicio_contrata'])
-            df['hora'] = df['hora_inicio_contrata'].dt.hour
-            df['intervalo_15min'] = (df['hora_inicio_contrata'].dt.minute // 15) * 15
+            yield
+        finally:
+            stage_seconds[name] = round(time.perf_counter() - start, 4)
+    
+    def prefetch_aggregates(self, start_date: date, end_date: date, answer_time_target: int = 20,
+                            source: Optional[str] = None, executor: Optional[Executor] = None) -> Future:
+        """
+        Cargar en segundo plano los agregados que usará analyze_campaign_complete
+        
+        Si luego se analiza el mismo período, objetivo y fuente, se reutiliza el
+        resultado (o se espera a que termine) en vez de repetir la consulta.
+        """
+        source = source or os.getenv('ANALYSIS_SOURCE', 'aggregates')
+        key = (start_date, end_date, answer_time_target, source)
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='prefetch')
+            future = executor.submit(self._load_aggregates, *key)
+            executor.shutdown(wait=False)
+        else:
+            future = executor.submit(self._load_aggregates, *key)
+        with self._prefetch_lock:
+            self._prefetched = {key: future}
+        return future
+    
+    def _take_prefetched(self, start_date: date, end_date: date,
+                         answer_time_target: int, source: str) -> Optional[CallAggregates]:
+        """Agregados precargados para exactamente este período, o None"""
+        with self._prefetch_lock:
+            future = self._prefetched.pop((start_date, end_date, answer_time_target, source), None)
+        if future is None:
+            return None
+        try:
+            aggregates = future.result()
+            print("⚡ Usando agregados precargados")
+            return aggregates
+        except Exception as e:
+            logger.warning(f"⚠️ Precarga fallida, consultando de nuevo: {e}")
+            return None
+    
+    def _load_aggregates(self, start_date: date, end_date: date,
+                         answer_time_target: int, source: str) -> CallAggregates:
+        """Obtener los agregados del período desde la fuente de datos o desde filas crudas"""
+        if source == 'aggregates':
+            return self.data_source.get_call_aggregates(start_date, end_date, answer_time_target)
+        if source == 'stream':
+            # Bloques plegados en acumuladores y descartados: memoria acotada sin truncar
+            accumulator = CallAggregatesAccumulator(answer_time_target)
+            for chunk in self.data_source.iter_campaign_data(start_date, end_date):
+                accumulator.add(chunk)
+            return accumulator.result()
+        if source == 'parallel':
+            # Particiones de fecha leídas en paralelo y plegadas en acumuladores
+            return PartitionedFetcher(self.data_source).aggregate(start_date, end_date, answer_time_target)
+        if source == 'daily':
+            # Resúmenes por día guardados: el costo crece con los días del rango, no con las llamadas
+            return daily_stats.aggregate(self.data_source, start_date, end_date, answer_time_target)
+        if source == 'cache':
+            # Parquet local: solo se consultan en la fuente las filas posteriores a la marca de agua
+            history_cache.ensure(self.data_source, start_date)
+            return history_cache.aggregate(start_date, end_date, answer_time_target)
+        if source == 'raw':
+            df = self.data_source.get_campaign_data(start_date, end_date)
+            return CallAggregates.from_dataframe(df, answer_time_target)
+        raise ValueError(f"Fuente de análisis desconocida: {source}. Opciones: ['aggregates', 'stream', 'parallel', 'daily', 'cache', 'raw']")
+    
+    def simulate_intraday(self, complete_analysis: Dict, agents=None,
+                          num_replications: Optional[int] = None) -> Dict:
+        """
+        Simular el día completo con la cola arrastrada entre intervalos de 15 minutos
+        
+        Args:
+            complete_analysis: Resultado de analyze_campaign_complete
+            agents: Agentes fijos o dotación por intervalo (96 valores);
+                por defecto los agentes en línea del escenario recomendado
+            num_replications: Réplicas a simular (por defecto NUM_REPLICATIONS)
             
-            # Análisis por hora - CORREGIDO: evitar duplicación de columnas
-            hourly_stats = df.groupby('hora').agg({
-                'asesor': ['count', 'nunique'],  # Llamadas y agentes únicos
-                'tmo': ['mean', 'std'],
-                'tme': ['mean', 'std']
-            }).round(2)
+        Returns:
+            Dict con SL/ASA/cola por intervalo y comparación con Erlang C
+        """
+        from engines.nonstationary_simulation import NonStationaryInputs, nonstationary_simulator
+        
+        try:
+            if agents is None:
+                scenario_name = complete_analysis['summary'].get('escenario_base', 'promedio')
+                agents = complete_analysis['dimensioning_results']['scenarios'][scenario_name]['agents_required']
+            
+            options = {'answer_time_target': complete_analysis['targets']['answer_time_target']}
+            if num_replications is not None:
+                options['num_replications'] = num_replications
+            
+            inputs = NonStationaryInputs.from_interval_analysis(
+                complete_analysis['interval_analysis'],
+                days=complete_analysis['historical_analysis']['date_range']['operating_days'],
+                agents=agents,
+                **options
+            )
+            return nonstationary_simulator.simulate(inputs).to_dict()
             
-            # Renombrar columnas con estructura jerárquica corregida
-            hourly_stats.columns = ['llamadas', 'agentes_activos', 'tmo_promedio', 'tmo_std', 'tme_promedio', 'tme_std']
+        except Exception as e:
+            logger.error(f"❌ Error en simulación intradía: {e}")
+            raise
+
+    def forecast_staffing(self, complete_analysis: Dict, horizon_weeks: Optional[int] = None) -> Dict:
+        """
+        Pronosticar la demanda de las próximas semanas y dimensionar cada intervalo
+
+        Args:
+            complete_analysis: Resultado de analyze_campaign_complete (usa su matriz de demanda y objetivos)
+            horizon_weeks: Semanas a pronosticar (por defecto FORECAST_HORIZON_WEEKS)
+
+        Returns:
+            Dict con el resumen del pronóstico, llamadas y agentes por día y la dotación
+            (con shrinkage) de cada intervalo de 15 minutos
+        """
+        from engines.forecaster import seasonal_forecaster
+
+        try:
+            targets = complete_analysis['targets']
+            # El pronóstico empieza el día siguiente al período analizado, aunque termine en días cerrados
+            forecast = seasonal_forecaster.fit_matrix(
+                complete_analysis['historical_analysis']['demand_matrix'], horizon_weeks,
+                last_day=complete_analysis['period']['end_date']
+            )
+            staffing = forecast.staffing(
+                sla_target=targets['sla_target'] / 100,
+                answer_time_target=targets['answer_time_target'],
+                shrinkage_pct=targets['shrinkage_percentage'],
+                calculator=self.erlang_calculator
+            )
+
+            calls = forecast.calls[0]
+            agents = staffing.agents_with_shrinkage[0]
+            agent_hours = agents.sum(axis=1) * forecast.interval_minutes / 60
+            return {
+                'forecast': forecast.to_dict(),
+                'daily': [
+                    {
+                        'fecha': str(day),
+                        'llamadas': round(float(calls[index].sum()), 1),
+                        'agentes_pico': int(agents[index].max()),
+                        'horas_agente': round(float(agent_hours[index]), 1)
+                    }
+                    for index, day in enumerate(forecast.dates)
+                ],
+                'agents_per_interval': agents.tolist()
+            }
+
+        except Exception as e:
+            logger.error(f"❌ Error en pronóstico de dotación: {e}")
+            raise
+
+    def backtest_scenarios(self, start_date: date, end_date: date, sla_target: float = 0.90,
+                           answer_time_target: int = 20, shrinkage_pct: float = 15.0,
+                           window_days: Optional[int] = None, horizon_days: Optional[int] = None,
+                           step_days: Optional[int] = None) -> Dict:
+        """
+        Evaluar los escenarios fuera de muestra: construidos con W días, comparados con los H siguientes
+
+        Returns:
+            Dict con la distribución del error de cada escenario y el mejor por agentes, ASA y volumen
+            (ver data.backtesting)
+        """
+        from data.backtesting import Backtester
+
+        try:
+            backtester = Backtester(self.data_source, window_days, horizon_days, step_days)
+            return backtester.run(start_date, end_date, sla_target, answer_time_target, shrinkage_pct).to_dict()
+
+        except Exception as e:
+            logger.error(f"❌ Error en backtesting de escenarios: {e}")
+            raise
+
+    def _analyze_by_intervals(self, aggregates: CallAggregates) -> Dict:
+        """Análisis detallado por intervalos de tiempo (desde los agregados, sin reagrupar filas)"""
+        try:
+            demand_matrix = aggregates.matrix
+            
+            # Análisis por hora: totales del período, medias y desviaciones desde sumas
+            hourly_calls = demand_matrix.calls_matrix(minutes=60).sum(axis=0)
+            hourly_stats = pd.DataFrame({
+                'llamadas': hourly_calls,
+                'agentes_activos': aggregates.agents_per_hour,
+                'tmo_promedio': demand_matrix.aht(minutes=60),
+                'tmo_std': demand_matrix.aht_std(minutes=60),
+                'tme_promedio': demand_matrix.wait(minutes=60),
+                'tme_std': demand_matrix.wait_std(minutes=60)
+            }, index=pd.Index(range(24), name='hora'))
+            # Percentiles por hora desde los t-digest por intervalo (si la fuente los trae)
+            for metric in ('tmo', 'tme'):
+                hourly_p90 = aggregates.interval_percentile(metric, 90, minutes=60)
+                if hourly_p90 is not None:
+                    hourly_stats[f'{metric}_p90'] = hourly_p90
+            hourly_stats = hourly_stats[hourly_stats['llamadas'] > 0].round(2)
             
             # Encontrar hora pico
             peak_hour = hourly_stats['llamadas'].idxmax()
             peak_volume = hourly_stats.loc[peak_hour, 'llamadas']
             
             # Análisis por intervalos de 15 minutos (hora pico)
-            peak_hour_data = df[df['hora'] == peak_hour]
-            interval_15min = peak_hour_data.groupby('intervalo_15min').agg({
-                'asesor': 'count',
-                'tmo': 'mean',
-                'tme': 'mean'
-            }).round(2)
+            peak_slots = slice(peak_hour * 4, peak_hour * 4 + 4)
+            interval_15min = pd.DataFrame({
+                'asesor': demand_matrix.calls.sum(axis=0)[peak_slots],
+                'tmo': demand_matrix.aht()[peak_slots],
+                'tme': demand_matrix.wait()[peak_slots]
+            }, index=pd.Index([0, 15, 30, 45], name='intervalo_15min'))
+            interval_15min = interval_15min[interval_15min['asesor'] > 0].round(2)
             
             # Capturar TMO de hora pico para usar en escenarios
             peak_hour_tmo = float(hourly_stats.loc[peak_hour, 'tmo_promedio'])
@@ -161,6 +413,7 @@ class DataAnalyzer:
                 },
                 'peak_hour_tmo': peak_hour_tmo,  # NUEVO: TMO específico para escenarios
                 'interval_15min_peak': interval_15min.to_dict('index'),
+                'interval_profile_15min': demand_matrix.interval_profile(),
                 'busiest_intervals': {
                     'top_3_hours': hourly_stats.nlargest(3, 'llamadas')[['llamadas', 'tmo_promedio']].to_dict('index')
                 }
@@ -175,75 +428,30 @@ class DataAnalyzer:
                                         shrinkage_pct: float) -> Dict:
         """Calcular múltiples escenarios de dimensionamiento"""
         try:
-            scenarios = {}
+            # Volumen y TMO de cada escenario desde la matriz días x intervalos
+            demand = scenario_demand(historical_analysis)
             
-            # Escenario 1: Promedio histórico
-            avg_volume = historical_analysis['volume_analysis']['avg_calls_per_hour']
-            avg_tmo = historical_analysis['tmo_analysis']['average_seconds']
-            
-            inputs_avg = ErlangInputs(
-                calls_per_hour=avg_volume,
-                average_handle_time=avg_tmo,
+            # Todos los escenarios se calculan en una sola llamada vectorizada
+            batch_results = self.erlang_calculator.calculate_erlang_c_batch(
+                calls_per_hour=[demand[name][0] for name in SCENARIO_NAMES],
+                average_handle_time=[demand[name][1] for name in SCENARIO_NAMES],
                 service_level_target=sla_target,
                 answer_time_target=answer_time,
                 shrinkage_percentage=shrinkage_pct
             )
-            
-            scenarios['promedio'] = self.erlang_calculator.calculate_erlang_c(inputs_avg)
-            
-            # Escenario 2: Hora pico - CORREGIDO: usar TMO específico de hora pico
-            peak_volume = historical_analysis['volume_analysis']['peak_volume']
-            # Obtener TMO de hora pico desde interval_analysis
-            peak_tmo = interval_analysis.get('peak_hour_tmo', avg_tmo)  # Usar TMO específico de hora pico
-            
-            inputs_peak = ErlangInputs(
-                calls_per_hour=peak_volume,
-                average_handle_time=peak_tmo,  # TMO específico de hora pico
-                service_level_target=sla_target,
-                answer_time_target=answer_time,
-                shrinkage_percentage=shrinkage_pct
-            )
-            
-            scenarios['hora_pico'] = self.erlang_calculator.calculate_erlang_c(inputs_peak)
-            
-            # Escenario 3: Conservador (percentil 90 de volumen)
-            hourly_volumes = list(historical_analysis['volume_analysis']['hourly_profile'].values())
-            p90_volume = np.percentile(hourly_volumes, 90)
-            
-            inputs_conservative = ErlangInputs(
-                calls_per_hour=p90_volume,
-                average_handle_time=avg_tmo,
-                service_level_target=sla_target,
-                answer_time_target=answer_time,
-                shrinkage_percentage=shrinkage_pct
-            )
-            
-            scenarios['conservador'] = self.erlang_calculator.calculate_erlang_c(inputs_conservative)
-            
-            # Escenario 4: Optimista (percentil 75)
-            p75_volume = np.percentile(hourly_volumes, 75)
-            
-            inputs_optimistic = ErlangInputs(
-                calls_per_hour=p75_volume,
-                average_handle_time=avg_tmo,
-                service_level_target=sla_target,
-                answer_time_target=answer_time,
-                shrinkage_percentage=shrinkage_pct
-            )
-            
-            scenarios['optimista'] = self.erlang_calculator.calculate_erlang_c(inputs_optimistic)
+            scenarios = {name: batch_results.get(i) for i, name in enumerate(SCENARIO_NAMES)}
             
             return {
                 'scenarios': {k: v.to_dict() for k, v in scenarios.items()},
                 'volume_stats': {
-                    'promedio': avg_volume,
-                    'hora_pico': peak_volume,
-                    'percentil_90': p90_volume,
-                    'percentil_75': p75_volume
+                    'promedio': demand['promedio'][0],
+                    'hora_pico': demand['hora_pico'][0],
+                    'percentil_90': demand['conservador'][0],
+                    'percentil_75': demand['optimista'][0]
                 },
                 'tmo_info': {
-                    'promedio_usado': avg_tmo,
-                    'pico_usado': peak_tmo,
+                    'promedio_usado': demand['promedio'][1],
+                    'pico_usado': demand['hora_pico'][1],
                     'escenario_pico_corregido': True  # Confirmar corrección aplicada
                 }
             }
@@ -252,24 +460,24 @@ class DataAnalyzer:
             logger.error(f"❌ Error calculando escenarios: {e}")
             return {}
     
-    def _validate_against_reality(self, df: pd.DataFrame, dimensioning_results: Dict) -> Dict:
+    def _validate_against_reality(self, aggregates: CallAggregates, dimensioning_results: Dict) -> Dict:
         """Validar resultados de dimensionamiento contra datos reales"""
         try:
-            # Estadísticas reales de TME
+            # Estadísticas reales de TME (sumas e histograma)
+            tme_mean, tme_std = aggregates.tme_mean_std()
             real_tme_stats = {
-                'promedio': df['tme'].mean(),
-                'mediana': df['tme'].median(),
-                'percentil_90': df['tme'].quantile(0.9),
-                'std': df['tme'].std()
+                'promedio': tme_mean,
+                'mediana': aggregates.tme_percentile(50),
+                'percentil_90': aggregates.tme_percentile(90),
+                'std': tme_std
             }
             
-            # Calcular SLA real (asumiendo objetivo de 20s)
-            answer_time_target = 20
-            calls_answered_in_time = (df['tme'] <= answer_time_target).sum()
-            real_sla = (calls_answered_in_time / len(df)) * 100
+            # Calcular SLA real con el mismo objetivo usado para agregar
+            calls_answered_in_time = aggregates.answered_in_target()
+            real_sla = (calls_answered_in_time / aggregates.total_calls) * 100
             
             # Agentes reales promedio por día
-            real_agents_per_day = df.groupby('fecha')['asesor'].nunique().mean()
+            real_agents_per_day = float(aggregates.agents_per_day.mean())
             
             # Comparar con escenarios calculados
             comparisons = {}
@@ -302,7 +510,7 @@ class DataAnalyzer:
                     'tme_stats': real_tme_stats,
                     'sla_real': real_sla,
                     'agentes_promedio_dia': real_agents_per_day,
-                    'total_llamadas_analizadas': len(df)
+                    'total_llamadas_analizadas': aggregates.total_calls
                 },
                 'comparisons': comparisons,
                 'best_scenario': self._find_best_scenario(comparisons)
@@ -423,6 +631,10 @@ class DataAnalyzer:
             print(f"⏳ TME promedio real: {summary['tme_promedio_real']:.1f}s")
             print(f"👥 Agentes actuales promedio: {summary['agentes_actuales_promedio']:.1f}")
             
+            timings = analysis['timings']
+            stages = " | ".join(f"{name} {seconds:.2f}s" for name, seconds in timings['stages'].items())
+            print(f"⏱️ Tiempos ({timings['total_seconds']:.2f}s): {stages} | {len(timings['queries'])} consultas SQL")
+            
             print("\n📋 ESCENARIOS CALCULADOS:")
             for scenario_name, scenario_data in analysis['dimensioning_results']['scenarios'].items():
                 print(f"   {scenario_name.upper()}: {scenario_data['agents_with_shrinkage']} agentes | SL: {scenario_data['service_level']:.1f}%")
@@ -467,6 +679,43 @@ def test_integration():
         logger.error(f"❌ Test de integración fallido: {e}")
         return False
 
+def benchmark_analysis_pipeline(rows: int = 2_000_000, agents: int = 400, days: int = 90, seed: int = 42) -> Dict:
+    """
+    Tiempo y memoria pico del análisis desde filas crudas, sin consultas
+
+    Construye los agregados con una sola pasada sobre CallFeatures y ejecuta las
+    etapas de analyze_campaign_complete sobre llamadas sintéticas, tal como llegan
+    del driver y en el esquema compacto. La memoria pico se mide con tracemalloc.
+    """
+    import tracemalloc
+    from data.call_frame import compact_call_frame, synthetic_call_frame
+
+    raw = synthetic_call_frame(rows, agents, days, seed)
+    results = {}
+    for name, df in (('raw', raw), ('compact', compact_call_frame(raw))):
+        tracemalloc.start()
+        start = time.perf_counter()
+        aggregates = CallAggregates.from_dataframe(df)
+        build_seconds = time.perf_counter() - start
+
+        historical = data_analyzer.erlang_calculator.analyze_historical_aggregates(aggregates)
+        intervals = data_analyzer._analyze_by_intervals(aggregates)
+        dimensioning = data_analyzer._calculate_dimensioning_scenarios(historical, intervals, 0.90, 20, 15.0)
+        data_analyzer._validate_against_reality(aggregates, dimensioning)
+        total_seconds = time.perf_counter() - start
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        results[name] = {
+            'rows': rows,
+            'build_seconds': round(build_seconds, 3),
+            'stages_seconds': round(total_seconds - build_seconds, 3),
+            'total_seconds': round(total_seconds, 3),
+            'peak_mb': round(peak_bytes / 1e6, 1)
+        }
+        logger.info(f"⏱️ Análisis {name}: {results[name]}")
+    return results
+
 if __name__ == "__main__":
     # Ejecutar test de integración
     test_integration()
\ No newline at end of file
@@ -0,0 +1,429 @@
+"""
+Fuentes de datos intercambiables para el análisis histórico
+
+Toda fuente expone la misma interfaz que SQLConnector:
+
+- get_campaign_data(start_date, end_date, campaign_filter=None) -> DataFrame
+- iter_campaign_data(start_date, end_date, campaign_filter=None, page_size=None,
+  chunk_size=None, after_fecha_hora=None) -> Iterator[DataFrame]
+- get_call_aggregates(start_date, end_date, answer_time_target=20) -> CallAggregates
+- get_available_date_range(use_cache=True) -> Dict
+- get_campaign_summary(days_back=30, use_cache=True) -> Dict
+- invalidate_query_cache(start_date=None, end_date=None) y warm_up()
+
+Los DataFrames tienen las 5 columnas estándar (fecha, asesor, hora_inicio_contrata,
+tme, tmo). La fuente se elige con DATA_SOURCE: 'sqlserver' (producción), 'sqlite'
+(archivo local con el mismo esquema de la tabla) o 'parquet' (particiones por fecha
+con el formato de CallHistoryCache). Las fuentes locales permiten correr el análisis
+completo sin SQL Server y comparar latencias con benchmark_data_sources().
+"""
+
+import logging
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import pandas as pd
+from sqlalchemy import text
+
+# Agregar paths
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.engine_registry import engine_registry
+from data.call_aggregates import HISTOGRAM_MAX_SECONDS, CallAggregates
+from data.call_frame import compact_call_frame
+from data.daily_stats import daily_stats
+from data.history_cache import CallHistoryCache
+from data.query_metrics import query_metrics
+from data.sql_connector import QueryResultCache, split_grouping_sets
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SQLITE_PATH = Path(__file__).parent.parent / 'cache' / 'call_history.sqlite'
+# Distinto de HISTORY_CACHE_DIR: sincronizar el caché desde esta fuente duplicaría sus filas
+DEFAULT_PARQUET_DIR = Path(__file__).parent.parent / 'cache' / 'parquet_source'
+SQLITE_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+def _new_query_cache() -> QueryResultCache:
+    return QueryResultCache(
+        ttl_seconds=float(os.getenv('QUERY_CACHE_TTL_SECONDS', '300')),
+        max_size=int(os.getenv('QUERY_CACHE_SIZE', '128'))
+    )
+
+def _date_span(df: pd.DataFrame):
+    """Primera y última fecha de las filas cargadas (sus resúmenes diarios cambian)"""
+    fechas = pd.to_datetime(df['fecha'])
+    return fechas.min().date(), fechas.max().date()
+
+class SQLiteDataSource:
+    """Archivo SQLite local con el mismo esquema que la tabla de SQL Server"""
+
+    name = 'sqlite'
+    table_name = 'llamadas'
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path or os.getenv('DATA_SOURCE_SQLITE_PATH', str(DEFAULT_SQLITE_PATH)))
+        self.max_records = int(os.getenv('MAX_RECORDS_PER_QUERY', '50000'))
+        self.stream_chunk_size = int(os.getenv('STREAM_CHUNK_SIZE', '50000'))
+        self.query_cache = _new_query_cache()
+
+    @property
+    def url(self) -> str:
+        return f"sqlite:///{self.path}"
+
+    @property
+    def engine(self):
+        return engine_registry.get_engine(self.url)
+
+    def warm_up(self):
+        return engine_registry.warm_up(self.url)
+
+    def invalidate_query_cache(self, start_date: Optional[date] = None, end_date: Optional[date] = None):
+        self.query_cache.clear()
+        daily_stats.invalidate(start_date, end_date, source=self.name)
+
+    def load_dataframe(self, df: pd.DataFrame, replace: bool = False) -> int:
+        """
+        Cargar filas con las 5 columnas estándar (p.ej. exportadas de SQL Server)
+
+        Returns:
+            int: Filas insertadas
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        rows = pd.DataFrame({
+            'usuarios': df['asesor'].to_numpy(),
+            'fecha_hora': pd.to_datetime(df['hora_inicio_contrata']).dt.strftime(SQLITE_TIMESTAMP_FORMAT),
+            'fecha': pd.to_datetime(df['fecha']).dt.strftime('%Y-%m-%d'),
+            'tme': pd.to_numeric(df['tme'], errors='coerce'),
+            'tmo': pd.to_numeric(df['tmo'], errors='coerce')
+        })
+        with self.engine.begin() as conn:
+            rows.to_sql(self.table_name, conn, if_exists='replace' if replace else 'append',
+                        index=False, chunksize=self.stream_chunk_size)
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_{self.table_name}_fecha ON {self.table_name} (fecha, fecha_hora)"
+            ))
+        if replace:
+            self.invalidate_query_cache()
+        elif len(df):
+            self.invalidate_query_cache(*_date_span(df))
+        return len(rows)
+
+    def _where(self, campaign_filter: Optional[str], after_fecha_hora: Optional[datetime] = None) -> str:
+        if campaign_filter and any(char in campaign_filter for char in [';', '--', '/*', '*/']):
+            raise ValueError("Filtro de campaña contiene caracteres no permitidos")
+        where_clause = "WHERE fecha >= :start_date AND fecha <= :end_date"
+        if campaign_filter:
+            where_clause += f" AND {campaign_filter}"
+        if after_fecha_hora is not None:
+            where_clause += " AND fecha_hora > :after_fecha_hora"
+        return where_clause
+
+    @staticmethod
+    def _params(start_date: date, end_date: date, after_fecha_hora: Optional[datetime] = None) -> Dict[str, Any]:
+        params = {'start_date': start_date.isoformat(), 'end_date': end_date.isoformat()}
+        if after_fecha_hora is not None:
+            params['after_fecha_hora'] = pd.Timestamp(after_fecha_hora).strftime(SQLITE_TIMESTAMP_FORMAT)
+        return params
+
+    def _select(self, where_clause: str, limit: Optional[int] = None) -> str:
+        return f"""
+            SELECT usuarios AS asesor, fecha_hora AS hora_inicio_contrata, fecha, tme, tmo
+            FROM {self.table_name}
+            {where_clause}
+            ORDER BY fecha, fecha_hora
+            {f'LIMIT {limit}' if limit else ''}
+        """
+
+    def get_campaign_data(self, start_date: date, end_date: date,
+                          campaign_filter: Optional[str] = None) -> pd.DataFrame:
+        query = text(self._select(self._where(campaign_filter), self.max_records))
+        df = query_metrics.read_frame(self.engine, 'campaign_data', query, self._params(start_date, end_date))
+        logger.info(f"📊 Datos obtenidos ({self.name}): {len(df)} registros")
+        return compact_call_frame(df)
+
+    def iter_campaign_data(self, start_date: date, end_date: date,
+                           campaign_filter: Optional[str] = None,
+                           page_size: Optional[int] = None,
+                           chunk_size: Optional[int] = None,
+                           after_fecha_hora: Optional[datetime] = None) -> Iterator[pd.DataFrame]:
+        # Un cursor SQLite ya entrega por bloques: no hace falta paginar por clave
+        query = text(self._select(self._where(campaign_filter, after_fecha_hora)))
+        for chunk in query_metrics.iter_frames(self.engine, 'campaign_data_page', query,
+                                               self._params(start_date, end_date, after_fecha_hora),
+                                               chunk_size=chunk_size or self.stream_chunk_size):
+            yield compact_call_frame(chunk)
+
+    def get_call_aggregates(self, start_date: date, end_date: date,
+                            answer_time_target: int = 20) -> CallAggregates:
+        """Agregados en la base local (un GROUP BY por nivel: SQLite no tiene GROUPING SETS)"""
+        where_clause = self._where(None)
+        measures = """
+            COUNT(*) AS llamadas,
+            SUM(tmo) AS tmo_suma,
+            SUM(tmo * tmo) AS tmo_suma_cuadrados,
+            SUM(tme) AS tme_suma,
+            SUM(tme * tme) AS tme_suma_cuadrados,
+            SUM(CASE WHEN tme <= :answer_time_target THEN 1 ELSE 0 END) AS atendidas_en_objetivo,
+            COUNT(DISTINCT usuarios) AS asesores
+        """
+        aggregates_query = text(f"""
+            WITH detalle AS (
+                SELECT
+                    date(fecha_hora) AS dia,
+                    CAST(strftime('%H', fecha_hora) AS INTEGER) AS hora,
+                    (CAST(strftime('%H', fecha_hora) AS INTEGER) * 60
+                     + CAST(strftime('%M', fecha_hora) AS INTEGER)) / :interval_minutes AS intervalo,
+                    usuarios,
+                    CAST(tmo AS REAL) AS tmo,
+                    CAST(tme AS REAL) AS tme
+                FROM {self.table_name}
+                {where_clause}
+            )
+            SELECT 2 AS nivel, dia, NULL AS hora, intervalo, {measures} FROM detalle GROUP BY dia, intervalo
+            UNION ALL
+            SELECT 3 AS nivel, dia, NULL AS hora, NULL AS intervalo, {measures} FROM detalle GROUP BY dia
+            UNION ALL
+            SELECT 5 AS nivel, NULL AS dia, hora, NULL AS intervalo, {measures} FROM detalle GROUP BY hora
+            UNION ALL
+            SELECT 7 AS nivel, NULL AS dia, NULL AS hora, NULL AS intervalo, {measures} FROM detalle
+        """)
+        histogram_query = text(f"""
+            SELECT metrica, segundos, COUNT(*) AS llamadas
+            FROM (
+                SELECT 'tmo' AS metrica,
+                       CASE WHEN tmo < 0 THEN 0 WHEN tmo > :max_seconds THEN :max_seconds
+                            ELSE CAST(tmo AS INTEGER) END AS segundos
+                FROM {self.table_name} {where_clause} AND tmo IS NOT NULL
+                UNION ALL
+                SELECT 'tme' AS metrica,
+                       CASE WHEN tme < 0 THEN 0 WHEN tme > :max_seconds THEN :max_seconds
+                            ELSE CAST(tme AS INTEGER) END AS segundos
+                FROM {self.table_name} {where_clause} AND tme IS NOT NULL
+            ) duraciones
+            GROUP BY metrica, segundos
+        """)
+
+        params = self._params(start_date, end_date)
+        grouped = query_metrics.read_frame(self.engine, 'interval_aggregates', aggregates_query, {
+            **params, 'interval_minutes': 15, 'answer_time_target': answer_time_target
+        })
+        histograms = query_metrics.read_frame(self.engine, 'duration_histograms', histogram_query,
+                                              {**params, 'max_seconds': HISTOGRAM_MAX_SECONDS})
+
+        aggregates = CallAggregates.from_sql_frames(split_grouping_sets(grouped, histograms), answer_time_target)
+        aggregates.source = self.name
+        return aggregates
+
+    def get_available_date_range(self, use_cache: bool = True) -> Dict[str, Any]:
+        query = f"""
+            SELECT MIN(fecha) AS fecha_min, MAX(fecha) AS fecha_max,
+                   COUNT(*) AS total_registros, COUNT(DISTINCT usuarios) AS total_asesores
+            FROM {self.table_name}
+        """
+
+        def run_query() -> Dict[str, Any]:
+            row = query_metrics.read_frame(self.engine, 'available_date_range', text(query)).iloc[0]
+            return {
+                'fecha_min': pd.to_datetime(row['fecha_min']).date() if row['fecha_min'] else None,
+                'fecha_max': pd.to_datetime(row['fecha_max']).date() if row['fecha_max'] else None,
+                'total_registros': int(row['total_registros']),
+                'total_asesores': int(row['total_asesores'])
+            }
+
+        if not use_cache:
+            return run_query()
+        return dict(self.query_cache.get_or_compute(self.query_cache.make_key(query), run_query))
+
+    def get_campaign_summary(self, days_back: int = 30, use_cache: bool = True) -> Dict[str, Any]:
+        days_back = min(days_back, 365)
+        query = f"""
+            SELECT COUNT(*) AS total_llamadas, COUNT(DISTINCT usuarios) AS asesores_activos,
+                   AVG(CAST(tmo AS REAL)) AS tmo_promedio, AVG(CAST(tme AS REAL)) AS tme_promedio,
+                   MIN(fecha) AS fecha_min, MAX(fecha) AS fecha_max
+            FROM {self.table_name}
+            WHERE fecha >= date('now', :days_back)
+        """
+        params = {'days_back': f"-{days_back} days"}
+
+        def run_query() -> Dict[str, Any]:
+            row = query_metrics.read_frame(self.engine, 'campaign_summary', text(query), params).iloc[0]
+            if not row['total_llamadas']:
+                return {}
+            return {
+                'total_llamadas': int(row['total_llamadas']),
+                'asesores_activos': int(row['asesores_activos']),
+                'tmo_promedio': float(row['tmo_promedio'] or 0),
+                'tme_promedio': float(row['tme_promedio'] or 0),
+                'fecha_min': row['fecha_min'],
+                'fecha_max': row['fecha_max']
+            }
+
+        if not use_cache:
+            return run_query()
+        return dict(self.query_cache.get_or_compute(self.query_cache.make_key(query, params), run_query))
+
+class ParquetDataSource:
+    """Particiones Parquet por fecha (mismo formato que CallHistoryCache), solo lectura"""
+
+    name = 'parquet'
+
+    def __init__(self, directory: Optional[str] = None):
+        self.cache = CallHistoryCache(directory or os.getenv('DATA_SOURCE_PARQUET_DIR', str(DEFAULT_PARQUET_DIR)))
+        self.stream_chunk_size = int(os.getenv('STREAM_CHUNK_SIZE', '50000'))
+        self.query_cache = _new_query_cache()
+
+    def warm_up(self):
+        return None
+
+    def invalidate_query_cache(self, start_date: Optional[date] = None, end_date: Optional[date] = None):
+        self.query_cache.clear()
+        daily_stats.invalidate(start_date, end_date, source=self.name)
+
+    def load_dataframe(self, df: pd.DataFrame) -> int:
+        """Agregar filas con las 5 columnas estándar a sus particiones"""
+        rows = self.cache.append(df)
+        if len(df):
+            self.invalidate_query_cache(*_date_span(df))
+        return rows
+
+    @staticmethod
+    def _check_filter(campaign_filter: Optional[str]):
+        if campaign_filter:
+            raise ValueError("La fuente Parquet no admite filtros SQL de campaña")
+
+    def get_campaign_data(self, start_date: date, end_date: date,
+                          campaign_filter: Optional[str] = None) -> pd.DataFrame:
+        self._check_filter(campaign_filter)
+        df = self.cache.read(start_date, end_date)
+        df = df.sort_values(['fecha', 'hora_inicio_contrata'], kind='stable', ignore_index=True)
+        logger.info(f"📊 Datos obtenidos ({self.name}): {len(df)} registros")
+        return compact_call_frame(df)
+
+    def iter_campaign_data(self, start_date: date, end_date: date,
+                           campaign_filter: Optional[str] = None,
+                           page_size: Optional[int] = None,
+                           chunk_size: Optional[int] = None,
+                           after_fecha_hora: Optional[datetime] = None) -> Iterator[pd.DataFrame]:
+        self._check_filter(campaign_filter)
+        for batch in self.cache.iter_batches(start_date, end_date, batch_rows=chunk_size or self.stream_chunk_size):
+            if after_fecha_hora is not None:
+                batch = batch[batch['hora_inicio_contrata'] > pd.Timestamp(after_fecha_hora)]
+            if len(batch):
+                yield compact_call_frame(batch)
+
+    def get_call_aggregates(self, start_date: date, end_date: date,
+                            answer_time_target: int = 20) -> CallAggregates:
+        aggregates = self.cache.aggregate(start_date, end_date, answer_time_target)
+        aggregates.source = self.name
+        return aggregates
+
+    def get_available_date_range(self, use_cache: bool = True) -> Dict[str, Any]:
+        def run_query() -> Dict[str, Any]:
+            df = self.cache.read(date.min, date.max, columns=['fecha', 'asesor'])
+            return {
+                'fecha_min': df['fecha'].min() if len(df) else None,
+                'fecha_max': df['fecha'].max() if len(df) else None,
+                'total_registros': len(df),
+                'total_asesores': int(df['asesor'].nunique())
+            }
+
+        if not use_cache:
+            return run_query()
+        return dict(self.query_cache.get_or_compute(self.query_cache.make_key('date_range'), run_query))
+
+    def get_campaign_summary(self, days_back: int = 30, use_cache: bool = True) -> Dict[str, Any]:
+        days_back = min(days_back, 365)
+
+        def run_query() -> Dict[str, Any]:
+            df = self.cache.read(date.today() - timedelta(days=days_back), date.max)
+            if len(df) == 0:
+                return {}
+            return {
+                'total_llamadas': len(df),
+                'asesores_activos': int(df['asesor'].nunique()),
+                'tmo_promedio': float(df['tmo'].mean()),
+                'tme_promedio': float(df['tme'].mean()),
+                'fecha_min': df['fecha'].min(),
+                'fecha_max': df['fecha'].max()
+            }
+
+        if not use_cache:
+            return run_query()
+        return dict(self.query_cache.get_or_compute(
+            self.query_cache.make_key('campaign_summary', {'days_back': days_back}), run_query
+        ))
+
+def _sql_server_source():
+    from data.sql_connector import sql_connector
+    return sql_connector
+
+DATA_SOURCES = {
+    'sqlserver': _sql_server_source,
+    'sqlite': SQLiteDataSource,
+    'parquet': ParquetDataSource
+}
+
+_instances: Dict[str, Any] = {}
+
+def get_data_source(name: Optional[str] = None):
+    """Fuente de datos compartida del proceso (por defecto DATA_SOURCE)"""
+    name = name or os.getenv('DATA_SOURCE', 'sqlserver')
+    if name not in DATA_SOURCES:
+        raise ValueError(f"Fuente de datos desconocida: {name}. Opciones: {list(DATA_SOURCES)}")
+    if name not in _instances:
+        _instances[name] = DATA_SOURCES[name]()
+    return _instances[name]
+
+def copy_campaign_data(source, target, start_date: date, end_date: date) -> int:
+    """
+    Copiar el historial entre fuentes por bloques (p.ej. SQL Server -> SQLite/Parquet local)
+
+    Returns:
+        int: Filas copiadas
+    """
+    rows = 0
+    start = time.perf_counter()
+    for chunk in source.iter_campaign_data(start_date, end_date):
+        rows += target.load_dataframe(chunk)
+    logger.info(f"📦 {rows:,} filas copiadas a {target.name} en {time.perf_counter() - start:.2f}s")
+    return rows
+
+def benchmark_data_sources(start_date: date, end_date: date, names: Optional[List[str]] = None,
+                           answer_time_target: int = 20, repeats: int = 3) -> Dict[str, Dict]:
+    """
+    Comparar latencias de las fuentes configuradas sobre el mismo rango
+
+    Returns:
+        Dict por fuente con la mejor latencia (s) de cada operación y el total de llamadas
+    """
+    results = {}
+    for name in names or list(DATA_SOURCES):
+        source = get_data_source(name)
+        timings = {}
+        operations = {
+            'date_range': lambda: source.get_available_date_range(use_cache=False),
+            'call_aggregates': lambda: source.get_call_aggregates(start_date, end_date, answer_time_target),
+            'stream': lambda: sum(len(chunk) for chunk in source.iter_campaign_data(start_date, end_date))
+        }
+        for operation, run in operations.items():
+            best = float('inf')
+            for _ in range(repeats):
+                start = time.perf_counter()
+                value = run()
+                best = min(best, time.perf_counter() - start)
+            timings[operation] = round(best, 4)
+            if operation == 'call_aggregates':
+                timings['total_calls'] = value.total_calls
+        results[name] = timings
+        logger.info(f"⏱️ {name}: {timings}")
+    return results
+
+if __name__ == "__main__":
+    days = int(os.getenv('BENCHMARK_DAYS', '90'))
+    reference = get_data_source().get_available_date_range()
+    end = pd.to_datetime(reference['fecha_max']).date()
+    print(benchmark_data_sources(end - timedelta(days=days - 1), end))
@@ -0,0 +1,308 @@
+"""
+Matriz de demanda normalizada por día (días x intervalos de 15 minutos)
+
+Agrupar el período completo por hora infla las "llamadas por hora" con la
+cantidad de días y toma los percentiles entre horas en vez de entre días. La
+matriz guarda llamadas y sumas de TMO por (fecha, intervalo) en una sola pasada
+vectorizada (o desde un GROUP BY hecho en SQL Server); promedios, percentiles por intervalo entre días y perfiles por día
+de semana son cortes baratos de la matriz.
+
+El calendario es continuo, así que los días sin operación (fines de semana, feriados)
+son filas en cero: los promedios y percentiles entre días se toman solo sobre los días
+operativos (con tráfico) para no diluir la demanda de los días abiertos.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from data.call_frame import CallFeatures
+
+logger = logging.getLogger(__name__)
+
+WEEKDAY_NAMES = ['lunes', 'martes', 'miércoles', 'jueves', 'viernes', 'sábado', 'domingo']
+
+@dataclass
+class DemandMatrix:
+    """Llamadas y sumas de TMO/TME por (día, intervalo)"""
+    dates: np.ndarray          # Fechas (datetime64[D]) de cada fila, calendario continuo
+    calls: np.ndarray          # Llamadas (días x intervalos)
+    aht_sum: np.ndarray        # Suma de TMO en segundos (días x intervalos)
+    aht_sq_sum: np.ndarray     # Suma de TMO² para la desviación estándar
+    interval_minutes: int = 15
+    wait_sum: Optional[np.ndarray] = None       # Suma de TME en segundos
+    wait_sq_sum: Optional[np.ndarray] = None    # Suma de TME²
+    answered_in_target: Optional[np.ndarray] = None  # Llamadas con TME <= tiempo objetivo
+    agents: Optional[np.ndarray] = None         # Asesores distintos en cada celda (no sumable)
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, interval_minutes: int = 15,
+                       answer_time_target: Optional[float] = None) -> 'DemandMatrix':
+        """
+        Construir la matriz en una sola pasada (np.bincount sobre índice plano día x intervalo)
+
+        Args:
+            df: DataFrame con columnas 'hora_inicio_contrata' y 'tmo' ('tme' y 'asesor' opcionales)
+            interval_minutes: Duración de cada intervalo (debe dividir 24h)
+            answer_time_target: Si se indica, cuenta además las llamadas atendidas en objetivo
+        """
+        features = CallFeatures.from_dataframe(df, interval_minutes)
+        matrix = cls.from_features(features, answer_time_target)
+        if features.agent_codes is not None and matrix.num_days:
+            matrix.agents = features.distinct_agents()['cells']
+        return matrix
+
+    @classmethod
+    def from_features(cls, features: CallFeatures, answer_time_target: Optional[float] = None) -> 'DemandMatrix':
+        """
+        Conteos y sumas por celda desde columnas ya derivadas (sin asesores distintos)
+
+        Args:
+            features: CallFeatures de las filas
+            answer_time_target: Si se indica, cuenta además las llamadas atendidas en objetivo
+        """
+        if features.rows == 0:
+            return cls.empty(features.interval_minutes)
+
+        size = features.num_days * features.intervals_per_day
+        shape = (features.num_days, features.intervals_per_day)
+
+        def cell_sum(weights: np.ndarray) -> np.ndarray:
+            return np.bincount(features.flat_index, weights=weights, minlength=size).reshape(shape)
+
+        tmo = np.nan_to_num(features.tmo)
+        matrix = cls(
+            dates=features.dates,
+            calls=np.bincount(features.flat_index, minlength=size).reshape(shape),
+            aht_sum=cell_sum(tmo),
+            aht_sq_sum=cell_sum(tmo * tmo),
+            interval_minutes=features.interval_minutes
+        )
+
+        if features.tme is not None:
+            tme = np.nan_to_num(features.tme)
+            matrix.wait_sum = cell_sum(tme)
+            matrix.wait_sq_sum = cell_sum(tme * tme)
+            if answer_time_target is not None:
+                matrix.answered_in_target = cell_sum((features.tme <= answer_time_target).astype(float))
+
+        return matrix
+
+    @classmethod
+    def from_interval_frame(cls, frame: pd.DataFrame, interval_minutes: int = 15) -> 'DemandMatrix':
+        """
+        Construir la matriz desde agregados ya calculados (p.ej. GROUP BY en SQL Server)
+
+        Args:
+            frame: Una fila por (dia, intervalo) con llamadas, tmo_suma, tmo_suma_cuadrados y,
+                opcionalmente, tme_suma, tme_suma_cuadrados, atendidas_en_objetivo y asesores
+        """
+        intervals_per_day = 24 * 60 // interval_minutes
+        if len(frame) == 0:
+            return cls.empty(interval_minutes)
+
+        days = pd.to_datetime(frame['dia']).to_numpy(dtype='datetime64[D]')
+        first_day = days.min()
+        num_days = int((days.max() - first_day).astype(int)) + 1
+        rows = (days - first_day).astype(np.int64)
+        columns = frame['intervalo'].to_numpy(dtype=np.int64)
+
+        def cell_values(column: str, dtype=float) -> Optional[np.ndarray]:
+            if column not in frame.columns:
+                return None
+            values = np.zeros((num_days, intervals_per_day), dtype=dtype)
+            values[rows, columns] = np.nan_to_num(frame[column].to_numpy(dtype=float))
+            return values
+
+        return cls(
+            dates=first_day + np.arange(num_days),
+            calls=cell_values('llamadas', np.int64),
+            aht_sum=cell_values('tmo_suma'),
+            aht_sq_sum=cell_values('tmo_suma_cuadrados'),
+            interval_minutes=interval_minutes,
+            wait_sum=cell_values('tme_suma'),
+            wait_sq_sum=cell_values('tme_suma_cuadrados'),
+            answered_in_target=cell_values('atendidas_en_objetivo'),
+            agents=cell_values('asesores', np.int64)
+        )
+
+    @classmethod
+    def empty(cls, interval_minutes: int = 15) -> 'DemandMatrix':
+        """Matriz sin días"""
+        empty = np.zeros((0, 24 * 60 // interval_minutes))
+        return cls(np.array([], dtype='datetime64[D]'), empty.astype(np.int64), empty, empty.copy(), interval_minutes)
+
+    def merge(self, other: 'DemandMatrix') -> 'DemandMatrix':
+        """
+        Sumar dos matrices (p.ej. de bloques distintos), alineando sus fechas
+
+        Los asesores distintos por celda no son sumables y se descartan.
+        """
+        if other.num_days == 0:
+            return self
+        if self.num_days == 0:
+            return other
+        return DemandMatrix.merge_all([self, other], self.interval_minutes)
+
+    @classmethod
+    def merge_all(cls, matrices: List['DemandMatrix'], interval_minutes: int = 15) -> 'DemandMatrix':
+        """
+        Sumar muchas matrices con una sola asignación (p.ej. resúmenes diarios de un rango)
+
+        Los asesores distintos por celda no son sumables y se descartan.
+        """
+        matrices = [matrix for matrix in matrices if matrix.num_days]
+        if not matrices:
+            return cls.empty(interval_minutes)
+
+        first_day = min(matrix.dates[0] for matrix in matrices)
+        last_day = max(matrix.dates[-1] for matrix in matrices)
+        num_days = int((last_day - first_day).astype(int)) + 1
+        intervals_per_day = matrices[0].intervals_per_day
+
+        def aligned_sum(field: str) -> Optional[np.ndarray]:
+            values = [getattr(matrix, field) for matrix in matrices]
+            if any(value is None for value in values):
+                return None
+            total = np.zeros((num_days, intervals_per_day), dtype=np.result_type(*values))
+            for matrix, value in zip(matrices, values):
+                offset = int((matrix.dates[0] - first_day).astype(int))
+                total[offset:offset + matrix.num_days] += value
+            return total
+
+        return cls(
+            dates=first_day + np.arange(num_days),
+            calls=aligned_sum('calls'),
+            aht_sum=aligned_sum('aht_sum'),
+            aht_sq_sum=aligned_sum('aht_sq_sum'),
+            interval_minutes=matrices[0].interval_minutes,
+            wait_sum=aligned_sum('wait_sum'),
+            wait_sq_sum=aligned_sum('wait_sq_sum'),
+            answered_in_target=aligned_sum('answered_in_target')
+        )
+
+    @property
+    def num_days(self) -> int:
+        return self.calls.shape[0]
+
+    @property
+    def intervals_per_day(self) -> int:
+        return self.calls.shape[1]
+
+    def _aggregate(self, values: np.ndarray, minutes: int) -> np.ndarray:
+        """Sumar columnas consecutivas para pasar a intervalos más largos (p.ej. 60 min)"""
+        factor = minutes // self.interval_minutes
+        if factor <= 1:
+            return values
+        return values.reshape(values.shape[0], -1, factor).sum(axis=2)
+
+    def calls_matrix(self, minutes: Optional[int] = None) -> np.ndarray:
+        """Llamadas (días x intervalos) con la granularidad pedida"""
+        return self._aggregate(self.calls, minutes or self.interval_minutes)
+
+    def weekday_mask(self, weekday: int) -> np.ndarray:
+        """Filas del día de semana pedido (0 = lunes)"""
+        return ((self.dates.astype('datetime64[D]').astype(np.int64) + 3) % 7) == weekday
+
+    def operating_days(self) -> np.ndarray:
+        """Máscara de días con tráfico (excluye cierres, fines de semana sin operación y feriados)"""
+        return self.calls.sum(axis=1) > 0
+
+    def _operating_calls(self, minutes: Optional[int], weekday: Optional[int]) -> np.ndarray:
+        """Llamadas de los días operativos (del día de semana pedido, si se indica)"""
+        days = self.operating_days()
+        if weekday is not None:
+            days &= self.weekday_mask(weekday)
+        return self.calls_matrix(minutes)[days]
+
+    def mean_calls(self, minutes: Optional[int] = None, weekday: Optional[int] = None) -> np.ndarray:
+        """Llamadas promedio por día operativo en cada intervalo"""
+        calls = self._operating_calls(minutes, weekday)
+        return calls.mean(axis=0) if len(calls) else np.zeros(calls.shape[1])
+
+    def percentile_calls(self, q: float, minutes: Optional[int] = None, weekday: Optional[int] = None) -> np.ndarray:
+        """Percentil q (0-100) entre días operativos de las llamadas de cada intervalo"""
+        calls = self._operating_calls(minutes, weekday)
+        return np.percentile(calls, q, axis=0) if len(calls) else np.zeros(calls.shape[1])
+
+    def weekday_profiles(self, minutes: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Perfil promedio de cada día de semana con operación en el período"""
+        operating = self.operating_days()
+        return {
+            WEEKDAY_NAMES[weekday]: self.mean_calls(minutes, weekday)
+            for weekday in range(7) if (operating & self.weekday_mask(weekday)).any()
+        }
+
+    def _profile_mean(self, values_sum: np.ndarray, minutes: Optional[int]) -> np.ndarray:
+        """Promedio por llamada de cada intervalo sobre todo el período (NaN sin llamadas)"""
+        minutes = minutes or self.interval_minutes
+        calls = self._aggregate(self.calls, minutes).sum(axis=0)
+        total = self._aggregate(values_sum, minutes).sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(calls > 0, total / calls, np.nan)
+
+    def _profile_std(self, values_sum: np.ndarray, values_sq_sum: np.ndarray, minutes: Optional[int]) -> np.ndarray:
+        """Desviación estándar muestral de cada intervalo (NaN con menos de 2 llamadas)"""
+        minutes = minutes or self.interval_minutes
+        calls = self._aggregate(self.calls, minutes).sum(axis=0)
+        total = self._aggregate(values_sum, minutes).sum(axis=0)
+        total_sq = self._aggregate(values_sq_sum, minutes).sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            variance = (total_sq - total ** 2 / calls) / (calls - 1)
+            return np.where(calls > 1, np.sqrt(np.maximum(variance, 0.0)), np.nan)
+
+    def aht(self, minutes: Optional[int] = None) -> np.ndarray:
+        """TMO promedio de cada intervalo sobre todo el período (NaN sin llamadas)"""
+        return self._profile_mean(self.aht_sum, minutes)
+
+    def aht_std(self, minutes: Optional[int] = None) -> np.ndarray:
+        """Desviación estándar muestral del TMO de cada intervalo"""
+        return self._profile_std(self.aht_sum, self.aht_sq_sum, minutes)
+
+    def wait(self, minutes: Optional[int] = None) -> np.ndarray:
+        """TME promedio de cada intervalo (requiere sumas de TME)"""
+        return self._profile_mean(self.wait_sum, minutes)
+
+    def wait_std(self, minutes: Optional[int] = None) -> np.ndarray:
+        """Desviación estándar muestral del TME de cada intervalo"""
+        return self._profile_std(self.wait_sum, self.wait_sq_sum, minutes)
+
+    def average_aht(self) -> float:
+        """TMO promedio ponderado de todo el período"""
+        total_calls = self.calls.sum()
+        return float(self.aht_sum.sum() / total_calls) if total_calls else 0.0
+
+    def operating_intervals(self, minutes: Optional[int] = None) -> np.ndarray:
+        """Máscara de intervalos con tráfico en algún día del período"""
+        return self.calls_matrix(minutes).sum(axis=0) > 0
+
+    def daily_mean_volume(self, minutes: Optional[int] = None) -> np.ndarray:
+        """Volumen promedio por intervalo operativo de cada día operativo (un valor por día)"""
+        calls = self._operating_calls(minutes, None)
+        operating = self.operating_intervals(minutes)
+        if not operating.any():
+            return np.zeros(0)
+        return calls[:, operating].mean(axis=1)
+
+    def interval_profile(self, minutes: Optional[int] = None) -> Dict[int, Dict]:
+        """Perfil {intervalo: {'llamadas' (total del período), 'tmo_promedio', 'tmo_std'}} con tráfico"""
+        calls = self.calls_matrix(minutes).sum(axis=0)
+        aht = self.aht(minutes)
+        aht_std = self.aht_std(minutes)
+        return {
+            int(slot): {
+                'llamadas': int(calls[slot]),
+                'tmo_promedio': round(float(aht[slot]), 2),
+                'tmo_std': round(float(aht_std[slot]), 2) if not np.isnan(aht_std[slot]) else float('nan')
+            }
+            for slot in np.flatnonzero(calls)
+        }
+
+    def memory_bytes(self) -> int:
+        """Memoria ocupada por las matrices"""
+        arrays = (self.dates, self.calls, self.aht_sum, self.aht_sq_sum,
+                  self.wait_sum, self.wait_sq_sum, self.answered_in_target, self.agents)
+        return int(sum(values.nbytes for values in arrays if values is not None))
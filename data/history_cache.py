@@ -0,0 +1,272 @@
+"""
+Caché local columnar (Parquet) del historial de llamadas
+
+El historial se guarda particionado por fecha (fecha=YYYY-MM-DD/part-*.parquet)
+y se sincroniza con SQL Server una sola vez; las ejecuciones siguientes solo
+traen filas con fecha_hora posterior a la marca de agua (MAX(fecha_hora) ya
+guardado). Cada sincronización escribe en _staging/ y publica los archivos en sus
+particiones junto con la nueva marca de agua solo si termina completa. Los análisis
+sobre rangos cacheados leen únicamente las particiones y columnas necesarias.
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Agregar paths
+sys.path.append(str(Path(__file__).parent.parent))
+
+from data.call_aggregates import CallAggregates, CallAggregatesAccumulator
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path(__file__).parent.parent / 'cache' / 'call_history'
+STATE_FILE = '_watermark.json'  # Los archivos con prefijo '_' no forman parte del dataset
+STAGING_DIR = '_staging'        # Filas de una sincronización en curso (tampoco forman parte)
+CACHED_COLUMNS = ['asesor', 'hora_inicio_contrata', 'tme', 'tmo']
+OPEN_END_DATE = date(9999, 12, 31)
+BATCH_ROWS = 1_000_000
+
+class CallHistoryCache:
+    """Historial de llamadas en Parquet particionado por fecha con sincronización incremental"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = Path(directory or os.getenv('HISTORY_CACHE_DIR', str(DEFAULT_CACHE_DIR)))
+        # Intervalo mínimo entre consultas de sincronización a SQL Server
+        self.sync_interval = float(os.getenv('HISTORY_CACHE_SYNC_SECONDS', '300'))
+        self._lock = threading.Lock()
+        self._last_sync = 0.0
+
+    @property
+    def _state_path(self) -> Path:
+        return self.directory / STATE_FILE
+
+    def state(self) -> Dict:
+        """Estado del caché: fecha inicial cubierta, marca de agua y filas guardadas"""
+        if not self._state_path.exists():
+            return {}
+        return json.loads(self._state_path.read_text())
+
+    def _write_state(self, state: Dict):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        temp_path = self._state_path.with_suffix('.tmp')
+        temp_path.write_text(json.dumps(state, indent=2, default=str))
+        temp_path.replace(self._state_path)
+
+    def _write_chunk(self, df: pd.DataFrame, directory: Optional[Path] = None) -> Optional[pd.Timestamp]:
+        """Escribir un bloque en sus particiones de fecha; retorna el máximo fecha_hora del bloque"""
+        if len(df) == 0:
+            return None
+
+        for day, rows in df.groupby(pd.to_datetime(df['fecha']).dt.date):
+            partition = (directory or self.directory) / f"fecha={day.isoformat()}"
+            partition.mkdir(parents=True, exist_ok=True)
+            # Tipos fijos en disco: asesor sin diccionario y duraciones float64 en todos los archivos
+            table = pa.Table.from_pandas(pd.DataFrame({
+                'asesor': np.asarray(rows['asesor']),
+                'hora_inicio_contrata': rows['hora_inicio_contrata'],
+                'tme': rows['tme'].astype(np.float64),
+                'tmo': rows['tmo'].astype(np.float64)
+            }), preserve_index=False)
+
+            # Escritura atómica: los archivos con prefijo '.' no son visibles para el dataset
+            name = f"part-{uuid.uuid4().hex}.parquet"
+            pq.write_table(table, partition / f".{name}")
+            (partition / f".{name}").replace(partition / name)
+
+        return pd.to_datetime(df['hora_inicio_contrata']).max()
+
+    def append(self, df: pd.DataFrame) -> int:
+        """Agregar filas a sus particiones sin tocar la marca de agua (cargas manuales)"""
+        self._write_chunk(df)
+        return len(df)
+
+    def _fetch(self, connector, start_date: date, end_date: date,
+               after_fecha_hora: Optional[datetime] = None) -> Dict:
+        """Traer filas de SQL Server por bloques y guardarlas en el área de preparación"""
+        rows, watermark = 0, None
+        for chunk in connector.iter_campaign_data(start_date, end_date, after_fecha_hora=after_fecha_hora):
+            chunk_max = self._write_chunk(chunk, self.directory / STAGING_DIR)
+            rows += len(chunk)
+            if chunk_max is not None and (watermark is None or chunk_max > watermark):
+                watermark = chunk_max
+        return {'rows': rows, 'watermark': watermark}
+
+    def _discard_staging(self):
+        """Eliminar las filas preparadas por una sincronización incompleta"""
+        import shutil
+        shutil.rmtree(self.directory / STAGING_DIR, ignore_errors=True)
+
+    def _publish_staging(self):
+        """Mover los archivos preparados a sus particiones (cada archivo se mueve de forma atómica)"""
+        staging = self.directory / STAGING_DIR
+        for path in sorted(staging.glob('fecha=*/*.parquet')):
+            partition = self.directory / path.parent.name
+            partition.mkdir(parents=True, exist_ok=True)
+            path.replace(partition / path.name)
+        self._discard_staging()
+
+    def sync(self, connector, start_date: date) -> int:
+        """
+        Sincronizar el caché con SQL Server
+
+        La primera vez trae todo desde start_date; si se pide una fecha anterior a
+        la cubierta, completa hacia atrás; en cualquier caso trae las filas con
+        fecha_hora posterior a la marca de agua.
+
+        Returns:
+            int: Filas nuevas guardadas
+        """
+        source_cache = getattr(connector, 'cache', None)
+        if isinstance(source_cache, CallHistoryCache) and source_cache.directory.resolve() == self.directory.resolve():
+            raise ValueError(f"La fuente {getattr(connector, 'name', connector)} usa el mismo directorio que el "
+                             f"caché de historial ({self.directory}): sincronizar duplicaría sus filas")
+
+        with self._lock:
+            state = self.state()
+            watermark = pd.Timestamp(state['watermark']) if state.get('watermark') else None
+            start = time.perf_counter()
+            new_rows = 0
+            # Primera fecha que pudo recibir filas nuevas (sus resúmenes diarios cambian)
+            changed_since = None
+
+            # Las filas se escriben en un área de preparación y se publican solo si la
+            # sincronización completa termina: un fallo a mitad no deja filas que la
+            # siguiente sincronización volvería a traer (y duplicaría)
+            self._discard_staging()
+            try:
+                if not state.get('start_date'):
+                    logger.info(f"💾 Poblando caché de historial desde {start_date}...")
+                    fetched = self._fetch(connector, start_date, OPEN_END_DATE)
+                    new_rows += fetched['rows']
+                    watermark = fetched['watermark']
+                    state['start_date'] = start_date.isoformat()
+                    changed_since = start_date
+
+                else:
+                    cached_start = date.fromisoformat(state['start_date'])
+                    if start_date < cached_start:
+                        logger.info(f"💾 Completando caché hacia atrás: {start_date} - {cached_start - timedelta(days=1)}")
+                        fetched = self._fetch(connector, start_date, cached_start - timedelta(days=1))
+                        new_rows += fetched['rows']
+                        if watermark is None:
+                            watermark = fetched['watermark']
+                        state['start_date'] = start_date.isoformat()
+                        if fetched['rows']:
+                            changed_since = start_date
+
+                    if watermark is not None:
+                        fetched = self._fetch(connector, watermark.date(), OPEN_END_DATE, after_fecha_hora=watermark.to_pydatetime())
+                        new_rows += fetched['rows']
+                        if fetched['watermark'] is not None:
+                            if changed_since is None:
+                                changed_since = watermark.date()
+                            watermark = max(watermark, fetched['watermark'])
+            except BaseException:
+                self._discard_staging()
+                raise
+            self._publish_staging()
+
+            state.update({
+                'watermark': watermark.isoformat() if watermark is not None else None,
+                'rows': int(state.get('rows', 0)) + new_rows,
+                'synced_at': datetime.now().isoformat(timespec='seconds')
+            })
+            self._write_state(state)
+            self._last_sync = time.monotonic()
+            if new_rows:
+                # Los totales de metadatos (rango de fechas, resúmenes) y los resúmenes
+                # diarios de las fechas con filas nuevas cambiaron
+                connector.invalidate_query_cache(start_date=changed_since)
+
+            logger.info(f"✅ Caché sincronizado: {new_rows:,} filas nuevas | marca de agua {state['watermark']} | "
+                        f"{time.perf_counter() - start:.2f}s")
+            return new_rows
+
+    def ensure(self, connector, start_date: date) -> bool:
+        """
+        Sincronizar solo si el rango no está cubierto o pasó HISTORY_CACHE_SYNC_SECONDS
+
+        Returns:
+            bool: True si se consultó SQL Server
+        """
+        state = self.state()
+        covered = bool(state.get('start_date')) and date.fromisoformat(state['start_date']) <= start_date
+        if covered and time.monotonic() - self._last_sync < self.sync_interval:
+            return False
+        self.sync(connector, start_date)
+        return True
+
+    def _dataset(self) -> Optional[ds.Dataset]:
+        # Sin particiones (p.ej. tras una primera sincronización fallida) no hay esquema que inferir
+        if not self.directory.exists() or next(self.directory.glob('fecha=*'), None) is None:
+            return None
+        return ds.dataset(
+            self.directory, format='parquet',
+            partitioning=ds.partitioning(pa.schema([('fecha', pa.date32())]), flavor='hive')
+        )
+
+    def iter_batches(self, start_date: date, end_date: date, columns: Optional[List[str]] = None,
+                     batch_rows: int = BATCH_ROWS) -> Iterator[pd.DataFrame]:
+        """
+        Recorrer las filas del rango leyendo solo sus particiones y las columnas pedidas
+
+        Los lotes de cada archivo se agrupan hasta batch_rows filas para no pagar
+        la sobrecarga por lote en archivos pequeños.
+        """
+        dataset = self._dataset()
+        if dataset is None:
+            return
+        date_filter = (ds.field('fecha') >= start_date) & (ds.field('fecha') <= end_date)
+        pending, pending_rows = [], 0
+        for batch in dataset.to_batches(columns=columns or ['fecha'] + CACHED_COLUMNS, filter=date_filter):
+            pending.append(batch)
+            pending_rows += batch.num_rows
+            if pending_rows >= batch_rows:
+                yield pa.Table.from_batches(pending).to_pandas()
+                pending, pending_rows = [], 0
+        if pending_rows:
+            yield pa.Table.from_batches(pending).to_pandas()
+
+    def read(self, start_date: date, end_date: date, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Leer el rango completo como DataFrame"""
+        dataset = self._dataset()
+        columns = columns or ['fecha'] + CACHED_COLUMNS
+        if dataset is None:
+            return pd.DataFrame(columns=columns)
+        date_filter = (ds.field('fecha') >= start_date) & (ds.field('fecha') <= end_date)
+        return dataset.to_table(columns=columns, filter=date_filter).to_pandas()
+
+    def aggregate(self, start_date: date, end_date: date, answer_time_target: int = 20) -> CallAggregates:
+        """Agregados del rango plegando los lotes Parquet (memoria acotada)"""
+        accumulator = CallAggregatesAccumulator(answer_time_target)
+        for batch in self.iter_batches(start_date, end_date, columns=CACHED_COLUMNS):
+            accumulator.add(batch)
+        aggregates = accumulator.result()
+        aggregates.source = 'cache'
+        return aggregates
+
+    def clear(self):
+        """Eliminar el caché completo"""
+        import shutil
+        with self._lock:
+            if self.directory.exists():
+                shutil.rmtree(self.directory)
+            self._last_sync = 0.0
+        logger.info(f"🗑️ Caché de historial eliminado: {self.directory}")
+
+# Instancia global
+history_cache = CallHistoryCache()
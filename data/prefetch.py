@@ -0,0 +1,98 @@
+"""
+Precarga concurrente de las consultas iniciales del dashboard
+
+Después del login se lanzan en paralelo (un hilo y una conexión del pool cada una)
+el rango de fechas disponible y el resumen de campaña; en cuanto llega el rango se
+precargan los agregados del período por defecto en DataAnalyzer. Al entrar al
+dashboard la espera es la de la consulta más lenta, no la suma de todas.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# Agregar paths
+sys.path.append(str(Path(__file__).parent.parent))
+
+logger = logging.getLogger(__name__)
+
+class DashboardPrefetcher:
+    """Rango de fechas, resumen y agregados por defecto consultados en paralelo"""
+
+    def __init__(self, data_source=None, analyzer=None, max_workers: Optional[int] = None,
+                 summary_days: Optional[int] = None, answer_time_target: int = 20):
+        if data_source is None:
+            from data.data_sources import get_data_source
+            data_source = get_data_source()
+        self.data_source = data_source
+        self.analyzer = analyzer
+        self.max_workers = max_workers or int(os.getenv('PREFETCH_MAX_WORKERS', '3'))
+        self.summary_days = summary_days or int(os.getenv('PREFETCH_SUMMARY_DAYS', '30'))
+        self.answer_time_target = answer_time_target
+        self.timings: Dict[str, float] = {}
+        self._futures: Dict[str, Future] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._started_at = 0.0
+        self._lock = threading.Lock()
+
+    def _timed(self, name: str, function, *args):
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            with self._lock:
+                self.timings[name] = round(time.perf_counter() - start, 4)
+
+    def start(self) -> 'DashboardPrefetcher':
+        """Lanzar las consultas en segundo plano (no bloquea)"""
+        self._started_at = time.perf_counter()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='prefetch')
+        self._futures['date_range'] = self._executor.submit(
+            self._timed, 'date_range', self.data_source.get_available_date_range
+        )
+        self._futures['summary'] = self._executor.submit(
+            self._timed, 'summary', self.data_source.get_campaign_summary, self.summary_days
+        )
+        self._futures['date_range'].add_done_callback(self._prefetch_default_period)
+        logger.info(f"⚡ Precarga del dashboard iniciada ({self.max_workers} hilos)")
+        return self
+
+    def _prefetch_default_period(self, date_range_future: Future):
+        """Al conocer el rango disponible, precargar los agregados del período por defecto"""
+        try:
+            date_range = date_range_future.result()
+            if self.analyzer is None:
+                from data.data_analyzer import data_analyzer
+                self.analyzer = data_analyzer
+            if date_range and date_range.get('fecha_min') and date_range.get('fecha_max'):
+                self._futures['aggregates'] = self.analyzer.prefetch_aggregates(
+                    date_range['fecha_min'], date_range['fecha_max'], self.answer_time_target,
+                    executor=self._executor
+                )
+        except Exception as e:
+            logger.warning(f"⚠️ Precarga de agregados omitida: {e}")
+        finally:
+            # Sin más tareas: los hilos terminan cuando se vacía la cola
+            self._executor.shutdown(wait=False)
+
+    def result(self, name: str, timeout: Optional[float] = None) -> Any:
+        """Esperar el resultado de una consulta ('date_range' o 'summary'); propaga su error"""
+        value = self._futures[name].result(timeout=timeout)
+        logger.info(f"⚡ {name} disponible a {time.perf_counter() - self._started_at:.2f}s del login")
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        """Duración de cada consulta y estado de la precarga"""
+        with self._lock:
+            return {
+                'timings': dict(self.timings),
+                'pending': [name for name, future in self._futures.items() if not future.done()]
+            }
+
+def prefetch_enabled() -> bool:
+    return os.getenv('DASHBOARD_PREFETCH_ENABLED', 'true').lower() == 'true'
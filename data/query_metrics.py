@@ -0,0 +1,204 @@
+"""
+Métricas por consulta SQL
+
+Cada consulta registra, bajo una etiqueta (p.ej. 'campaign_data', 'interval_aggregates'):
+
+- connect: espera para obtener una conexión del pool
+- execute: ejecución en el servidor hasta tener el cursor
+- fetch: transferencia de filas desde el driver (fetchmany)
+- frame: construcción de los DataFrames en pandas
+- filas y bytes aproximados del resultado
+
+Las mediciones se guardan en un buffer circular (QUERY_METRICS_BUFFER_SIZE) y se
+emiten como registros de log con el diccionario completo en extra['query_metric'],
+para que un handler JSON o un exportador de métricas las consuma sin parsear texto.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Valores de texto muestreados por columna para estimar bytes
+BYTES_SAMPLE_SIZE = 1000
+
+def approximate_bytes(df: pd.DataFrame) -> int:
+    """Bytes aproximados del DataFrame: exactos para columnas numéricas, por muestreo para texto"""
+    total = 0
+    for column in df.columns:
+        values = df[column]
+        if not (pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values)):
+            total += int(values.memory_usage(index=False, deep=False))
+            continue
+        sample = values.iloc[:BYTES_SAMPLE_SIZE]
+        if len(sample):
+            average = sum(len(str(value)) for value in sample if value is not None) / len(sample)
+            total += int(average * len(values)) + values.size * 8
+    return total
+
+@dataclass
+class QueryMetric:
+    """Medición de una consulta (tiempos en segundos)"""
+    label: str
+    started_at: str = field(default_factory=lambda: datetime.now().isoformat(timespec='milliseconds'))
+    sequence: int = 0
+    connect_seconds: float = 0.0
+    execute_seconds: float = 0.0
+    fetch_seconds: float = 0.0
+    frame_seconds: float = 0.0
+    total_seconds: float = 0.0
+    rows: int = 0
+    bytes: int = 0
+    chunks: int = 0
+    thread: str = field(default_factory=lambda: threading.current_thread().name)
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        metric = asdict(self)
+        for key in ('connect_seconds', 'execute_seconds', 'fetch_seconds', 'frame_seconds', 'total_seconds'):
+            metric[key] = round(metric[key], 6)
+        return metric
+
+class QueryMetricsRecorder:
+    """Buffer circular thread-safe con las últimas mediciones"""
+
+    def __init__(self, max_size: Optional[int] = None):
+        self.max_size = max_size or int(os.getenv('QUERY_METRICS_BUFFER_SIZE', '1000'))
+        self._metrics: deque = deque(maxlen=self.max_size)
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    @property
+    def last_sequence(self) -> int:
+        """Número de la última medición registrada (para leer solo las posteriores con since())"""
+        with self._lock:
+            return self._sequence
+
+    def record(self, metric: QueryMetric):
+        with self._lock:
+            self._sequence += 1
+            metric.sequence = self._sequence
+            self._metrics.append(metric)
+        status = f"❌ {metric.error}" if metric.error else f"{metric.rows:,} filas, ~{metric.bytes / 1e6:.1f} MB"
+        logger.info(
+            f"⏱️ SQL {metric.label}: connect {metric.connect_seconds * 1000:.0f}ms | "
+            f"execute {metric.execute_seconds * 1000:.0f}ms | fetch {metric.fetch_seconds * 1000:.0f}ms | "
+            f"frame {metric.frame_seconds * 1000:.0f}ms | {status}",
+            extra={'query_metric': metric.to_dict()}
+        )
+
+    def recent(self, limit: Optional[int] = None, label: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Últimas mediciones (la más reciente al final), opcionalmente de una sola etiqueta"""
+        with self._lock:
+            metrics = [metric for metric in self._metrics if label is None or metric.label == label]
+        if limit is not None:
+            metrics = metrics[-limit:] if limit > 0 else []
+        return [metric.to_dict() for metric in metrics]
+
+    def since(self, sequence: int) -> List[Dict[str, Any]]:
+        """Mediciones registradas después de la secuencia dada (aún presentes en el buffer)"""
+        with self._lock:
+            return [metric.to_dict() for metric in self._metrics if metric.sequence > sequence]
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Resumen por etiqueta sobre el buffer: cantidad, errores, filas, bytes y tiempos por etapa"""
+        with self._lock:
+            metrics = list(self._metrics)
+        summary = {}
+        for label in sorted({metric.label for metric in metrics}):
+            group = [metric for metric in metrics if metric.label == label]
+            totals = np.array([metric.total_seconds for metric in group])
+            summary[label] = {
+                'count': len(group),
+                'errors': sum(1 for metric in group if metric.error),
+                'rows': sum(metric.rows for metric in group),
+                'bytes': sum(metric.bytes for metric in group),
+                'avg_connect_ms': round(float(np.mean([metric.connect_seconds for metric in group])) * 1000, 3),
+                'avg_execute_ms': round(float(np.mean([metric.execute_seconds for metric in group])) * 1000, 3),
+                'avg_fetch_ms': round(float(np.mean([metric.fetch_seconds for metric in group])) * 1000, 3),
+                'avg_frame_ms': round(float(np.mean([metric.frame_seconds for metric in group])) * 1000, 3),
+                'p50_total_ms': round(float(np.percentile(totals, 50)) * 1000, 3),
+                'p95_total_ms': round(float(np.percentile(totals, 95)) * 1000, 3),
+                'max_total_ms': round(float(totals.max()) * 1000, 3)
+            }
+        return summary
+
+    def clear(self):
+        with self._lock:
+            self._metrics.clear()
+
+    def iter_frames(self, engine, label: str, query, params: Optional[Dict[str, Any]] = None,
+                    chunk_size: Optional[int] = None, stream_results: bool = False) -> Iterator[pd.DataFrame]:
+        """
+        Ejecutar la consulta midiendo cada etapa y entregar el resultado en DataFrames
+
+        Con chunk_size se entregan bloques de hasta chunk_size filas (fetchmany); sin él,
+        un único DataFrame. La medición se registra al agotar el iterador, al cerrarlo
+        antes de tiempo o si la consulta falla. total_seconds es la suma de las etapas:
+        el tiempo que el consumidor tarda en procesar cada bloque no se cuenta.
+        """
+        metric = QueryMetric(label=label)
+        start = time.perf_counter()
+        try:
+            connection = engine.connect()
+            metric.connect_seconds = time.perf_counter() - start
+            with connection as conn:
+                if stream_results:
+                    conn = conn.execution_options(stream_results=True)
+
+                mark = time.perf_counter()
+                result = conn.execute(query, params or {})
+                metric.execute_seconds = time.perf_counter() - mark
+                columns = list(result.keys())
+
+                while True:
+                    mark = time.perf_counter()
+                    rows = result.fetchmany(chunk_size) if chunk_size else result.fetchall()
+                    metric.fetch_seconds += time.perf_counter() - mark
+                    if not rows and (chunk_size or metric.chunks):
+                        break
+
+                    mark = time.perf_counter()
+                    frame = pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+                    metric.frame_seconds += time.perf_counter() - mark
+                    metric.rows += len(frame)
+                    metric.bytes += approximate_bytes(frame)
+                    metric.chunks += 1
+                    yield frame
+                    if not chunk_size:
+                        break
+        except Exception as e:
+            metric.error = str(e)
+            raise
+        finally:
+            metric.total_seconds = (metric.connect_seconds + metric.execute_seconds
+                                    + metric.fetch_seconds + metric.frame_seconds)
+            self.record(metric)
+
+    def read_frame(self, engine, label: str, query, params: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """Equivalente medido de pd.read_sql(query, conn, params=params)"""
+        frames = self.iter_frames(engine, label, query, params)
+        try:
+            return next(frames)
+        finally:
+            frames.close()
+
+# Instancia global
+query_metrics = QueryMetricsRecorder()
+
+def get_query_metrics(limit: Optional[int] = None, label: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Últimas mediciones de consultas (para el dashboard o un exportador de métricas)"""
+    return query_metrics.recent(limit, label)
+
+def get_query_metrics_summary() -> Dict[str, Dict[str, Any]]:
+    """Resumen por etiqueta de las mediciones en el buffer"""
+    return query_metrics.summary()
@@ -4,14 +4,26 @@ Conector SQL Server para Call Center Dimensioner
 
 import pandas as pd
 import logging
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from datetime import datetime, date
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator, Callable, Hashable
+from collections import OrderedDict
 import sys
 from pathlib import Path
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
+# Agregar paths
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.database import DatabaseConfig
+from data.call_aggregates import CallAggregates
+from data.call_frame import compact_call_frame
+from data.query_metrics import query_metrics
+from config.engine_registry import engine_registry
+
 # Cargar variables de entorno
 load_dotenv()
 
@@ -19,9 +31,97 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def split_grouping_sets(grouped: pd.DataFrame, histograms: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    Separar el resultado de la agregación por nivel de agrupación
+    
+    GROUPING_ID(dia, hora, intervalo): 2 = (dia, intervalo), 3 = (dia), 5 = (hora), 7 = ()
+    """
+    return {
+        'intervals': grouped[grouped['nivel'] == 2].drop(columns=['nivel', 'hora']).reset_index(drop=True),
+        'days': grouped.loc[grouped['nivel'] == 3, ['dia', 'asesores']].reset_index(drop=True),
+        'hours': grouped.loc[grouped['nivel'] == 5, ['hora', 'asesores']].reset_index(drop=True),
+        'total': grouped.loc[grouped['nivel'] == 7, ['llamadas', 'asesores']].reset_index(drop=True),
+        'histograms': histograms
+    }
+
+class QueryResultCache:
+    """
+    Caché acotada y thread-safe de resultados de consultas de metadatos (rango de fechas, resúmenes)
+    
+    Las entradas se indexan por (consulta, parámetros), expiran tras ttl_seconds y,
+    superado max_size, se desalojan las menos usadas. Cuando se sincronizan datos
+    nuevos se vacía con clear() para no servir totales desactualizados.
+    """
+    
+    def __init__(self, ttl_seconds: float = 300, max_size: int = 128):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    @staticmethod
+    def make_key(query: str, params: Optional[Dict[str, Any]] = None) -> Hashable:
+        """Clave de la consulta: texto SQL y parámetros ordenados por nombre"""
+        return (query, tuple(sorted((params or {}).items())))
+    
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Retornar el resultado vigente o ejecutar compute() y guardarlo"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if now < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+        
+        # La consulta se ejecuta fuera del lock para no bloquear otras lecturas
+        value = compute()
+        if self.ttl_seconds <= 0 or self.max_size <= 0:
+            return value
+        
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+    
+    def clear(self):
+        """Invalidar todas las entradas (p.ej. después de sincronizar datos nuevos)"""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Estadísticas para monitoreo"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
 class SQLConnector:
     """Conector para base de datos SQL Server"""
     
+    name = 'sqlserver'
+    
     def __init__(self):
         # Configuración desde variables de entorno
         self.server = os.getenv('DB_SERVER')
@@ -33,11 +133,16 @@ class SQLConnector:
         self.connection_timeout = int(os.getenv('DB_CONNECTION_TIMEOUT', '30'))
         self.command_timeout = int(os.getenv('DB_COMMAND_TIMEOUT', '60'))
         self.max_records = int(os.getenv('MAX_RECORDS_PER_QUERY', '50000'))
+        self.stream_page_size = int(os.getenv('STREAM_PAGE_SIZE', '500000'))
+        self.stream_chunk_size = int(os.getenv('STREAM_CHUNK_SIZE', '50000'))
         
-        # Validar configuración requerida
-        if not self.server or not self.database:
-            raise ValueError("DB_SERVER, DB_DATABASE son requeridos en variables de entorno")
+        # Resultados de consultas de metadatos (escaneos completos de la tabla)
+        self.query_cache = QueryResultCache(
+            ttl_seconds=float(os.getenv('QUERY_CACHE_TTL_SECONDS', '300')),
+            max_size=int(os.getenv('QUERY_CACHE_SIZE', '128'))
+        )
         
+        # Sin conexión ni validación al construir: el engine compartido se obtiene en connect()
         self.engine = None
         
         # Mapeo de columnas: nombre_real -> nombre_estandar
@@ -51,40 +156,31 @@ class SQLConnector:
         
         self.required_columns = ['fecha', 'asesor', 'hora_inicio_contrata', 'tme', 'tmo']
         
+    def _database_config(self) -> DatabaseConfig:
+        """Configuración de conexión equivalente (misma cadena -> mismo pool compartido)"""
+        if not self.server or not self.database:
+            raise ValueError("DB_SERVER, DB_DATABASE son requeridos en variables de entorno")
+        return DatabaseConfig(
+            server=self.server,
+            database=self.database,
+            username=self.username,
+            password=self.password,
+            trusted_connection=self.trusted_connection,
+            connection_timeout=self.connection_timeout,
+            command_timeout=self.command_timeout
+        )
+    
     def connect(self):
-        """Establecer conexión con la base de datos"""
+        """Establecer conexión con la base de datos (pool compartido del proceso)"""
         try:
-            # String de conexión basado en configuración
-            if self.trusted_connection:
-                conn_str = (
-                    f"mssql+pyodbc://@{self.server}/{self.database}"
-                    f"?driver=ODBC+Driver+17+for+SQL+Server&trusted_connection=yes"
-                )
-            else:
-                conn_str = (
-                    f"mssql+pyodbc://{self.username}:{self.password}@{self.server}"
-                    f"/{self.database}?driver=ODBC+Driver+17+for+SQL+Server"
-                )
-            
+            config = self._database_config()
             logger.info(f"🔗 Conectando a: {self.server}/{self.database}")
             
-            self.engine = create_engine(
-                conn_str,
-                echo=False,
-                pool_pre_ping=True,
-                pool_recycle=3600,
-                pool_size=int(os.getenv('CONNECTION_POOL_SIZE', '5')),
-                max_overflow=int(os.getenv('CONNECTION_POOL_SIZE', '5')),
-                connect_args={
-                    'timeout': self.connection_timeout,
-                    'command_timeout': self.command_timeout
-                }
+            # Una sola prueba SELECT 1 por proceso, compartida con DatabaseConfig.create_engine
+            self.engine = engine_registry.get_verified_engine(
+                config.get_connection_string(), config.get_connect_args()
             )
-            
-            # Test de conexión
-            with self.engine.connect() as conn:
-                result = conn.execute(text("SELECT 1 as test"))
-                logger.info(f"✅ Conexión a {self.database} establecida correctamente")
+            logger.info(f"✅ Conexión a {self.database} establecida correctamente")
             
             return True
             
@@ -118,8 +214,7 @@ class SQLConnector:
             
             logger.info(f"🔍 Probando acceso a tabla: {self.table_name}")
             
-            with self.engine.connect() as conn:
-                result = pd.read_sql(query, conn)
+            result = query_metrics.read_frame(self.engine, 'table_access', query)
                 
             logger.info(f"✅ Tabla {self.table_name} accesible")
             logger.info(f"📊 Columnas mapeadas: {list(result.columns)}")
@@ -196,11 +291,10 @@ class SQLConnector:
             logger.info(f"🔍 Ejecutando query para rango: {start_date} - {end_date}")
             logger.debug(f"Query: {query}")
             
-            with self.engine.connect() as conn:
-                df = pd.read_sql(query, conn, params={
-                    'start_date': start_date,
-                    'end_date': end_date
-                })
+            df = query_metrics.read_frame(self.engine, 'campaign_data', query, {
+                'start_date': start_date,
+                'end_date': end_date
+            })
             
             logger.info(f"📊 Datos obtenidos: {len(df)} registros")
             
@@ -209,8 +303,8 @@ class SQLConnector:
                 logger.warning("⚠️ No se encontraron datos para el rango especificado")
                 return df
             
-            # Verificar tipos de datos
-            self._validate_data_types(df)
+            # Esquema compacto: fechas parseadas una sola vez, asesor categórico, códigos de intervalo
+            df = self._validate_data_types(df)
             
             # Mostrar estadísticas básicas
             self._show_data_stats(df)
@@ -221,31 +315,282 @@ class SQLConnector:
             logger.error(f"❌ Error obteniendo datos: {e}")
             raise
     
-    def get_available_date_range(self) -> Dict[str, Any]:
-        """Obtener rango de fechas disponibles en la tabla"""
+    def iter_campaign_data(self,
+                           start_date: date,
+                           end_date: date,
+                           campaign_filter: Optional[str] = None,
+                           page_size: Optional[int] = None,
+                           chunk_size: Optional[int] = None,
+                           after_fecha_hora: Optional[datetime] = None) -> Iterator[pd.DataFrame]:
+        """
+        Recorrer los datos de campaña en bloques, sin TOP ni un único DataFrame
+        
+        Paginación por keyset sobre (fecha, fecha_hora): cada página es un
+        SELECT TOP page_size con la clave mayor a la última vista, leído con cursor
+        del lado del servidor (stream_results) en bloques de chunk_size filas.
+        Como la clave no es única, las filas que comparten la última clave de una
+        página completa se retienen y se releen al inicio de la página siguiente.
+        
+        Args:
+            start_date: Fecha inicio
+            end_date: Fecha fin
+            campaign_filter: Filtro adicional (opcional)
+            page_size: Filas por consulta (por defecto STREAM_PAGE_SIZE)
+            chunk_size: Filas por bloque entregado (por defecto STREAM_CHUNK_SIZE)
+            after_fecha_hora: Solo filas con fecha_hora posterior (sincronización incremental)
+        
+        Yields:
+            DataFrame con las 5 columnas: fecha, asesor, hora_inicio_contrata, tme, tmo
+        """
+        if not self.engine:
+            if not self.connect():
+                raise ConnectionError("No se pudo establecer conexión")
+        
+        if campaign_filter:
+            if any(char in campaign_filter for char in [';', '--', '/*', '*/', 'xp_', 'sp_']):
+                raise ValueError("Filtro de campaña contiene caracteres no permitidos")
+        
+        page_size = page_size or self.stream_page_size
+        chunk_size = min(chunk_size or self.stream_chunk_size, page_size)
+        
+        select_clause = f"""
+                usuarios as asesor,
+                fecha_hora as hora_inicio_contrata,
+                fecha as fecha,
+                tme as tme,
+                tmo as tmo
+            FROM [{self.database}].[dbo].[{self.table_name}]
+            WHERE fecha >= :start_date
+            AND fecha <= :end_date"""
+        if campaign_filter:
+            select_clause += f" AND {campaign_filter}"
+        
+        params = {'start_date': start_date, 'end_date': end_date}
+        if after_fecha_hora is not None:
+            select_clause += " AND fecha_hora > :after_fecha_hora"
+            params['after_fecha_hora'] = after_fecha_hora
+        
+        # Sin clave previa / clave estrictamente mayor / clave mayor o igual (relectura de empates)
+        first_page = text(f"SELECT TOP {page_size} {select_clause} ORDER BY fecha, fecha_hora")
+        key_filters = {
+            False: "(fecha > :last_fecha OR (fecha = :last_fecha AND fecha_hora > :last_fecha_hora))",
+            True: "(fecha > :last_fecha OR (fecha = :last_fecha AND fecha_hora >= :last_fecha_hora))"
+        }
+        same_key = text(f"SELECT {select_clause} AND fecha = :last_fecha AND fecha_hora = :last_fecha_hora")
+        
+        last_key, inclusive = None, False
+        total_rows, pages = 0, 0
+        
+        logger.info(f"🌊 Recorriendo datos por bloques para rango: {start_date} - {end_date}")
+        
+        while True:
+            if last_key is None:
+                query = first_page
+            else:
+                query = text(f"SELECT TOP {page_size} {select_clause} AND {key_filters[inclusive]} "
+                             f"ORDER BY fecha, fecha_hora")
+            
+            page_rows = 0
+            held_back = None  # Filas con la última clave vista, aún no entregadas
+            for chunk in query_metrics.iter_frames(self.engine, 'campaign_data_page', query, params,
+                                                   chunk_size=chunk_size, stream_results=True):
+                page_rows += len(chunk)
+                if held_back is not None:
+                    chunk = pd.concat([held_back, chunk], ignore_index=True)
+                
+                chunk_key = (chunk['fecha'].iloc[-1], chunk['hora_inicio_contrata'].iloc[-1])
+                tail = (chunk['fecha'] == chunk_key[0]) & (chunk['hora_inicio_contrata'] == chunk_key[1])
+                held_back = chunk[tail].copy()
+                ready = chunk[~tail]
+                if len(ready):
+                    ready = self._validate_data_types(ready)
+                    total_rows += len(ready)
+                    yield ready
+            pages += 1
+            
+            if held_back is None or len(held_back) == 0:
+                break
+            
+            last_fecha, last_fecha_hora = held_back['fecha'].iloc[0], held_back['hora_inicio_contrata'].iloc[0]
+            if page_rows < page_size:
+                # Última página: las filas retenidas están completas
+                held_back = self._validate_data_types(held_back)
+                total_rows += len(held_back)
+                yield held_back
+                break
+            
+            params.update({'last_fecha': last_fecha, 'last_fecha_hora': last_fecha_hora})
+            if len(held_back) == page_rows:
+                # Toda la página comparte la clave: leerla completa y continuar después de ella
+                tied = query_metrics.read_frame(self.engine, 'campaign_data_tied_key', same_key, params)
+                tied = self._validate_data_types(tied)
+                total_rows += len(tied)
+                yield tied
+                last_key, inclusive = (last_fecha, last_fecha_hora), False
+            else:
+                # Los empates de la última clave se releen completos en la página siguiente
+                last_key, inclusive = (last_fecha, last_fecha_hora), True
+        
+        logger.info(f"📊 Datos recorridos: {total_rows:,} registros en {pages} páginas")
+    
+    def get_interval_aggregates(self,
+                                start_date: date,
+                                end_date: date,
+                                answer_time_target: int = 20,
+                                interval_minutes: int = 15,
+                                campaign_filter: Optional[str] = None,
+                                histogram_max_seconds: int = 7200) -> Dict[str, pd.DataFrame]:
+        """
+        Agregar en SQL Server por fecha e intervalo de 15 minutos de fecha_hora
+        
+        Devuelve unos miles de filas en vez de cada llamada, sin el límite
+        MAX_RECORDS_PER_QUERY. Los asesores distintos no se pueden sumar entre
+        intervalos, así que se piden también por día, por hora y en total
+        (GROUPING SETS en una sola consulta).
+        
+        Args:
+            start_date: Fecha inicio
+            end_date: Fecha fin
+            answer_time_target: Tiempo de respuesta objetivo para contar atendidas en objetivo
+            interval_minutes: Duración de los intervalos
+            campaign_filter: Filtro adicional (opcional)
+            histogram_max_seconds: Último bin de los histogramas de TMO/TME
+        
+        Returns:
+            Dict con DataFrames:
+                'intervals': dia, intervalo, llamadas, tmo_suma, tmo_suma_cuadrados, tme_suma,
+                             tme_suma_cuadrados, atendidas_en_objetivo, asesores
+                'days': dia, asesores | 'hours': hora, asesores | 'total': asesores
+                'histograms': metrica ('tmo'/'tme'), segundos, llamadas
+        """
         try:
             if not self.engine:
                 if not self.connect():
                     raise ConnectionError("No se pudo establecer conexión")
             
-            query = text("""
+            # Validar filtro de campaña si se especifica
+            if campaign_filter:
+                if any(char in campaign_filter for char in [';', '--', '/*', '*/', 'xp_', 'sp_']):
+                    raise ValueError("Filtro de campaña contiene caracteres no permitidos")
+            
+            where_clause = "WHERE fecha >= :start_date AND fecha <= :end_date"
+            if campaign_filter:
+                where_clause += f" AND {campaign_filter}"
+            
+            aggregates_query = text(f"""
+            WITH llamadas AS (
+                SELECT
+                    CAST(fecha_hora AS DATE) AS dia,
+                    DATEPART(HOUR, fecha_hora) AS hora,
+                    (DATEPART(HOUR, fecha_hora) * 60 + DATEPART(MINUTE, fecha_hora)) / :interval_minutes AS intervalo,
+                    usuarios,
+                    CAST(tmo AS FLOAT) AS tmo,
+                    CAST(tme AS FLOAT) AS tme
+                FROM [{self.database}].[dbo].[{self.table_name}]
+                {where_clause}
+            )
+            SELECT
+                GROUPING_ID(dia, hora, intervalo) AS nivel,
+                dia,
+                hora,
+                intervalo,
+                COUNT(*) AS llamadas,
+                SUM(tmo) AS tmo_suma,
+                SUM(tmo * tmo) AS tmo_suma_cuadrados,
+                SUM(tme) AS tme_suma,
+                SUM(tme * tme) AS tme_suma_cuadrados,
+                SUM(CASE WHEN tme <= :answer_time_target THEN 1 ELSE 0 END) AS atendidas_en_objetivo,
+                COUNT(DISTINCT usuarios) AS asesores
+            FROM llamadas
+            GROUP BY GROUPING SETS ((dia, intervalo), (dia), (hora), ())
+            """)
+            
+            histogram_query = text(f"""
+            SELECT metrica, segundos, COUNT(*) AS llamadas
+            FROM (
+                SELECT 'tmo' AS metrica,
+                       CASE WHEN tmo < 0 THEN 0 WHEN tmo > :max_seconds THEN :max_seconds
+                            ELSE CAST(FLOOR(tmo) AS INT) END AS segundos
+                FROM [{self.database}].[dbo].[{self.table_name}]
+                {where_clause} AND tmo IS NOT NULL
+                UNION ALL
+                SELECT 'tme' AS metrica,
+                       CASE WHEN tme < 0 THEN 0 WHEN tme > :max_seconds THEN :max_seconds
+                            ELSE CAST(FLOOR(tme) AS INT) END AS segundos
+                FROM [{self.database}].[dbo].[{self.table_name}]
+                {where_clause} AND tme IS NOT NULL
+            ) duraciones
+            GROUP BY metrica, segundos
+            """)
+            
+            params = {
+                'start_date': start_date,
+                'end_date': end_date,
+                'interval_minutes': interval_minutes,
+                'answer_time_target': answer_time_target
+            }
+            
+            logger.info(f"🔍 Ejecutando agregación en servidor para rango: {start_date} - {end_date}")
+            
+            grouped = query_metrics.read_frame(self.engine, 'interval_aggregates', aggregates_query, params)
+            histograms = query_metrics.read_frame(self.engine, 'duration_histograms', histogram_query, {
+                'start_date': start_date,
+                'end_date': end_date,
+                'max_seconds': histogram_max_seconds
+            })
+            
+            frames = split_grouping_sets(grouped, histograms)
+            
+            total_calls = int(frames['total']['llamadas'].iloc[0]) if len(frames['total']) else 0
+            logger.info(f"📊 Agregados obtenidos: {len(grouped) + len(histograms)} filas "
+                        f"para {total_calls:,} llamadas")
+            
+            return frames
+            
+        except Exception as e:
+            logger.error(f"❌ Error obteniendo agregados: {e}")
+            raise
+    
+    def get_call_aggregates(self, start_date: date, end_date: date,
+                            answer_time_target: int = 20) -> CallAggregates:
+        """Agregados del período calculados en SQL Server (ver get_interval_aggregates)"""
+        frames = self.get_interval_aggregates(start_date, end_date, answer_time_target=answer_time_target)
+        return CallAggregates.from_sql_frames(frames, answer_time_target)
+    
+    def get_available_date_range(self, use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Obtener rango de fechas disponibles en la tabla
+        
+        Args:
+            use_cache: Reutilizar el resultado vigente de QueryResultCache (escaneo completo de la tabla)
+        """
+        try:
+            query = """
             SELECT 
                 MIN(fecha) as fecha_min,
                 MAX(fecha) as fecha_max,
                 COUNT(*) as total_registros,
                 COUNT(DISTINCT usuarios) as total_asesores
             FROM [{database}].[dbo].[{table_name}]
-            """.format(database=self.database, table_name=self.table_name))
+            """.format(database=self.database, table_name=self.table_name)
             
-            with self.engine.connect() as conn:
-                result = pd.read_sql(query, conn)
+            def run_query() -> Dict[str, Any]:
+                if not self.engine:
+                    if not self.connect():
+                        raise ConnectionError("No se pudo establecer conexión")
+                
+                result = query_metrics.read_frame(self.engine, 'available_date_range', text(query))
+                
+                return {
+                    'fecha_min': result.iloc[0]['fecha_min'],
+                    'fecha_max': result.iloc[0]['fecha_max'], 
+                    'total_registros': result.iloc[0]['total_registros'],
+                    'total_asesores': result.iloc[0]['total_asesores']
+                }
             
-            return {
-                'fecha_min': result.iloc[0]['fecha_min'],
-                'fecha_max': result.iloc[0]['fecha_max'], 
-                'total_registros': result.iloc[0]['total_registros'],
-                'total_asesores': result.iloc[0]['total_asesores']
-            }
+            if not use_cache:
+                return run_query()
+            return dict(self.query_cache.get_or_compute(self.query_cache.make_key(query), run_query))
             
         except Exception as e:
             logger.error(f"❌ Error obteniendo rango de fechas: {e}")
@@ -274,8 +619,7 @@ class SQLConnector:
             ORDER BY fecha DESC, fecha_hora DESC
             """.format(database=self.database, table_name=self.table_name))
             
-            with self.engine.connect() as conn:
-                df = pd.read_sql(query, conn, params={'limit': limit})
+            df = query_metrics.read_frame(self.engine, 'sample_data', query, {'limit': limit})
             
             logger.info(f"📊 Muestra obtenida: {len(df)} registros")
             return df
@@ -284,19 +628,21 @@ class SQLConnector:
             logger.error(f"❌ Error obteniendo muestra: {e}")
             raise
     
-    def get_campaign_summary(self, days_back: int = 30) -> Dict[str, Any]:
-        """Obtener resumen de campaña de los últimos N días"""
+    def get_campaign_summary(self, days_back: int = 30, use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Obtener resumen de campaña de los últimos N días
+        
+        Args:
+            days_back: Días hacia atrás desde hoy (máximo 365)
+            use_cache: Reutilizar el resultado vigente de QueryResultCache
+        """
         try:
-            if not self.engine:
-                if not self.connect():
-                    raise ConnectionError("No se pudo establecer conexión")
-            
             # Validar días para evitar consultas excesivas
             if days_back > 365:
                 days_back = 365
                 logger.warning("Días reducidos a 365 por seguridad")
             
-            query = text("""
+            query = """
             SELECT 
                 COUNT(*) as total_llamadas,
                 COUNT(DISTINCT usuarios) as asesores_activos,
@@ -306,46 +652,57 @@ class SQLConnector:
                 MAX(fecha) as fecha_max
             FROM [{database}].[dbo].[{table_name}]
             WHERE fecha >= DATEADD(day, :days_back, GETDATE())
-            """.format(database=self.database, table_name=self.table_name))
-            
-            with self.engine.connect() as conn:
-                result = pd.read_sql(query, conn, params={'days_back': -days_back})
+            """.format(database=self.database, table_name=self.table_name)
+            params = {'days_back': -days_back}
             
-            if len(result) > 0:
-                return {
-                    'total_llamadas': int(result.iloc[0]['total_llamadas']),
-                    'asesores_activos': int(result.iloc[0]['asesores_activos']),
-                    'tmo_promedio': float(result.iloc[0]['tmo_promedio']) if result.iloc[0]['tmo_promedio'] else 0,
-                    'tme_promedio': float(result.iloc[0]['tme_promedio']) if result.iloc[0]['tme_promedio'] else 0,
-                    'fecha_min': result.iloc[0]['fecha_min'],
-                    'fecha_max': result.iloc[0]['fecha_max']
-                }
-            return {}
+            def run_query() -> Dict[str, Any]:
+                if not self.engine:
+                    if not self.connect():
+                        raise ConnectionError("No se pudo establecer conexión")
+                
+                result = query_metrics.read_frame(self.engine, 'campaign_summary', text(query), params)
+                
+                if len(result) > 0:
+                    return {
+                        'total_llamadas': int(result.iloc[0]['total_llamadas']),
+                        'asesores_activos': int(result.iloc[0]['asesores_activos']),
+                        'tmo_promedio': float(result.iloc[0]['tmo_promedio']) if result.iloc[0]['tmo_promedio'] else 0,
+                        'tme_promedio': float(result.iloc[0]['tme_promedio']) if result.iloc[0]['tme_promedio'] else 0,
+                        'fecha_min': result.iloc[0]['fecha_min'],
+                        'fecha_max': result.iloc[0]['fecha_max']
+                    }
+                return {}
+            
+            if not use_cache:
+                return run_query()
+            return dict(self.query_cache.get_or_compute(self.query_cache.make_key(query, params), run_query))
             
         except Exception as e:
             logger.error(f"❌ Error obteniendo resumen: {e}")
             raise
     
-    def _validate_data_types(self, df: pd.DataFrame):
-        """Validar tipos de datos de las columnas"""
+    def invalidate_query_cache(self, start_date: Optional[date] = None, end_date: Optional[date] = None):
+        """
+        Descartar los resultados de metadatos cacheados (llamar al sincronizar datos nuevos)
+        
+        También descarta los resúmenes diarios de esta fuente en el rango de fechas que
+        cambió (todo el historial si no se indica).
+        """
+        from data.daily_stats import daily_stats
+        self.query_cache.clear()
+        daily_stats.invalidate(start_date, end_date, source=self.name)
+        logger.info("🔄 Caché de consultas invalidada")
+    
+    def _validate_data_types(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Convertir al esquema compacto (ver data.call_frame); retorna un DataFrame nuevo"""
         try:
-            # Convertir fecha si no es datetime
-            if 'fecha' in df.columns:
-                df['fecha'] = pd.to_datetime(df['fecha'])
-            
-            # Convertir hora_inicio_contrata si no es datetime
-            if 'hora_inicio_contrata' in df.columns:
-                df['hora_inicio_contrata'] = pd.to_datetime(df['hora_inicio_contrata'])
-            
-            # Verificar que tme y tmo sean numéricos
-            for col in ['tme', 'tmo']:
-                if col in df.columns:
-                    df[col] = pd.to_numeric(df[col], errors='coerce')
-            
+            df = compact_call_frame(df)
             logger.debug("✅ Validación de tipos de datos completada")
             
         except Exception as e:
             logger.warning(f"⚠️ Error en validación de tipos: {e}")
+        
+        return df
     
     def _show_data_stats(self, df: pd.DataFrame):
         """Mostrar estadísticas básicas de los datos"""
@@ -359,6 +716,15 @@ class SQLConnector:
         except Exception as e:
             logger.debug(f"Error mostrando estadísticas: {e}")
     
+    def warm_up(self):
+        """Precalentar el pool en segundo plano (no bloquea el arranque)"""
+        try:
+            config = self._database_config()
+        except ValueError as e:
+            logger.warning(f"⚠️ Precalentamiento omitido: {e}")
+            return None
+        return engine_registry.warm_up(config.get_connection_string(), config.get_connect_args())
+    
     def close(self):
         """Cerrar conexión"""
         if self.engine:
@@ -2,6 +2,26 @@
 Motores de cálculo para dimensionamiento
 """
 
-from .erlang_calculator import ErlangCalculator, ErlangInputs, ErlangResults, erlang_calculator
+from .erlang_calculator import (
+    ErlangCalculator, ErlangInputs, ErlangResults, ErlangBatchResults, ErlangResultCache,
+    erlang_calculator, erlang_cache, get_erlang_cache_stats
+)
+from .erlang_a import (
+    ErlangACalculator, ErlangAInputs, ErlangAResults, ErlangABatchResults, erlang_a_calculator
+)
+from .simulation_engine import SimulationEngine, SimulationInputs, SimulationResults, simulation_engine
+from .numpy_simulation import NumpyBackend, fifo_waits_batch, fifo_waits_heap, validate_history
+from .nonstationary_simulation import (
+    NonStationaryInputs, NonStationaryResults, NonStationarySimulator, nonstationary_simulator
+)
+from .forecaster import SeasonalForecast, SeasonalForecaster, seasonal_forecaster
 
-__all__ = ['ErlangCalculator', 'ErlangInputs', 'ErlangResults', 'erlang_calculator']
\ No newline at end of file
+__all__ = [
+    'ErlangCalculator', 'ErlangInputs', 'ErlangResults', 'ErlangBatchResults', 'ErlangResultCache',
+    'erlang_calculator', 'erlang_cache', 'get_erlang_cache_stats',
+    'ErlangACalculator', 'ErlangAInputs', 'ErlangAResults', 'ErlangABatchResults', 'erlang_a_calculator',
+    'SimulationEngine', 'SimulationInputs', 'SimulationResults', 'simulation_engine',
+    'NumpyBackend', 'fifo_waits_batch', 'fifo_waits_heap', 'validate_history',
+    'NonStationaryInputs', 'NonStationaryResults', 'NonStationarySimulator', 'nonstationary_simulator',
+    'SeasonalForecast', 'SeasonalForecaster', 'seasonal_forecaster'
+]
\ No newline at end of file
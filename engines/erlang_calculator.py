@@ -3,12 +3,24 @@ Motor de Cálculo Erlang C para Call Center Dimensioner
 """
 
 import math
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Optional, Tuple
+from scipy.special import gammaincc, gammaln
+from typing import Any, Dict, Hashable, List, Optional, Tuple
 from dataclasses import dataclass
 import logging
 
+# Agregar paths
+sys.path.append(str(Path(__file__).parent.parent))
+
+from data.call_aggregates import CallAggregates
+
 # Configurar logging para este módulo
 logging.basicConfig(
     level=logging.INFO,
@@ -35,6 +47,7 @@ class ErlangResults:
     probability_of_wait: float    # Probabilidad de esperar
     agents_with_shrinkage: int    # Agentes considerando shrinkage
     traffic_intensity: float      # Intensidad de tráfico (Erlangs)
+    feasible: bool = True         # False si el SLA no es alcanzable (agentes = última cota evaluada)
     
     def to_dict(self) -> Dict:
         """Convertir a diccionario para fácil acceso"""
@@ -45,15 +58,167 @@ class ErlangResults:
             'average_wait_time': round(self.average_wait_time, 2),
             'probability_of_wait': round(self.probability_of_wait * 100, 2),
             'agents_with_shrinkage': self.agents_with_shrinkage,
-            'traffic_intensity': round(self.traffic_intensity, 3)
+            'traffic_intensity': round(self.traffic_intensity, 3),
+            'feasible': self.feasible
+        }
+
+@dataclass
+class ErlangBatchResults:
+    """Resultados vectorizados de Erlang C (un arreglo por métrica)"""
+    agents_required: np.ndarray        # Agentes necesarios
+    utilization: np.ndarray            # Utilización (ocupación) de agentes
+    service_level: np.ndarray          # Nivel de servicio logrado
+    average_wait_time: np.ndarray      # Tiempo promedio de espera (ASA)
+    probability_of_wait: np.ndarray    # Probabilidad de esperar (Pw)
+    agents_with_shrinkage: np.ndarray  # Agentes considerando shrinkage
+    traffic_intensity: np.ndarray      # Intensidad de tráfico (Erlangs)
+    feasible: np.ndarray               # False si no se alcanzó el SLA en el rango de búsqueda
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        """Forma de los arreglos de entrada"""
+        return self.agents_required.shape
+
+    def __len__(self) -> int:
+        return int(self.agents_required.size)
+
+    def get(self, index) -> ErlangResults:
+        """Extraer el resultado escalar de una posición del lote"""
+        return ErlangResults(
+            agents_required=int(self.agents_required[index]),
+            utilization=float(self.utilization[index]),
+            service_level=float(self.service_level[index]),
+            average_wait_time=float(self.average_wait_time[index]),
+            probability_of_wait=float(self.probability_of_wait[index]),
+            agents_with_shrinkage=int(self.agents_with_shrinkage[index]),
+            traffic_intensity=float(self.traffic_intensity[index]),
+            feasible=bool(self.feasible[index])
+        )
+
+    def to_dict(self) -> Dict:
+        """Convertir a diccionario de arreglos con las mismas unidades que ErlangResults.to_dict"""
+        return {
+            'agents_required': self.agents_required,
+            'utilization': np.round(self.utilization * 100, 2),
+            'service_level': np.round(self.service_level * 100, 2),
+            'average_wait_time': np.round(self.average_wait_time, 2),
+            'probability_of_wait': np.round(self.probability_of_wait * 100, 2),
+            'agents_with_shrinkage': self.agents_with_shrinkage,
+            'traffic_intensity': np.round(self.traffic_intensity, 3),
+            'feasible': self.feasible
         }
 
+class ErlangResultCache:
+    """
+    Caché LRU acotada y thread-safe de resultados Erlang C, compartida por todo el proceso
+    
+    Las entradas se indexan con valores cuantizados (tráfico, tiempos y SLA redondeados)
+    y los cálculos se hacen sobre esos mismos valores cuantizados, de modo que el
+    resultado no depende de qué consulta llenó la caché primero.
+    """
+    
+    TRAFFIC_DECIMALS = 4  # Resolución de 0.0001 Erlangs
+    TIME_DECIMALS = 2     # Resolución de 0.01 segundos (TMO y tiempo de respuesta)
+    SLA_DECIMALS = 6
+    
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @classmethod
+    def quantize(cls, traffic_intensity, aht_seconds, answer_time, sla_target=None):
+        """Cuantizar entradas (escalares o arreglos NumPy)"""
+        quantized = (
+            np.round(traffic_intensity, cls.TRAFFIC_DECIMALS),
+            np.round(aht_seconds, cls.TIME_DECIMALS),
+            np.round(answer_time, cls.TIME_DECIMALS)
+        )
+        if sla_target is not None:
+            quantized += (np.round(sla_target, cls.SLA_DECIMALS),)
+        return quantized
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Obtener una entrada y marcarla como usada recientemente"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def get_many(self, keys: List[Hashable]) -> List[Optional[Any]]:
+        """Obtener varias entradas con una sola toma del lock (None en las ausentes)"""
+        with self._lock:
+            values = [self._entries.get(key) for key in keys]
+            for key, value in zip(keys, values):
+                if value is not None:
+                    self._entries.move_to_end(key)
+            found = sum(value is not None for value in values)
+            self.hits += found
+            self.misses += len(values) - found
+        return values
+    
+    def put(self, key: Hashable, value: Any):
+        """Guardar una entrada, desalojando las menos usadas si se supera el límite"""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def resize(self, max_size: int):
+        """Cambiar el tamaño máximo, desalojando entradas si es necesario"""
+        with self._lock:
+            self.max_size = max_size
+            while len(self._entries) > max(0, max_size):
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        """Vaciar la caché y reiniciar contadores"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+    
+    def stats(self) -> Dict:
+        """Estadísticas para monitoreo"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+# Caché global del proceso
+erlang_cache = ErlangResultCache(max_size=int(os.getenv('ERLANG_CACHE_SIZE', '10000')))
+
+def get_erlang_cache_stats() -> Dict:
+    """Estadísticas de la caché global de resultados Erlang C"""
+    return erlang_cache.stats()
+
 class ErlangCalculator:
     """Calculadora Erlang C para dimensionamiento de call center"""
     
     def __init__(self):
         self.max_iterations = 1000  # Límite para iteraciones numéricas
         self.precision = 0.0001     # Precisión para convergencia
+        self.cache = erlang_cache   # Caché LRU compartida por el proceso
+        self.staffing_tables = None # Tablas precalculadas (se resuelven al primer uso)
     
     def calculate_erlang_c(self, inputs: ErlangInputs) -> ErlangResults:
         """
@@ -83,30 +248,55 @@ class ErlangCalculator:
             )
             print(f"📊 Intensidad de tráfico: {traffic_intensity:.3f} Erlangs")
             
-            # 2. Encontrar número mínimo de agentes
-            agents_required = self._find_minimum_agents(
-                traffic_intensity,
-                inputs.service_level_target,
-                inputs.answer_time_target
+            # 2. Encontrar número mínimo de agentes (memoizado por entradas cuantizadas)
+            solution_key = ('solution', self.precision, self.max_iterations) + tuple(
+                float(value) for value in self.cache.quantize(
+                    traffic_intensity, inputs.average_handle_time,
+                    inputs.answer_time_target, inputs.service_level_target
+                )
             )
-            print(f"👥 Agentes base calculados: {agents_required}")
+            cached_solution = self.cache.get(solution_key)
+            table_solution = None
+            if cached_solution is None:
+                # Camino rápido: cotas O(1) desde las tablas precalculadas
+                table_solution = self._solve_from_staffing_table(
+                    traffic_intensity,
+                    inputs.service_level_target,
+                    inputs.answer_time_target,
+                    inputs.average_handle_time
+                )
+            if cached_solution is not None:
+                agents_required, feasible = cached_solution[:2]
+            elif table_solution is not None:
+                agents_required, feasible = table_solution, True
+            else:
+                agents_required, feasible = self._solve_minimum_agents(
+                    traffic_intensity,
+                    inputs.service_level_target,
+                    inputs.answer_time_target,
+                    inputs.average_handle_time
+                )
+            if feasible:
+                print(f"👥 Agentes base calculados: {agents_required}")
+            else:
+                print(f"⚠️ SLA inalcanzable, última cota evaluada: {agents_required} agentes")
             
             # 3. Calcular métricas finales
             utilization = traffic_intensity / agents_required
-            probability_of_wait = self._calculate_erlang_c_probability(traffic_intensity, agents_required)
+            probability_of_wait, service_level = self._evaluate_agents(
+                traffic_intensity,
+                agents_required,
+                inputs.average_handle_time,
+                inputs.answer_time_target
+            )
+            if cached_solution is None and feasible:
+                self.cache.put(solution_key, (agents_required, feasible, probability_of_wait, service_level))
             average_wait_time = self._calculate_average_wait_time(
                 probability_of_wait, 
                 traffic_intensity, 
                 agents_required, 
                 inputs.average_handle_time
             )
-            service_level = self._calculate_service_level(
-                probability_of_wait,
-                traffic_intensity,
-                agents_required,
-                inputs.average_handle_time,
-                inputs.answer_time_target
-            )
             
             # 4. Aplicar shrinkage
             agents_with_shrinkage = self._apply_shrinkage(agents_required, inputs.shrinkage_percentage)
@@ -118,7 +308,8 @@ class ErlangCalculator:
                 average_wait_time=average_wait_time,
                 probability_of_wait=probability_of_wait,
                 agents_with_shrinkage=agents_with_shrinkage,
-                traffic_intensity=traffic_intensity
+                traffic_intensity=traffic_intensity,
+                feasible=feasible
             )
             
             self._log_results(results)
@@ -128,7 +319,203 @@ class ErlangCalculator:
             print(f"❌ Error en cálculo Erlang C: {e}")
             logger.error(f"❌ Error en cálculo Erlang C: {e}")
             raise
-    
+
+    def calculate_erlang_c_batch(self,
+                                 calls_per_hour,
+                                 average_handle_time,
+                                 service_level_target,
+                                 answer_time_target,
+                                 shrinkage_percentage=15.0,
+                                 use_cache: bool = True) -> ErlangBatchResults:
+        """
+        Calcular dimensionamiento Erlang C para un lote de intervalos en una sola pasada
+
+        Los argumentos pueden ser escalares o arreglos NumPy con formas compatibles
+        (broadcasting), p.ej. (campañas, 7, 96) para intervalos de 15 minutos por día
+        de la semana. La búsqueda de agentes avanza la recurrencia de Erlang B
+        B(N) = A·B(N-1) / (N + A·B(N-1)) para todo el lote a la vez.
+
+        Args:
+            calls_per_hour: Llamadas por hora
+            average_handle_time: TMO promedio en segundos
+            service_level_target: Objetivo de nivel de servicio (0.90 = 90%)
+            answer_time_target: Tiempo de respuesta objetivo en segundos
+            shrinkage_percentage: Shrinkage en porcentaje
+            use_cache: Reutilizar/guardar soluciones en la caché LRU (desactivar para lotes masivos)
+
+        Returns:
+            ErlangBatchResults: Arreglos de resultados con la forma del lote
+        """
+        calls, aht, sla, answer_time, shrinkage = np.broadcast_arrays(
+            *(np.asarray(value, dtype=float) for value in (
+                calls_per_hour, average_handle_time, service_level_target,
+                answer_time_target, shrinkage_percentage
+            ))
+        )
+        shape = calls.shape
+        calls, aht, sla, answer_time, shrinkage = (
+            np.ravel(value) for value in (calls, aht, sla, answer_time, shrinkage)
+        )
+
+        traffic = calls * aht / 3600
+        size = traffic.size
+
+        # Celdas con entradas no finitas o no positivas (p.ej. TMO NaN de intervalos vacíos)
+        # quedan sin solución en vez de invalidar todo el lote; sin tráfico no hace falta nadie
+        with np.errstate(invalid='ignore'):
+            valid = (np.isfinite(traffic) & np.isfinite(aht) & np.isfinite(sla) & np.isfinite(answer_time)
+                     & (aht > 0) & (traffic >= 0))
+        idle = valid & (traffic == 0)
+        solvable = np.flatnonzero(valid & (traffic > 0))
+
+        agents = np.zeros(size, dtype=np.int64)
+        prob_wait = np.full(size, np.nan)
+        service_level = np.full(size, np.nan)
+        found = idle.copy()
+        prob_wait[idle] = 0.0
+        service_level[idle] = 1.0
+        if solvable.size:
+            agents[solvable], prob_wait[solvable], service_level[solvable], found[solvable] = self._solve_cells(
+                traffic[solvable], aht[solvable], sla[solvable], answer_time[solvable], use_cache
+            )
+        if not valid.all():
+            logger.warning(f"⚠️ {int((~valid).sum())} intervalos con entradas inválidas (NaN, TMO <= 0 o volumen negativo)")
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            utilization = np.where(agents > 0, traffic / agents, np.where(valid, 0.0, np.nan))
+            average_wait_time = np.where(idle, 0.0, np.maximum(0.0, prob_wait * aht / (agents - traffic)))
+
+        agents_with_shrinkage = np.ceil(agents * (1 + shrinkage / 100)).astype(np.int64)
+
+        logger.info(f"🧮 Erlang C por lote: {size} intervalos, hasta {int(agents.max()) if size else 0} agentes")
+
+        return ErlangBatchResults(
+            agents_required=agents.reshape(shape),
+            utilization=utilization.reshape(shape),
+            service_level=service_level.reshape(shape),
+            average_wait_time=average_wait_time.reshape(shape),
+            probability_of_wait=prob_wait.reshape(shape),
+            agents_with_shrinkage=agents_with_shrinkage.reshape(shape),
+            traffic_intensity=traffic.reshape(shape),
+            feasible=found.reshape(shape)
+        )
+
+    def _solve_cells(self, traffic: np.ndarray, aht: np.ndarray, sla: np.ndarray, answer_time: np.ndarray,
+                     use_cache: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Agentes, Pw, SL y factibilidad de celdas válidas con tráfico, reutilizando la caché si se pide"""
+        if not use_cache:
+            return self._solve_batch(traffic, aht, sla, answer_time)
+
+        # Las entradas cuantizadas solo forman la clave: se resuelve y evalúa siempre sobre
+        # los valores originales, igual que con use_cache=False y que el cálculo escalar
+        size = traffic.size
+        prefix = ('solution', self.precision, self.max_iterations)
+        keys = [
+            prefix + quantized
+            for quantized in zip(*(values.tolist() for values in self.cache.quantize(traffic, aht, answer_time, sla)))
+        ]
+        cached = self.cache.get_many(keys)
+
+        agents = np.zeros(size, dtype=np.int64)
+        prob_wait = np.ones(size)
+        service_level = np.zeros(size)
+        found = np.zeros(size, dtype=bool)
+
+        hits = np.array([entry is not None for entry in cached], dtype=bool)
+        if hits.any():
+            hit = np.flatnonzero(hits)
+            agents[hit] = [cached[i][0] for i in hit.tolist()]
+            found[hit] = True
+            prob_wait[hit], service_level[hit] = self.evaluate_agents_batch(
+                traffic[hit], agents[hit], aht[hit], answer_time[hit]
+            )
+
+        pending = np.flatnonzero(~hits)
+        if pending.size:
+            solved = self._solve_batch(traffic[pending], aht[pending], sla[pending], answer_time[pending])
+            agents[pending], prob_wait[pending], service_level[pending], found[pending] = solved
+            # Los intervalos sin solución dependen de la cota del lote: no se memorizan
+            for i in pending[found[pending]].tolist():
+                self.cache.put(keys[i], (int(agents[i]), True, float(prob_wait[i]), float(service_level[i])))
+
+        return agents, prob_wait, service_level, found
+
+    def evaluate_agents_batch(self, traffic_intensity, agents, average_handle_time,
+                              answer_time_target) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Probabilidad de esperar y nivel de servicio de una dotación dada, vectorizado
+
+        Usa la forma cerrada de Erlang B (O(1) por elemento, sin recurrencia hasta N).
+        Los argumentos se combinan por broadcasting. Sin tráfico: Pw = 0 y SL = 1;
+        con N <= A (sobrecarga): Pw = 1 y SL = 0.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (probabilidad de esperar, nivel de servicio)
+        """
+        traffic, agents, aht, answer_time = np.broadcast_arrays(
+            *(np.asarray(value, dtype=float) for value in
+              (traffic_intensity, agents, average_handle_time, answer_time_target))
+        )
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            stable = agents > traffic
+            erlang_b = self._erlang_b_closed_form(traffic, agents)
+            prob_wait = np.where(stable, np.clip(self._erlang_c_from_b(erlang_b, traffic, agents), 0.0, 1.0), 1.0)
+            service_level = np.where(
+                stable, np.clip(1 - prob_wait * np.exp(-(agents - traffic) * answer_time / aht), 0.0, 1.0), 0.0
+            )
+        idle = traffic == 0
+        return np.where(idle, 0.0, prob_wait), np.where(idle, 1.0, service_level)
+
+    def _solve_batch(self, traffic: np.ndarray, aht: np.ndarray, sla: np.ndarray,
+                     answer_time: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Búsqueda vectorizada de agentes sobre arreglos planos: (agentes, Pw, SL, factible)"""
+        size = traffic.size
+
+        agents = np.zeros(size, dtype=np.int64)
+        prob_wait = np.ones(size)
+        service_level = np.zeros(size)
+        found = np.zeros(size, dtype=bool)
+        erlang_b = np.ones(size)  # B(0) = 1
+
+        max_agents = (int(np.ceil(traffic.max())) if size else 0) + self.max_iterations
+
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            for n in range(1, max_agents + 1):
+                erlang_b = self._erlang_b_step(erlang_b, traffic, n)
+
+                candidates = np.flatnonzero(~found & (n > traffic))
+                if candidates.size == 0:
+                    continue
+
+                a = traffic[candidates]
+                b = erlang_b[candidates]
+                pw = np.clip(self._erlang_c_from_b(b, a, n), 0.0, 1.0)
+                sl = np.clip(1 - pw * np.exp(-(n - a) * answer_time[candidates] / aht[candidates]), 0.0, 1.0)
+
+                ok = sl >= sla[candidates] - self.precision
+                solved = candidates[ok]
+                agents[solved] = n
+                prob_wait[solved] = pw[ok]
+                service_level[solved] = sl[ok]
+                found[solved] = True
+
+                if found.all():
+                    break
+
+            # Intervalos sin solución: reportar el último valor evaluado
+            pending = np.flatnonzero(~found)
+            if pending.size:
+                a = traffic[pending]
+                b = erlang_b[pending]
+                agents[pending] = max_agents
+                prob_wait[pending] = np.clip(self._erlang_c_from_b(b, a, max_agents), 0.0, 1.0)
+                service_level[pending] = np.clip(
+                    1 - prob_wait[pending] * np.exp(-(max_agents - a) * answer_time[pending] / aht[pending]), 0.0, 1.0
+                )
+                logger.warning(f"⚠️ {pending.size} intervalos sin solución con hasta {max_agents} agentes")
+
+        return agents, prob_wait, service_level, found
+
     def _calculate_traffic_intensity(self, calls_per_hour: float, aht_seconds: float) -> float:
         """Calcular intensidad de tráfico en Erlangs"""
         # Intensidad = (Llamadas/hora * TMO en horas)
@@ -137,15 +524,23 @@ class ErlangCalculator:
         logger.debug(f"📊 Intensidad de tráfico: {traffic_intensity:.3f} Erlangs")
         return traffic_intensity
     
-    def _find_minimum_agents(self, traffic_intensity: float, sla_target: float, answer_time: int) -> int:
-        """Encontrar número mínimo de agentes para cumplir SLA"""
+    def _find_minimum_agents(self, traffic_intensity: float, sla_target: float, answer_time: int,
+                             aht_seconds: float) -> int:
+        """Encontrar número mínimo de agentes para cumplir SLA (búsqueda lineal de referencia)"""
         # Empezar con el mínimo teórico (intensidad de tráfico redondeada hacia arriba)
         min_agents = max(1, math.ceil(traffic_intensity))
         
+        # Avanzar Erlang B hasta min_agents - 1; luego un paso de la recurrencia por candidato
+        erlang_b = self._calculate_erlang_b(traffic_intensity, min_agents - 1)
+        
         for agents in range(min_agents, min_agents + 50):  # Buscar en rango razonable
-            prob_wait = self._calculate_erlang_c_probability(traffic_intensity, agents)
+            erlang_b = self._erlang_b_step(erlang_b, traffic_intensity, agents)
+            if agents <= traffic_intensity:
+                continue  # Sobrecarga del sistema
+            
+            prob_wait = min(1.0, max(0.0, self._erlang_c_from_b(erlang_b, traffic_intensity, agents)))
             service_level = self._calculate_service_level(
-                prob_wait, traffic_intensity, agents, answer_time * 3, answer_time
+                prob_wait, traffic_intensity, agents, aht_seconds, answer_time
             )
             
             if service_level >= sla_target:
@@ -155,60 +550,166 @@ class ErlangCalculator:
         logger.warning(f"⚠️ No se pudo encontrar solución óptima, usando {min_agents + 49}")
         return min_agents + 49
     
-    def _calculate_erlang_c_probability(self, traffic_intensity: float, agents: int) -> float:
-        """Calcular probabilidad Erlang C (probabilidad de esperar)"""
-        try:
-            # Fórmula Erlang C: P(W>0) = (A^N / N!) * (N / (N - A)) / sum(A^k / k!) + (A^N / N!) * (N / (N - A))
+    def _solve_minimum_agents(self, traffic_intensity: float, sla_target: float,
+                              answer_time: int, aht_seconds: float) -> Tuple[int, bool]:
+        """
+        Encontrar el mínimo de agentes por acotamiento exponencial + bisección
+        
+        El SL es monótono creciente en N, así que primero se duplica el paso hasta
+        encontrar una cota que cumpla el SLA y luego se biseca el intervalo. El SLA se
+        considera cumplido con tolerancia self.precision y el total de evaluaciones
+        está limitado por self.max_iterations.
+        
+        Returns:
+            Tuple (agentes, factible). Si no es factible, agentes es la última cota evaluada.
+        """
+        def meets_target(agents: int) -> Tuple[bool, float]:
             if agents <= traffic_intensity:
-                return 1.0  # Sobrecarga del sistema
-            
-            # Calcular suma del denominador
-            sum_denominator = 0
-            for k in range(agents):
-                sum_denominator += (traffic_intensity ** k) / math.factorial(k)
-            
-            # Calcular término Erlang C
-            erlang_c_numerator = (traffic_intensity ** agents) / math.factorial(agents)
-            erlang_c_denominator = agents - traffic_intensity
-            erlang_c_term = erlang_c_numerator / erlang_c_denominator
-            
-            # Probabilidad final
-            probability = erlang_c_term / (sum_denominator + erlang_c_term)
-            
-            return min(1.0, max(0.0, probability))  # Asegurar rango [0,1]
-            
-        except (OverflowError, ZeroDivisionError):
-            logger.warning(f"⚠️ Error numérico en Erlang C, usando aproximación")
-            return self._erlang_c_approximation(traffic_intensity, agents)
+                return False, 0.0  # Sobrecarga del sistema
+            _, service_level = self._evaluate_agents(traffic_intensity, agents, aht_seconds, answer_time)
+            return service_level >= sla_target - self.precision, service_level
+        
+        # Cota inferior: N <= A nunca cumple (y siempre se requiere al menos 1 agente)
+        lower = max(0, math.floor(traffic_intensity))
+        step = 1
+        upper = lower + step
+        iterations = 0
+        
+        # 1. Acotamiento exponencial
+        met, service_level = meets_target(upper)
+        while not met:
+            iterations += 1
+            if iterations >= self.max_iterations or service_level >= 1.0:
+                # SL saturado o límite de iteraciones: el objetivo no es alcanzable
+                logger.warning(f"⚠️ SLA {sla_target*100:.2f}% inalcanzable (SL máximo {service_level*100:.2f}% con {upper} agentes)")
+                return upper, False
+            lower = upper
+            step *= 2
+            upper = lower + step
+            met, service_level = meets_target(upper)
+        
+        # 2. Bisección entre la última cota que falla y la primera que cumple
+        while upper - lower > 1 and iterations < self.max_iterations:
+            iterations += 1
+            middle = (lower + upper) // 2
+            met, _ = meets_target(middle)
+            if met:
+                upper = middle
+            else:
+                lower = middle
+        
+        logger.debug(f"🎯 Agentes encontrados: {upper} ({iterations} iteraciones)")
+        return upper, True
     
-    def _erlang_c_approximation(self, traffic_intensity: float, agents: int) -> float:
-        """Aproximación numérica para evitar overflow en factorial"""
-        try:
-            # Usar logaritmos para evitar overflow
-            log_prob = agents * math.log(traffic_intensity) - math.lgamma(agents + 1)
-            log_prob += math.log(agents) - math.log(agents - traffic_intensity)
-            
-            # Aproximación del denominador
-            max_k = min(agents - 1, int(traffic_intensity + 10))
-            log_sum = 0
-            
-            for k in range(max_k + 1):
-                log_term = k * math.log(traffic_intensity) - math.lgamma(k + 1)
-                if k == 0:
-                    log_sum = log_term
-                else:
-                    log_sum = log_sum + math.log(1 + math.exp(log_term - log_sum))
-            
-            log_final_prob = log_prob - math.log(math.exp(log_sum) + math.exp(log_prob))
-            
-            return min(1.0, max(0.0, math.exp(log_final_prob)))
-            
-        except:
-            # Última aproximación simple
-            rho = traffic_intensity / agents
-            if rho >= 1:
-                return 1.0
-            return rho ** agents
+    def _solve_from_staffing_table(self, traffic_intensity: float, sla_target: float,
+                                   answer_time: int, aht_seconds: float) -> Optional[int]:
+        """Resolver el mínimo de agentes dentro de las cotas de la tabla precalculada del SLA
+        
+        Retorna None si no hay tabla o el punto cae fuera de la grilla.
+        """
+        if self.staffing_tables is None:
+            from engines.erlang_tables import staffing_tables
+            self.staffing_tables = staffing_tables
+        if aht_seconds <= 0:
+            return None
+        
+        bounds = self.staffing_tables.lookup_bounds(
+            traffic_intensity, answer_time / aht_seconds, sla_target, self.precision
+        )
+        if bounds is None:
+            return None
+        
+        def meets_target(agents: int) -> bool:
+            if agents <= traffic_intensity:
+                return False
+            _, service_level = self._evaluate_agents(traffic_intensity, agents, aht_seconds, answer_time)
+            return service_level >= sla_target - self.precision
+        
+        lower, upper = bounds
+        if not meets_target(upper):
+            return None  # Tabla inconsistente con este punto: usar el solver completo
+        if meets_target(lower):
+            return lower
+        while upper - lower > 1:
+            middle = (lower + upper) // 2
+            if meets_target(middle):
+                upper = middle
+            else:
+                lower = middle
+        return upper
+    
+    def _evaluate_agents(self, traffic_intensity: float, agents: int,
+                         aht_seconds: float, answer_time: int) -> Tuple[float, float]:
+        """Calcular (probabilidad de esperar, nivel de servicio) para N agentes en O(1)
+        
+        Memoizado en la caché LRU por (tráfico, agentes, tiempo de respuesta, TMO) cuantizados.
+        """
+        traffic_intensity, aht_seconds, answer_time = (
+            float(value) for value in self.cache.quantize(traffic_intensity, aht_seconds, answer_time)
+        )
+        key = ('point', traffic_intensity, int(agents), answer_time, aht_seconds)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        
+        if agents <= traffic_intensity:
+            result = (1.0, 0.0)  # Sobrecarga del sistema
+        else:
+            erlang_b = self._erlang_b_closed_form(traffic_intensity, agents)
+            prob_wait = min(1.0, max(0.0, self._erlang_c_from_b(erlang_b, traffic_intensity, agents)))
+            service_level = self._calculate_service_level(
+                prob_wait, traffic_intensity, agents, aht_seconds, answer_time
+            )
+            result = (prob_wait, service_level)
+        
+        self.cache.put(key, result)
+        return result
+    
+    @staticmethod
+    def _erlang_b_closed_form(traffic_intensity, agents):
+        """Erlang B como cociente Poisson pmf(N)/cdf(N), evaluable en O(1) para cualquier N
+        
+        Funciona igual con escalares o arreglos NumPy.
+        """
+        traffic = np.asarray(traffic_intensity, dtype=float)
+        agents = np.asarray(agents, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            log_pmf = agents * np.log(traffic) - traffic - gammaln(agents + 1)
+            cdf = gammaincc(agents + 1, traffic)  # P(X <= N), X ~ Poisson(A)
+            erlang_b = np.where(cdf > 0, np.minimum(1.0, np.exp(log_pmf) / cdf), 1.0)
+        erlang_b = np.where(traffic > 0, erlang_b, 0.0)
+        return float(erlang_b) if erlang_b.ndim == 0 else erlang_b
+    
+    @staticmethod
+    def _erlang_b_step(erlang_b, traffic_intensity, agents):
+        """Un paso de la recurrencia Erlang B: B(N) = A·B(N-1) / (N + A·B(N-1))
+        
+        Funciona igual con escalares o arreglos NumPy.
+        """
+        return traffic_intensity * erlang_b / (agents + traffic_intensity * erlang_b)
+    
+    @staticmethod
+    def _erlang_c_from_b(erlang_b, traffic_intensity, agents):
+        """Convertir Erlang B en Erlang C: C(N) = N·B / (N - A·(1 - B)), válido para N > A"""
+        return agents * erlang_b / (agents - traffic_intensity * (1 - erlang_b))
+    
+    def _calculate_erlang_b(self, traffic_intensity: float, agents: int) -> float:
+        """Calcular probabilidad de bloqueo Erlang B con la recurrencia estable (O(N))"""
+        erlang_b = 1.0  # B(0) = 1
+        for n in range(1, agents + 1):
+            erlang_b = self._erlang_b_step(erlang_b, traffic_intensity, n)
+        return erlang_b
+    
+    def _calculate_erlang_c_probability(self, traffic_intensity: float, agents: int) -> float:
+        """Calcular probabilidad Erlang C (probabilidad de esperar)"""
+        # Fórmula Erlang C a partir de Erlang B, sin factoriales ni riesgo de overflow
+        if agents <= traffic_intensity:
+            return 1.0  # Sobrecarga del sistema
+        
+        erlang_b = self._calculate_erlang_b(traffic_intensity, agents)
+        probability = self._erlang_c_from_b(erlang_b, traffic_intensity, agents)
+        
+        return min(1.0, max(0.0, probability))  # Asegurar rango [0,1]
     
     def _calculate_average_wait_time(self, prob_wait: float, traffic_intensity: float, 
                                    agents: int, aht_seconds: float) -> float:
@@ -266,72 +767,106 @@ class ErlangCalculator:
         Args:
             df: DataFrame con columnas ['fecha', 'asesor', 'hora_inicio_contrata', 'tme', 'tmo']
             
+        Returns:
+            Dict con análisis de volumen, TMO, etc.
+        """
+        return self.analyze_historical_aggregates(CallAggregates.from_dataframe(df))
+    
+    def analyze_historical_aggregates(self, aggregates: CallAggregates) -> Dict:
+        """
+        Analizar datos históricos desde agregados (filas crudas o GROUP BY en SQL Server)
+        
+        Args:
+            aggregates: CallAggregates del período
+            
         Returns:
             Dict con análisis de volumen, TMO, etc.
         """
         try:
             logger.info("📊 Analizando datos históricos...")
             
-            # Convertir timestamps
-            df['hora_inicio_contrata'] = pd.to_datetime(df['hora_inicio_contrata'])
-            df['hora'] = df['hora_inicio_contrata'].dt.hour
+            # Matriz días x intervalos de 15 min: volúmenes normalizados por día operativo
+            demand_matrix = aggregates.matrix
+            volume_by_hour = demand_matrix.mean_calls(minutes=60)
+            operating_hours = demand_matrix.operating_intervals(minutes=60)
+            avg_calls_per_hour = float(volume_by_hour[operating_hours].mean()) if operating_hours.any() else 0.0
+            peak_hour = int(np.argmax(volume_by_hour))
+            peak_volume = float(volume_by_hour[peak_hour])
             
-            # Análisis de volumen por hora
-            volume_by_hour = df.groupby('hora').size()
-            avg_calls_per_hour = volume_by_hour.mean()
-            peak_hour = volume_by_hour.idxmax()
-            peak_volume = volume_by_hour.max()
+            # Percentiles entre días (no entre horas) del volumen horario promedio de cada día
+            daily_volume = demand_matrix.daily_mean_volume(minutes=60)
             
-            # Análisis de TMO
-            avg_tmo = df['tmo'].mean()
-            std_tmo = df['tmo'].std()
+            # Percentiles por hora entre días operativos, promediados en las horas con tráfico
+            interval_percentiles = {
+                q: float(demand_matrix.percentile_calls(q, minutes=60)[operating_hours].mean())
+                   if operating_hours.any() else 0.0
+                for q in (75, 90)
+            }
             
-            # Análisis de TME (para validación posterior)
-            avg_tme = df['tme'].mean()
+            # Análisis de TMO y TME (TME para validación posterior) desde sumas e histogramas
+            avg_tmo, std_tmo = aggregates.tmo_mean_std()
+            avg_tme, _ = aggregates.tme_mean_std()
             
             # Agentes únicos por día
-            agents_per_day = df.groupby('fecha')['asesor'].nunique()
-            avg_agents = agents_per_day.mean()
+            avg_agents = float(aggregates.agents_per_day.mean()) if len(aggregates.agents_per_day) else 0.0
             
-            # Calcular días en el análisis PRIMERO
-            date_range_days = (df['fecha'].max() - df['fecha'].min()).days + 1
+            # Calcular días en el análisis PRIMERO (calendario y días con operación)
+            date_range_days = demand_matrix.num_days
+            operating_days = int(demand_matrix.operating_days().sum())
             
             # Crear diccionario DESPUÉS
             analysis = {
-                'total_calls': len(df),
+                'total_calls': aggregates.total_calls,
                 'date_range': {
-                    'start': df['fecha'].min(),
-                    'end': df['fecha'].max(),
-                    'days': date_range_days
+                    'start': pd.Timestamp(demand_matrix.dates[0]) if date_range_days else None,
+                    'end': pd.Timestamp(demand_matrix.dates[-1]) if date_range_days else None,
+                    'days': date_range_days,
+                    'operating_days': operating_days
                 },
                 'volume_analysis': {
                     'avg_calls_per_hour': round(avg_calls_per_hour, 1),
-                    'peak_hour': int(peak_hour),
-                    'peak_volume': int(peak_volume),
-                    'hourly_profile': volume_by_hour.to_dict()
+                    'peak_hour': peak_hour,
+                    'peak_volume': round(peak_volume, 1),
+                    'hourly_profile': {
+                        hour: round(float(volume_by_hour[hour]), 1) for hour in np.flatnonzero(operating_hours)
+                    },
+                    'daily_percentiles': {
+                        '75': round(float(np.percentile(daily_volume, 75)), 1) if daily_volume.size else 0.0,
+                        '90': round(float(np.percentile(daily_volume, 90)), 1) if daily_volume.size else 0.0
+                    },
+                    'interval_percentiles': {
+                        '75': round(interval_percentiles[75], 1),
+                        '90': round(interval_percentiles[90], 1)
+                    },
+                    'peak_hour_percentiles': {
+                        '75': round(float(demand_matrix.percentile_calls(75, minutes=60)[peak_hour]), 1),
+                        '90': round(float(demand_matrix.percentile_calls(90, minutes=60)[peak_hour]), 1)
+                    }
                 },
                 'tmo_analysis': {
                     'average_seconds': round(avg_tmo, 1),
                     'std_deviation': round(std_tmo, 1),
                     'percentiles': {
-                        '50': round(df['tmo'].quantile(0.5), 1),
-                        '90': round(df['tmo'].quantile(0.9), 1),
-                        '95': round(df['tmo'].quantile(0.95), 1)
+                        '50': round(aggregates.tmo_percentile(50), 1),
+                        '90': round(aggregates.tmo_percentile(90), 1),
+                        '95': round(aggregates.tmo_percentile(95), 1)
                     }
                 },
                 'tme_analysis': {
                     'average_seconds': round(avg_tme, 1),
                     'percentiles': {
-                        '50': round(df['tme'].quantile(0.5), 1),
-                        '90': round(df['tme'].quantile(0.9), 1),
-                        '95': round(df['tme'].quantile(0.95), 1)
+                        '50': round(aggregates.tme_percentile(50), 1),
+                        '90': round(aggregates.tme_percentile(90), 1),
+                        '95': round(aggregates.tme_percentile(95), 1)
                     }
                 },
                 'resource_analysis': {
                     'avg_agents_per_day': round(avg_agents, 1),
-                    'unique_agents': df['asesor'].nunique(),
-                    'calls_per_agent_per_day': round(len(df) / (avg_agents * date_range_days), 1)
-                }
+                    'unique_agents': aggregates.unique_agents,
+                    'calls_per_agent_per_day': round(aggregates.total_calls / (avg_agents * operating_days), 1)
+                                               if avg_agents and operating_days else 0.0
+                },
+                'demand_matrix': demand_matrix
             }
             
             self._log_historical_analysis(analysis)
@@ -342,20 +877,24 @@ class ErlangCalculator:
             print(f"❌ Error analizando datos históricos: {e}")
             # Retornar análisis básico en caso de error
             return {
-                'total_calls': len(df) if 'df' in locals() else 0,
-                'date_range': {'start': None, 'end': None, 'days': 0},
-                'volume_analysis': {'avg_calls_per_hour': 0, 'peak_hour': 0, 'peak_volume': 0, 'hourly_profile': {}},
+                'total_calls': aggregates.total_calls if aggregates is not None else 0,
+                'date_range': {'start': None, 'end': None, 'days': 0, 'operating_days': 0},
+                'volume_analysis': {'avg_calls_per_hour': 0, 'peak_hour': 0, 'peak_volume': 0, 'hourly_profile': {},
+                                    'daily_percentiles': {'75': 0, '90': 0}, 'interval_percentiles': {'75': 0, '90': 0},
+                                    'peak_hour_percentiles': {'75': 0, '90': 0}},
                 'tmo_analysis': {'average_seconds': 0, 'std_deviation': 0, 'percentiles': {'50': 0, '90': 0, '95': 0}},
                 'tme_analysis': {'average_seconds': 0, 'percentiles': {'50': 0, '90': 0, '95': 0}},
-                'resource_analysis': {'avg_agents_per_day': 0, 'unique_agents': 0, 'calls_per_agent_per_day': 0}
+                'resource_analysis': {'avg_agents_per_day': 0, 'unique_agents': 0, 'calls_per_agent_per_day': 0},
+                'demand_matrix': None
             }
     
     def _log_historical_analysis(self, analysis: Dict):
         """Log del análisis histórico"""
         logger.info("📈 Análisis de datos históricos:")
-        logger.info(f"   📅 Período: {analysis['date_range']['start']} - {analysis['date_range']['end']}")
+        logger.info(f"   📅 Período: {analysis['date_range']['start']} - {analysis['date_range']['end']} "
+                    f"({analysis['date_range']['operating_days']} de {analysis['date_range']['days']} días con operación)")
         logger.info(f"   📞 Total llamadas: {analysis['total_calls']:,}")
-        logger.info(f"   📊 Promedio llamadas/hora: {analysis['volume_analysis']['avg_calls_per_hour']}")
+        logger.info(f"   📊 Promedio llamadas/hora (por día operativo): {analysis['volume_analysis']['avg_calls_per_hour']}")
         logger.info(f"   🕐 Hora pico: {analysis['volume_analysis']['peak_hour']}h ({analysis['volume_analysis']['peak_volume']} llamadas)")
         logger.info(f"   ⏱️ TMO promedio: {analysis['tmo_analysis']['average_seconds']}s")
         logger.info(f"   ⏳ TME promedio: {analysis['tme_analysis']['average_seconds']}s")
@@ -400,6 +939,42 @@ def test_erlang_calculator():
         logger.error(f"❌ Test fallido: {e}")
         return False
 
+def benchmark_agent_solvers(samples: int = 500, seed: int = 42) -> Dict:
+    """Comparar la búsqueda lineal contra el solver de acotamiento + bisección"""
+    print(f"⏱️ Benchmark de solvers de agentes ({samples} casos)...")
+    
+    rng = np.random.default_rng(seed)
+    traffic = rng.uniform(1, 400, samples)
+    aht = rng.uniform(120, 480, samples)
+    sla = rng.choice([0.80, 0.90], samples)
+    answer_time = rng.choice([20, 30], samples)
+    cases = list(zip(traffic, sla, answer_time, aht))
+    
+    start = time.perf_counter()
+    scan = [erlang_calculator._find_minimum_agents(*case) for case in cases]
+    scan_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    bisection = [erlang_calculator._solve_minimum_agents(*case)[0] for case in cases]
+    bisection_seconds = time.perf_counter() - start
+    
+    mismatches = sum(1 for a, b in zip(scan, bisection) if a != b)
+    results = {
+        'samples': samples,
+        'scan_seconds': round(scan_seconds, 4),
+        'bisection_seconds': round(bisection_seconds, 4),
+        'speedup': round(scan_seconds / bisection_seconds, 1) if bisection_seconds > 0 else None,
+        'mismatches': mismatches
+    }
+    
+    print(f"   🔁 Búsqueda lineal: {results['scan_seconds']}s")
+    print(f"   ✂️ Bisección: {results['bisection_seconds']}s (x{results['speedup']})")
+    print(f"   🔍 Diferencias: {mismatches} (casos en el borde de la tolerancia self.precision)")
+    return results
+
 if __name__ == "__main__":
-    # Ejecutar test
-    test_erlang_calculator()
\ No newline at end of file
+    if '--benchmark' in sys.argv:
+        benchmark_agent_solvers()
+    else:
+        # Ejecutar test
+        test_erlang_calculator()
\ No newline at end of file
@@ -0,0 +1,230 @@
+"""
+Tablas precalculadas de dimensionamiento Erlang C (memory-mapped)
+
+Para un SLA fijo, el mínimo de agentes solo depende de la intensidad de tráfico A
+y del cociente tiempo de respuesta / TMO, así que una tabla densa
+"agentes mínimos vs (A, T/TMO)" cubre cualquier combinación de volumen, TMO y
+tiempo de respuesta. Las tablas se guardan como .npy y se abren con mmap en modo
+solo lectura, de modo que varios procesos comparten una única copia en memoria.
+
+Uso por línea de comandos:
+    python engines/erlang_tables.py generate --sla 0.90 --sla 0.80
+    python engines/erlang_tables.py list
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Agregar paths
+sys.path.append(str(Path(__file__).parent.parent))
+
+from engines.erlang_calculator import ErlangCalculator, erlang_calculator
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TABLES_DIR = Path(__file__).parent.parent / 'cache' / 'erlang_tables'
+
+class ErlangStaffingTables:
+    """Registro perezoso de tablas de agentes mínimos por SLA"""
+
+    def __init__(self, directory: Optional[str] = None,
+                 traffic_max: float = 1000.0, traffic_step: float = 0.5,
+                 ratio_max: float = 1.0, ratio_step: float = 0.005):
+        self.directory = Path(directory or os.getenv('ERLANG_TABLES_DIR', str(DEFAULT_TABLES_DIR)))
+        self.enabled = os.getenv('ERLANG_TABLES_ENABLED', 'true').lower() == 'true'
+
+        # Ejes por defecto para generar nuevas tablas
+        self.traffic_max = traffic_max
+        self.traffic_step = traffic_step
+        self.ratio_max = ratio_max
+        self.ratio_step = ratio_step
+
+        self._tables: Dict[str, Optional[Tuple[np.ndarray, Dict]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _policy_name(sla_target: float) -> str:
+        """Nombre de archivo para un SLA (0.90 -> erlang_c_sla9000)"""
+        return f"erlang_c_sla{int(round(sla_target * 10000)):04d}"
+
+    def table_path(self, sla_target: float) -> Path:
+        """Ruta del archivo .npy de un SLA"""
+        return self.directory / f"{self._policy_name(sla_target)}.npy"
+
+    def generate(self, sla_target: float, calculator: Optional[ErlangCalculator] = None) -> Path:
+        """
+        Calcular y guardar la tabla de un SLA usando el solver vectorizado
+
+        Returns:
+            Path: Ruta del archivo .npy generado
+        """
+        calculator = calculator or erlang_calculator
+        start = time.perf_counter()
+
+        traffic_axis = np.arange(0.0, self.traffic_max + self.traffic_step / 2, self.traffic_step)
+        ratio_axis = np.arange(0.0, self.ratio_max + self.ratio_step / 2, self.ratio_step)
+        traffic_grid, ratio_grid = np.meshgrid(traffic_axis, ratio_axis, indexing='ij')
+
+        # Con TMO = 3600s, llamadas/hora = A y tiempo de respuesta = (T/TMO) * 3600
+        agents, _, _, feasible = calculator._solve_batch(
+            traffic_grid.ravel(),
+            np.full(traffic_grid.size, 3600.0),
+            np.full(traffic_grid.size, sla_target),
+            ratio_grid.ravel() * 3600
+        )
+        table = np.where(feasible, agents, 0).astype(np.int32).reshape(traffic_grid.shape)
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.table_path(sla_target)
+        np.save(path, table)
+
+        metadata = {
+            'sla_target': sla_target,
+            'precision': calculator.precision,
+            'traffic_step': self.traffic_step,
+            'traffic_points': len(traffic_axis),
+            'ratio_step': self.ratio_step,
+            'ratio_points': len(ratio_axis),
+            'generated_at': datetime.now().isoformat(timespec='seconds')
+        }
+        path.with_suffix('.json').write_text(json.dumps(metadata, indent=2))
+
+        with self._lock:
+            self._tables.pop(self._policy_name(sla_target), None)
+
+        logger.info(f"💾 Tabla SLA {sla_target*100:.1f}% generada: {table.shape} en {time.perf_counter() - start:.1f}s")
+        return path
+
+    def load(self, sla_target: float) -> Optional[Tuple[np.ndarray, Dict]]:
+        """Abrir (una sola vez) la tabla de un SLA con mmap de solo lectura"""
+        name = self._policy_name(sla_target)
+        with self._lock:
+            if name in self._tables:
+                return self._tables[name]
+
+            entry = None
+            path = self.table_path(sla_target)
+            if path.exists() and path.with_suffix('.json').exists():
+                try:
+                    table = np.load(path, mmap_mode='r')
+                    metadata = json.loads(path.with_suffix('.json').read_text())
+                    entry = (table, metadata)
+                    logger.info(f"🗺️ Tabla Erlang mapeada: {path.name} {table.shape}")
+                except Exception as e:
+                    logger.warning(f"⚠️ No se pudo abrir tabla {path.name}: {e}")
+
+            # También se recuerda la ausencia para no consultar el disco en cada cálculo
+            self._tables[name] = entry
+            return entry
+
+    def preload(self) -> List[str]:
+        """Mapear en memoria todas las tablas disponibles (p.ej. al iniciar la aplicación)"""
+        loaded = []
+        if not self.enabled or not self.directory.exists():
+            return loaded
+        for path in sorted(self.directory.glob('erlang_c_sla*.npy')):
+            sla_target = int(path.stem.replace('erlang_c_sla', '')) / 10000
+            if self.load(sla_target) is not None:
+                loaded.append(path.name)
+        return loaded
+
+    def lookup_bounds(self, traffic_intensity: float, ratio: float,
+                      sla_target: float, precision: float) -> Optional[Tuple[int, int]]:
+        """
+        Cotas (inferior, superior) del mínimo de agentes a partir de la tabla
+
+        Los agentes crecen con A y decrecen con T/TMO, así que las esquinas opuestas
+        de la celda de la grilla acotan el valor exacto. Retorna None si no hay tabla
+        para el SLA o el punto cae fuera de la grilla.
+        """
+        if not self.enabled:
+            return None
+        entry = self.load(sla_target)
+        if entry is None:
+            return None
+        table, metadata = entry
+        if metadata['precision'] != precision:
+            return None
+
+        traffic_position = traffic_intensity / metadata['traffic_step']
+        ratio_position = ratio / metadata['ratio_step']
+        if not (0 <= traffic_position <= metadata['traffic_points'] - 1):
+            return None
+        if not (0 <= ratio_position <= metadata['ratio_points'] - 1):
+            return None
+
+        traffic_lo, traffic_hi = math.floor(traffic_position), math.ceil(traffic_position)
+        ratio_lo, ratio_hi = math.floor(ratio_position), math.ceil(ratio_position)
+        lower = int(table[traffic_lo, ratio_hi])
+        upper = int(table[traffic_hi, ratio_lo])
+
+        if lower <= 0 or upper <= 0:
+            return None  # Celda sin solución factible en la tabla
+        return lower, upper
+
+    def available(self) -> List[Dict]:
+        """Listar tablas generadas con su metadata"""
+        tables = []
+        if not self.directory.exists():
+            return tables
+        for meta_path in sorted(self.directory.glob('erlang_c_sla*.json')):
+            metadata = json.loads(meta_path.read_text())
+            metadata['file'] = meta_path.with_suffix('.npy').name
+            tables.append(metadata)
+        return tables
+
+# Instancia global
+staffing_tables = ErlangStaffingTables()
+
+def main(argv: Optional[List[str]] = None):
+    """CLI para (re)generar y listar tablas"""
+    parser = argparse.ArgumentParser(description="Tablas precalculadas de dimensionamiento Erlang C")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    generate_parser = subparsers.add_parser('generate', help='Generar tablas para uno o más SLA')
+    generate_parser.add_argument('--sla', type=float, action='append', required=True,
+                                 help='Objetivo de nivel de servicio (0.90 = 90%%); repetir para varios')
+    generate_parser.add_argument('--dir', default=None, help='Directorio de salida')
+    generate_parser.add_argument('--traffic-max', type=float, default=1000.0, help='Máxima intensidad (Erlangs)')
+    generate_parser.add_argument('--traffic-step', type=float, default=0.5, help='Paso del eje de tráfico')
+    generate_parser.add_argument('--ratio-max', type=float, default=1.0, help='Máximo cociente T/TMO')
+    generate_parser.add_argument('--ratio-step', type=float, default=0.005, help='Paso del eje T/TMO')
+
+    list_parser = subparsers.add_parser('list', help='Listar tablas disponibles')
+    list_parser.add_argument('--dir', default=None, help='Directorio de tablas')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'generate':
+        tables = ErlangStaffingTables(
+            directory=args.dir,
+            traffic_max=args.traffic_max, traffic_step=args.traffic_step,
+            ratio_max=args.ratio_max, ratio_step=args.ratio_step
+        )
+        for sla_target in args.sla:
+            print(f"🧮 Generando tabla para SLA {sla_target*100:.1f}%...")
+            path = tables.generate(sla_target)
+            print(f"✅ {path}")
+    else:
+        tables = ErlangStaffingTables(directory=args.dir)
+        available = tables.available()
+        if not available:
+            print(f"📭 No hay tablas en {tables.directory}")
+        for metadata in available:
+            print(f"   📄 {metadata['file']}: SLA {metadata['sla_target']*100:.1f}% | "
+                  f"{metadata['traffic_points']}x{metadata['ratio_points']} | {metadata['generated_at']}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(name)s:%(message)s')
+    main()
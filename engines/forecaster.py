@@ -0,0 +1,418 @@
+"""
+Pronóstico estacional de demanda (día de semana x intervalo de 15 minutos)
+
+Los escenarios históricos solo miran atrás; para dimensionar las próximas semanas
+el pronóstico separa la demanda en dos partes:
+
+- Volumen diario: Holt-Winters multiplicativo con tendencia amortiguada y
+  estacionalidad semanal. Los errores de un paso se recortan (Huber) con una
+  escala robusta, así un feriado o una caída del sistema no arrastran el nivel.
+  La recursión avanza día a día pero cada paso es vectorizado sobre campañas.
+- Forma intradía y TMO: perfiles por día de semana e intervalo como promedios
+  ponderados exponencialmente por antigüedad (media vida en semanas), calculados
+  para todas las campañas con un solo producto de matrices.
+
+El resultado es una matriz (campañas x días x intervalos) de llamadas y TMO que
+calculate_erlang_c_batch consume directamente para obtener la dotación.
+"""
+
+import logging
+import os
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Agregar paths
+sys.path.append(str(Path(__file__).parent.parent))
+
+from data.demand_matrix import DemandMatrix, WEEKDAY_NAMES
+
+logger = logging.getLogger(__name__)
+
+# TMO usado si una campaña no tiene ninguna llamada con TMO
+DEFAULT_AHT_SECONDS = 180.0
+
+def weekdays(days: np.ndarray) -> np.ndarray:
+    """Día de semana (0 = lunes) de fechas datetime64[D], igual que DemandMatrix.weekday_mask"""
+    return (days.astype('datetime64[D]').astype(np.int64) + 3) % 7
+
+@dataclass
+class SeasonalForecast:
+    """Llamadas y TMO esperados por (campaña, día, intervalo) para el horizonte pronosticado"""
+    campaigns: List[str]
+    dates: np.ndarray            # Días pronosticados (datetime64[D])
+    calls: np.ndarray            # Llamadas esperadas (campañas x días x intervalos)
+    aht: np.ndarray              # TMO esperado en segundos (campañas x días x intervalos)
+    interval_minutes: int
+    level: np.ndarray            # Nivel desestacionalizado de llamadas/día al cierre de la historia
+    trend: np.ndarray            # Tendencia del nivel (llamadas/día por día)
+    weekday_factors: np.ndarray  # Factor de cada día de semana (campañas x 7, promedio 1)
+    fit_mae: np.ndarray          # Error absoluto medio de un paso en la historia (llamadas/día)
+    fit_seconds: float
+
+    @property
+    def horizon_days(self) -> int:
+        return len(self.dates)
+
+    def daily_calls(self) -> np.ndarray:
+        """Llamadas esperadas por día (campañas x días)"""
+        return self.calls.sum(axis=2)
+
+    def calls_per_hour(self) -> np.ndarray:
+        """Llamadas por hora equivalentes de cada intervalo (entrada de Erlang C)"""
+        return self.calls * (60 / self.interval_minutes)
+
+    def staffing(self, sla_target: float = 0.90, answer_time_target: int = 20,
+                 shrinkage_pct: float = 15.0, calculator=None):
+        """
+        Dotación Erlang C de cada (campaña, día, intervalo) en una sola llamada por lote
+
+        Los intervalos sin llamadas esperadas quedan con 0 agentes (Erlang C pediría 1).
+
+        Returns:
+            ErlangBatchResults con la forma de la matriz pronosticada
+        """
+        if calculator is None:
+            from engines.erlang_calculator import erlang_calculator as calculator
+
+        results = calculator.calculate_erlang_c_batch(
+            calls_per_hour=self.calls_per_hour(),
+            average_handle_time=self.aht,
+            service_level_target=sla_target,
+            answer_time_target=answer_time_target,
+            shrinkage_percentage=shrinkage_pct,
+            use_cache=False
+        )
+        closed = self.calls <= 0
+        results.agents_required[closed] = 0
+        results.agents_with_shrinkage[closed] = 0
+        results.utilization[closed] = 0.0
+        return results
+
+    def to_dict(self) -> Dict:
+        """Resumen por campaña: llamadas por día, nivel, tendencia y factores semanales"""
+        daily = self.daily_calls()
+        return {
+            'dates': [str(day) for day in self.dates],
+            'interval_minutes': self.interval_minutes,
+            'campaigns': {
+                campaign: {
+                    'daily_calls': np.round(daily[index], 1).tolist(),
+                    'level': round(float(self.level[index]), 2),
+                    'trend_per_day': round(float(self.trend[index]), 3),
+                    'weekday_factors': {
+                        WEEKDAY_NAMES[weekday]: round(float(self.weekday_factors[index, weekday]), 3)
+                        for weekday in range(7)
+                    },
+                    'fit_mae': round(float(self.fit_mae[index]), 2)
+                }
+                for index, campaign in enumerate(self.campaigns)
+            },
+            'fit_seconds': round(self.fit_seconds, 4)
+        }
+
+class SeasonalForecaster:
+    """Holt-Winters robusto para el volumen diario + perfiles intradía ponderados"""
+
+    def __init__(self, alpha: float = 0.2, beta: float = 0.02, gamma: float = 0.1,
+                 damping: float = 0.98, huber_k: float = 2.5,
+                 profile_half_life_weeks: Optional[float] = None):
+        self.alpha = alpha            # Suavizado del nivel
+        self.beta = beta              # Suavizado de la tendencia
+        self.gamma = gamma            # Suavizado de los factores semanales
+        self.damping = damping        # Amortiguación de la tendencia (phi)
+        self.huber_k = huber_k        # Errores recortados a ±k veces la escala robusta
+        self.profile_half_life_weeks = profile_half_life_weeks or float(
+            os.getenv('FORECAST_PROFILE_HALF_LIFE_WEEKS', '4')
+        )
+
+    def fit_matrix(self, matrix: DemandMatrix, horizon_weeks: Optional[int] = None,
+                   campaign: str = 'campaña', last_day=None) -> SeasonalForecast:
+        """Pronóstico de una sola campaña desde su DemandMatrix (ver fit_matrices)"""
+        return self.fit_matrices({campaign: matrix}, horizon_weeks, last_day)
+
+    def fit_matrices(self, matrices: Dict[str, DemandMatrix],
+                     horizon_weeks: Optional[int] = None, last_day=None) -> SeasonalForecast:
+        """
+        Pronóstico de varias campañas a la vez, alineando sus matrices al mismo calendario
+
+        Los días sin datos de una campaña dentro del calendario común cuentan como días sin llamadas.
+        La matriz termina en el último día con llamadas: last_day (fecha) extiende el calendario
+        hasta el fin real de la historia (p.ej. un fin de semana cerrado), para que el pronóstico
+        empiece el día siguiente a ese y no al último día con llamadas.
+        """
+        campaigns = list(matrices)
+        present = [matrix for matrix in matrices.values() if matrix.num_days]
+        if not present:
+            raise ValueError("No hay historia para pronosticar")
+
+        interval_minutes = present[0].interval_minutes
+        first_day = min(matrix.dates[0] for matrix in present)
+        history_end = max(matrix.dates[-1] for matrix in present)
+        if last_day is not None:
+            history_end = max(history_end, np.datetime64(last_day, 'D'))
+        num_days = int((history_end - first_day).astype(int)) + 1
+        calls = np.zeros((len(campaigns), num_days, present[0].intervals_per_day))
+        aht_sum = np.zeros_like(calls)
+        for index, matrix in enumerate(matrices.values()):
+            if matrix.num_days:
+                offset = int((matrix.dates[0] - first_day).astype(int))
+                calls[index, offset:offset + matrix.num_days] = matrix.calls
+                aht_sum[index, offset:offset + matrix.num_days] = matrix.aht_sum
+
+        return self.fit(calls, aht_sum, first_day, horizon_weeks, campaigns, interval_minutes)
+
+    def fit(self, calls: np.ndarray, aht_sum: np.ndarray, first_day, horizon_weeks: Optional[int] = None,
+            campaigns: Optional[List[str]] = None, interval_minutes: int = 15) -> SeasonalForecast:
+        """
+        Ajustar y pronosticar desde matrices de historia ya alineadas
+
+        Args:
+            calls: Llamadas (campañas x días x intervalos) o (días x intervalos) para una campaña
+            aht_sum: Suma de TMO en segundos con la misma forma
+            first_day: Fecha del primer día de la historia
+            horizon_weeks: Semanas a pronosticar desde el día siguiente a la historia
+                (por defecto FORECAST_HORIZON_WEEKS)
+            campaigns: Nombre de cada campaña (por defecto su posición)
+        """
+        start = time.perf_counter()
+        calls = np.asarray(calls, dtype=np.float64)
+        aht_sum = np.asarray(aht_sum, dtype=np.float64)
+        if calls.ndim == 2:
+            calls, aht_sum = calls[np.newaxis], aht_sum[np.newaxis]
+        num_campaigns, num_days, _ = calls.shape
+        if num_days == 0:
+            raise ValueError("No hay historia para pronosticar")
+
+        horizon_weeks = horizon_weeks or int(os.getenv('FORECAST_HORIZON_WEEKS', '4'))
+        history_days = np.datetime64(first_day, 'D') + np.arange(num_days)
+        future_days = history_days[-1] + 1 + np.arange(horizon_weeks * 7)
+        history_weekdays, future_weekdays = weekdays(history_days), weekdays(future_days)
+
+        # Volumen diario: Holt-Winters robusto y proyección con tendencia amortiguada
+        daily = calls.sum(axis=2)
+        level, trend, factors, fit_mae = self._holt_winters(daily, history_weekdays)
+        steps = np.arange(1, len(future_days) + 1)
+        damped_steps = np.cumsum(self.damping ** steps)
+        daily_forecast = np.maximum(
+            (level[:, np.newaxis] + damped_steps * trend[:, np.newaxis]) * factors[:, future_weekdays], 0.0
+        )
+
+        # Forma intradía y TMO por día de semana: promedios ponderados por antigüedad
+        share, aht = self._weekday_profiles(calls, aht_sum, history_weekdays)
+        forecast_calls = daily_forecast[:, :, np.newaxis] * share[:, future_weekdays]
+        forecast_aht = aht[:, future_weekdays]
+
+        forecast = SeasonalForecast(
+            campaigns=campaigns or [str(index) for index in range(num_campaigns)],
+            dates=future_days,
+            calls=forecast_calls,
+            aht=forecast_aht,
+            interval_minutes=interval_minutes,
+            level=level,
+            trend=trend,
+            weekday_factors=factors,
+            fit_mae=fit_mae,
+            fit_seconds=time.perf_counter() - start
+        )
+        logger.info(f"📈 Pronóstico de {num_campaigns} campañas x {len(future_days)} días "
+                    f"desde {num_days} días de historia en {forecast.fit_seconds:.3f}s")
+        return forecast
+
+    def _holt_winters(self, daily: np.ndarray, history_weekdays: np.ndarray):
+        """
+        Nivel, tendencia y factores semanales finales (multiplicativos) de cada campaña
+
+        Inicializa con las primeras semanas completas (hasta 4) y recorre la historia
+        recortando cada error de un paso a ±huber_k veces una escala robusta (promedio
+        móvil del error absoluto recortado). Los días de semana sin llamadas quedan con
+        factor 0 y no actualizan el nivel.
+
+        Returns:
+            (level, trend, factors (campañas x 7), mae de un paso)
+        """
+        num_campaigns, num_days = daily.shape
+        weeks = min(num_days // 7, 4)
+        eps = 1e-9
+
+        if weeks == 0:
+            # Menos de una semana: nivel plano, sin estacionalidad ni tendencia
+            level = daily.mean(axis=1)
+            return level, np.zeros(num_campaigns), np.ones((num_campaigns, 7)), np.zeros(num_campaigns)
+
+        initial = daily[:, :weeks * 7].reshape(num_campaigns, weeks, 7)
+        week_means = initial.mean(axis=2)
+        level = week_means[:, 0].copy()
+        trend = ((week_means[:, -1] - week_means[:, 0]) / (7 * (weeks - 1))
+                 if weeks > 1 else np.zeros(num_campaigns))
+        # Factor inicial: promedio de día / promedio de su semana, en semanas con llamadas
+        with_calls = (week_means > eps)[:, :, np.newaxis]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ratio_sum = np.where(with_calls, initial / week_means[:, :, np.newaxis], 0.0).sum(axis=1)
+            ratio_count = with_calls.sum(axis=1)
+        # Ordenados por día de semana (la historia puede empezar cualquier día)
+        factors = np.ones((num_campaigns, 7))
+        factors[:, history_weekdays[:7]] = np.where(ratio_count > 0, ratio_sum / np.maximum(ratio_count, 1), 1.0)
+        scale = np.maximum(np.abs(initial - week_means[:, :, np.newaxis]).mean(axis=(1, 2)), 1.0)
+
+        absolute_error = np.zeros(num_campaigns)
+        for day in range(num_days):
+            weekday = history_weekdays[day]
+            factor = factors[:, weekday]
+            expected_level = level + self.damping * trend
+            error = daily[:, day] - expected_level * factor
+            absolute_error += np.abs(error)
+
+            clipped = np.clip(error, -self.huber_k * scale, self.huber_k * scale)
+            observed = expected_level * factor + clipped
+            scale = 0.9 * scale + 0.1 * np.maximum(np.abs(clipped), 1.0)
+
+            with np.errstate(invalid='ignore', divide='ignore'):
+                new_level = np.where(factor > eps,
+                                     self.alpha * observed / factor + (1 - self.alpha) * expected_level,
+                                     expected_level)
+                new_level = np.maximum(new_level, 0.0)
+                factors[:, weekday] = np.where(new_level > eps,
+                                               self.gamma * observed / new_level + (1 - self.gamma) * factor,
+                                               factor)
+            trend = self.beta * (new_level - level) + (1 - self.beta) * self.damping * trend
+            level = new_level
+
+        # Factores con promedio 1 (el nivel absorbe la escala)
+        mean_factor = factors.mean(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            factors = np.where(mean_factor[:, np.newaxis] > eps, factors / mean_factor[:, np.newaxis], 1.0)
+        level, trend = level * mean_factor, trend * mean_factor
+        return level, trend, factors, absolute_error / num_days
+
+    def _weekday_profiles(self, calls: np.ndarray, aht_sum: np.ndarray, history_weekdays: np.ndarray):
+        """
+        Proporción del día y TMO de cada (campaña, día de semana, intervalo)
+
+        Cada día pesa 0.5 ** (antigüedad / media vida). Los días de semana sin historia
+        usan el perfil de todos los días; los intervalos sin llamadas heredan el TMO
+        promedio de la campaña.
+
+        Returns:
+            (share (campañas x 7 x intervalos, suma 1 por día), aht (campañas x 7 x intervalos))
+        """
+        num_days = calls.shape[1]
+        age = num_days - 1 - np.arange(num_days)
+        weights = 0.5 ** (age / (7 * self.profile_half_life_weeks))
+        # Pesos por día de semana (días x 7): un producto de matrices suma cada día de semana
+        by_weekday = np.zeros((num_days, 7))
+        by_weekday[np.arange(num_days), history_weekdays] = weights
+
+        weighted_calls = np.einsum('cdi,dk->cki', calls, by_weekday)
+        weighted_aht = np.einsum('cdi,dk->cki', aht_sum, by_weekday)
+        overall_calls = weighted_calls.sum(axis=1, keepdims=True)
+        overall_aht = weighted_aht.sum(axis=1, keepdims=True)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            day_totals = weighted_calls.sum(axis=2, keepdims=True)
+            share = np.where(day_totals > 0, weighted_calls / day_totals,
+                             overall_calls / overall_calls.sum(axis=2, keepdims=True))
+            share = np.nan_to_num(share)
+
+            campaign_aht = overall_aht.sum(axis=2, keepdims=True) / overall_calls.sum(axis=2, keepdims=True)
+            campaign_aht = np.where(np.isfinite(campaign_aht) & (campaign_aht > 0), campaign_aht, DEFAULT_AHT_SECONDS)
+            aht = np.where(weighted_calls > 0, weighted_aht / weighted_calls,
+                           np.where(overall_calls > 0, overall_aht / overall_calls, campaign_aht))
+        return share, aht
+
+# Instancia global
+seasonal_forecaster = SeasonalForecaster()
+
+def synthetic_demand(campaigns: int = 100, days: int = 364, intervals: int = 96, seed: int = 42):
+    """
+    Historia sintética (campañas x días x intervalos) con estacionalidad semanal,
+    tendencia, curva intradía, ruido de Poisson y algún día atípico (para benchmarks)
+
+    Returns:
+        (calls, aht_sum, first_day)
+    """
+    rng = np.random.default_rng(seed)
+    first_day = np.datetime64('2025-01-06')  # lunes
+    weekday = weekdays(first_day + np.arange(days))
+
+    base = rng.uniform(200, 5000, (campaigns, 1))
+    growth = rng.uniform(-0.0005, 0.001, (campaigns, 1))
+    weekly = np.array([1.15, 1.1, 1.05, 1.0, 0.95, 0.5, 0.25])
+    daily = base * (1 + growth * np.arange(days)) * weekly[weekday]
+    # Días atípicos (feriados, caídas)
+    daily *= np.where(rng.random((campaigns, days)) < 0.01, 0.2, 1.0)
+
+    slots = np.arange(intervals)
+    peak = rng.uniform(0.4, 0.6, (campaigns, 1)) * intervals
+    shape = np.exp(-((slots - peak) / (intervals / 8)) ** 2) + 0.3 * np.exp(-((slots - peak - intervals / 5) / (intervals / 10)) ** 2)
+    shape[:, (slots < intervals // 3) | (slots >= intervals - intervals // 8)] = 0.0
+    shape /= shape.sum(axis=1, keepdims=True)
+
+    calls = rng.poisson(daily[:, :, np.newaxis] * shape[:, np.newaxis, :]).astype(np.float64)
+    aht = rng.uniform(180, 420, (campaigns, 1, 1))
+    aht_sum = calls * aht
+    return calls, aht_sum, first_day
+
+def benchmark_forecaster(campaigns: int = 100, days: int = 364, horizon_weeks: int = 4,
+                         seed: int = 42) -> Dict:
+    """
+    Tiempo de ajuste por campaña, error del pronóstico sobre semanas reservadas y
+    tiempo de la dotación Erlang C del horizonte completo
+    """
+    calls, aht_sum, first_day = synthetic_demand(campaigns, days + horizon_weeks * 7, seed=seed)
+    forecaster = SeasonalForecaster()
+
+    forecast = forecaster.fit(calls[:, :days], aht_sum[:, :days], first_day, horizon_weeks)
+    actual_daily = calls[:, days:].sum(axis=2)
+    daily_error = np.abs(forecast.daily_calls() - actual_daily).sum(axis=1) / actual_daily.sum(axis=1)
+
+    start = time.perf_counter()
+    staffing = forecast.staffing()
+    staffing_seconds = time.perf_counter() - start
+
+    results = {
+        'campaigns': campaigns,
+        'history_days': days,
+        'horizon_days': forecast.horizon_days,
+        'fit_seconds': round(forecast.fit_seconds, 4),
+        'fit_ms_per_campaign': round(forecast.fit_seconds / campaigns * 1000, 3),
+        'daily_wape_median': round(float(np.median(daily_error)), 4),
+        'daily_wape_p90': round(float(np.percentile(daily_error, 90)), 4),
+        'staffing_cells': int(staffing.agents_required.size),
+        'staffing_seconds': round(staffing_seconds, 3)
+    }
+    logger.info(f"⏱️ Pronóstico: {results}")
+    return results
+
+def test_forecaster():
+    """Función de testing del pronóstico estacional"""
+    print("🧪 Iniciando test de pronóstico estacional...")
+
+    try:
+        calls, aht_sum, first_day = synthetic_demand(campaigns=3, days=16 * 7, seed=7)
+        forecast = seasonal_forecaster.fit(calls[:, :12 * 7], aht_sum[:, :12 * 7], first_day,
+                                           horizon_weeks=4, campaigns=['a', 'b', 'c'])
+        staffing = forecast.staffing(sla_target=0.80, answer_time_target=20)
+        actual = calls[:, 12 * 7:].sum(axis=2)
+        error = np.abs(forecast.daily_calls() - actual).sum(axis=1) / actual.sum(axis=1)
+
+        print("✅ Test completado exitosamente")
+        for index, campaign in enumerate(forecast.campaigns):
+            print(f"   {campaign}: nivel {forecast.level[index]:.0f} llamadas/día | "
+                  f"WAPE diario {error[index] * 100:.1f}% | "
+                  f"pico {int(staffing.agents_with_shrinkage[index].max())} agentes")
+        return True
+
+    except Exception as e:
+        print(f"❌ Test fallido: {e}")
+        logger.error(f"❌ Test fallido: {e}")
+        return False
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(name)s:%(message)s')
+    test_forecaster()
+    print(benchmark_forecaster())
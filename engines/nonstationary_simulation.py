@@ -0,0 +1,288 @@
+"""
+Simulación no estacionaria de un día completo (perfil de 15 minutos)
+
+Erlang C trata cada intervalo como independiente y en estado estacionario; en la
+práctica la cola acumulada en la hora pico se arrastra a los intervalos
+siguientes. Este modo simula el día completo de forma continua:
+
+- Llegadas de un proceso de Poisson no homogéneo generadas por thinning
+  vectorizado (todas las réplicas a la vez) a partir del perfil de 15 minutos.
+- Dotación por intervalo y cola FIFO que conserva su estado entre intervalos
+  (recursión de numpy_simulation.fifo_waits_batch): los agentes que entran en un
+  intervalo atienden la cola arrastrada del anterior.
+- Nivel de servicio, ASA y cola pendiente al cierre de cada intervalo,
+  comparados con Erlang C intervalo a intervalo.
+"""
+
+import logging
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+# Agregar paths
+sys.path.append(str(Path(__file__).parent.parent))
+
+from engines.numpy_simulation import _draw_service_times, fifo_waits_batch
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class NonStationaryInputs:
+    """Parámetros de la simulación intradía"""
+    calls_per_interval: Sequence[float]                 # Llamadas esperadas por intervalo en un día típico
+    aht_per_interval: Sequence[float]                   # TMO promedio por intervalo en segundos
+    agents: Union[int, Sequence[int]]                   # Agentes fijos o dotación por intervalo
+    interval_minutes: int = 15                          # Duración de cada intervalo del perfil
+    answer_time_target: int = 20                        # Tiempo de respuesta objetivo en segundos
+    aht_std_per_interval: Optional[Sequence[float]] = None  # Desv. estándar del TMO (lognormal); None = exponencial
+    rate_profile: str = 'step'                          # 'step' (constante por intervalo) o 'linear' (interpolada)
+    num_replications: int = field(default_factory=lambda: int(os.getenv('NUM_REPLICATIONS', '10')))
+    random_seed: int = field(default_factory=lambda: int(os.getenv('RANDOM_SEED', '42')))
+
+    @classmethod
+    def from_interval_analysis(cls, interval_analysis: Dict, days: int,
+                               agents: Union[int, Sequence[int]], **kwargs) -> 'NonStationaryInputs':
+        """
+        Construir el perfil de 15 minutos desde DataAnalyzer._analyze_by_intervals
+
+        Args:
+            interval_analysis: Dict con 'interval_profile_15min' {intervalo: {'llamadas', 'tmo_promedio', 'tmo_std'}}
+            days: Días con operación del período (los volúmenes del perfil son totales del período)
+            agents: Agentes fijos o dotación por intervalo (96 valores)
+        """
+        profile = interval_analysis.get('interval_profile_15min', {})
+        calls = np.zeros(96)
+        aht = np.zeros(96)
+        aht_std = np.zeros(96)
+        for slot, stats_by_slot in profile.items():
+            slot = int(slot)
+            calls[slot] = stats_by_slot.get('llamadas', 0) / max(1, days)
+            aht[slot] = stats_by_slot.get('tmo_promedio', 0) or 0
+            aht_std[slot] = stats_by_slot.get('tmo_std', 0) or 0
+
+        # Intervalos sin tráfico heredan el TMO promedio para evitar TMO = 0
+        fallback_aht = float(np.average(aht[calls > 0], weights=calls[calls > 0])) if calls.sum() > 0 else 180.0
+        aht = np.where(aht > 0, aht, fallback_aht)
+
+        return cls(
+            calls_per_interval=calls.tolist(),
+            aht_per_interval=aht.tolist(),
+            aht_std_per_interval=np.nan_to_num(aht_std).tolist(),
+            agents=agents,
+            interval_minutes=15,
+            **kwargs
+        )
+
+    @property
+    def interval_seconds(self) -> int:
+        return self.interval_minutes * 60
+
+    def agents_per_interval(self) -> np.ndarray:
+        """Dotación de cada intervalo"""
+        return np.broadcast_to(np.asarray(self.agents, dtype=int), (len(self.calls_per_interval),)).copy()
+
+    def arrival_rate(self, t: np.ndarray) -> np.ndarray:
+        """Tasa de llegadas por segundo en los instantes t (segundos desde el inicio del día)"""
+        rates = np.asarray(self.calls_per_interval, dtype=float) / self.interval_seconds
+        if self.rate_profile == 'linear':
+            # Interpolación cíclica entre los centros de los intervalos
+            centers = (np.arange(len(rates)) + 0.5) * self.interval_seconds
+            return np.maximum(0.0, np.interp(t, centers, rates, period=len(rates) * self.interval_seconds))
+        index = np.minimum((t // self.interval_seconds).astype(int), len(rates) - 1)
+        return rates[index]
+
+@dataclass
+class NonStationaryResults:
+    """Métricas por intervalo (promedio de réplicas) y del día completo"""
+    interval_minutes: int
+    calls: np.ndarray              # Llamadas simuladas por intervalo (promedio por réplica)
+    agents: np.ndarray             # Dotación por intervalo
+    service_level: np.ndarray      # SL simulado por intervalo (fracción, NaN sin llamadas)
+    average_wait_time: np.ndarray  # ASA simulado por intervalo en segundos
+    backlog_at_end: np.ndarray     # Llamadas en cola al cierre del intervalo (promedio)
+    erlang_service_level: np.ndarray  # SL de Erlang C con cada intervalo independiente
+    daily_service_level: float
+    daily_average_wait_time: float
+    replications: int
+    wall_time_seconds: float
+
+    def to_dict(self) -> Dict:
+        """Convertir a diccionario (SL en %) con una fila por intervalo"""
+        intervals = []
+        for i in range(len(self.calls)):
+            minutes = i * self.interval_minutes
+            intervals.append({
+                'intervalo': f"{minutes // 60:02d}:{minutes % 60:02d}",
+                'llamadas': round(float(self.calls[i]), 1),
+                'agentes': int(self.agents[i]),
+                'service_level': round(float(self.service_level[i]) * 100, 2) if not np.isnan(self.service_level[i]) else None,
+                'average_wait_time': round(float(self.average_wait_time[i]), 2) if not np.isnan(self.average_wait_time[i]) else None,
+                'cola_al_cierre': round(float(self.backlog_at_end[i]), 2),
+                'service_level_erlang_c': round(float(self.erlang_service_level[i]) * 100, 2)
+            })
+        return {
+            'intervals': intervals,
+            'daily_service_level': round(self.daily_service_level * 100, 2),
+            'daily_average_wait_time': round(self.daily_average_wait_time, 2),
+            'max_backlog': round(float(self.backlog_at_end.max()), 2) if self.backlog_at_end.size else 0.0,
+            'num_replications': self.replications,
+            'wall_time_seconds': round(self.wall_time_seconds, 3)
+        }
+
+class NonStationarySimulator:
+    """Simulador intradía vectorizado con cola arrastrada entre intervalos"""
+
+    def __init__(self, calculator=None):
+        self.calculator = calculator
+
+    def generate_arrivals(self, inputs: NonStationaryInputs, rng: np.random.Generator) -> List[np.ndarray]:
+        """
+        Llegadas de todas las réplicas por thinning de un proceso de Poisson no homogéneo
+
+        Se generan candidatos homogéneos con la tasa máxima del perfil y cada uno se
+        acepta con probabilidad tasa(t) / tasa máxima, todo en arreglos.
+
+        Returns:
+            List[np.ndarray]: Llegadas ordenadas de cada réplica
+        """
+        day_seconds = len(inputs.calls_per_interval) * inputs.interval_seconds
+        # Ambos perfiles (escalonado e interpolado) están acotados por el intervalo más cargado
+        max_rate = float(np.max(inputs.calls_per_interval, initial=0.0)) / inputs.interval_seconds
+        if max_rate <= 0:
+            return [np.empty(0) for _ in range(inputs.num_replications)]
+
+        candidates = rng.poisson(max_rate * day_seconds, inputs.num_replications)
+        replication = np.repeat(np.arange(inputs.num_replications), candidates)
+        times = rng.random(replication.size) * day_seconds
+
+        accepted = rng.random(times.size) * max_rate < inputs.arrival_rate(times)
+        replication, times = replication[accepted], times[accepted]
+        order = np.lexsort((times, replication))
+        counts = np.bincount(replication, minlength=inputs.num_replications)
+        return np.split(times[order], np.cumsum(counts)[:-1])
+
+    def simulate(self, inputs: NonStationaryInputs) -> NonStationaryResults:
+        """
+        Simular el día completo y calcular métricas por intervalo
+
+        Returns:
+            NonStationaryResults: SL/ASA/cola por intervalo y totales del día
+        """
+        try:
+            intervals = len(inputs.calls_per_interval)
+            replications = inputs.num_replications
+            interval_seconds = inputs.interval_seconds
+            staffing = inputs.agents_per_interval()
+            logger.info(f"🌊 Simulación intradía: {intervals} intervalos x {replications} réplicas...")
+            start = time.perf_counter()
+
+            rng = np.random.default_rng(inputs.random_seed)
+            arrivals_by_replication = self.generate_arrivals(inputs, rng)
+
+            aht = np.asarray(inputs.aht_per_interval, dtype=float)
+            aht_std = np.asarray(inputs.aht_std_per_interval if inputs.aht_std_per_interval is not None
+                                 else np.zeros(intervals), dtype=float)
+
+            # Matrices réplicas x llamadas (relleno con llegadas = inf)
+            max_calls = max((arrivals.size for arrivals in arrivals_by_replication), default=0)
+            arrivals_2d = np.full((replications, max_calls), np.inf)
+            for row, arrivals in enumerate(arrivals_by_replication):
+                arrivals_2d[row, :arrivals.size] = arrivals
+            valid = np.isfinite(arrivals_2d)
+            call_interval = np.minimum(np.where(valid, arrivals_2d, 0) // interval_seconds, intervals - 1).astype(int)
+
+            services_2d = np.zeros((replications, max_calls))
+            services_2d[valid] = _draw_service_times(rng, aht[call_interval[valid]], aht_std[call_interval[valid]])
+
+            waits = fifo_waits_batch(arrivals_2d, services_2d, staffing, interval_seconds)
+
+            # Métricas por intervalo de llegada, agregadas sobre todas las réplicas
+            interval_of_call = call_interval[valid]
+            call_waits = waits[valid]
+            calls = np.bincount(interval_of_call, minlength=intervals).astype(float)
+            answered = np.bincount(interval_of_call, weights=call_waits <= inputs.answer_time_target, minlength=intervals)
+            total_wait = np.bincount(interval_of_call, weights=call_waits, minlength=intervals)
+
+            with np.errstate(invalid='ignore', divide='ignore'):
+                service_level = np.where(calls > 0, answered / calls, np.nan)
+                average_wait_time = np.where(calls > 0, total_wait / calls, np.nan)
+
+            # Cola al cierre: una llamada está en cola al cierre de los intervalos [llegada, atención)
+            answer_interval = np.minimum((arrivals_2d[valid] + call_waits) // interval_seconds, intervals).astype(int)
+            queued = answer_interval > interval_of_call
+            backlog_delta = (np.bincount(interval_of_call[queued], minlength=intervals + 1)
+                             - np.bincount(answer_interval[queued], minlength=intervals + 1))
+            backlog_at_end = np.cumsum(backlog_delta)[:intervals] / max(1, replications)
+
+            results = NonStationaryResults(
+                interval_minutes=inputs.interval_minutes,
+                calls=calls / max(1, replications),
+                agents=staffing,
+                service_level=service_level,
+                average_wait_time=average_wait_time,
+                backlog_at_end=backlog_at_end,
+                erlang_service_level=self._erlang_service_level(inputs, staffing, aht),
+                daily_service_level=float((call_waits <= inputs.answer_time_target).mean()) if call_waits.size else 1.0,
+                daily_average_wait_time=float(call_waits.mean()) if call_waits.size else 0.0,
+                replications=replications,
+                wall_time_seconds=time.perf_counter() - start
+            )
+
+            logger.info(f"📊 SL diario simulado: {results.daily_service_level*100:.1f}% | "
+                        f"cola máxima al cierre: {results.backlog_at_end.max():.1f} | {results.wall_time_seconds:.2f}s")
+            return results
+
+        except Exception as e:
+            logger.error(f"❌ Error en simulación intradía: {e}")
+            raise
+
+    def _erlang_service_level(self, inputs: NonStationaryInputs, staffing: np.ndarray, aht: np.ndarray) -> np.ndarray:
+        """SL de Erlang C tratando cada intervalo como independiente y estacionario"""
+        calculator = self.calculator
+        if calculator is None:
+            from engines.erlang_calculator import erlang_calculator as calculator
+
+        traffic = np.asarray(inputs.calls_per_interval, dtype=float) * aht / inputs.interval_seconds
+        _, service_level = calculator.evaluate_agents_batch(traffic, staffing, aht, inputs.answer_time_target)
+        return service_level
+
+# Instancia global
+nonstationary_simulator = NonStationarySimulator()
+
+def test_nonstationary_simulation():
+    """Función de testing de la simulación intradía"""
+    print("🧪 Iniciando test de simulación no estacionaria...")
+
+    # Perfil con pico a media mañana: 40 -> 160 llamadas por 15 min, dotación plana
+    slots = np.arange(96)
+    calls = np.where((slots >= 32) & (slots < 80), 40 + 120 * np.exp(-((slots - 44) / 4.0) ** 2), 0)
+    inputs = NonStationaryInputs(
+        calls_per_interval=calls.tolist(),
+        aht_per_interval=[240] * 96,
+        agents=38,
+        num_replications=200
+    )
+
+    try:
+        results = nonstationary_simulator.simulate(inputs).to_dict()
+        print("✅ Test completado exitosamente")
+        print(f"   SL diario: {results['daily_service_level']}% | ASA: {results['daily_average_wait_time']}s | "
+              f"cola máxima: {results['max_backlog']} | {results['wall_time_seconds']}s")
+        for row in results['intervals'][40:52]:
+            print(f"   {row['intervalo']}: {row['llamadas']:6.1f} llamadas | SL {row['service_level']}% "
+                  f"(Erlang C {row['service_level_erlang_c']}%) | cola {row['cola_al_cierre']}")
+        return True
+
+    except Exception as e:
+        print(f"❌ Test fallido: {e}")
+        logger.error(f"❌ Test fallido: {e}")
+        return False
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(name)s:%(message)s')
+    test_nonstationary_simulation()
@@ -0,0 +1,400 @@
+"""
+Backend de simulación vectorizado en NumPy para colas FIFO de una sola habilidad
+
+Para una cola FIFO con N agentes no hace falta un bucle de eventos: cada llamada
+toma al agente que se libera primero, y su espera es max(0, libre - llegada)
+(recursión de Lindley generalizada a N servidores). Llegadas y TMO se generan
+como arreglos y la recursión se resuelve de dos formas:
+
+- Lote 2-D (réplicas x agentes): todas las réplicas avanzan juntas, llamada a llamada.
+- Heap de disponibilidad de agentes: para una sola historia larga (p.ej. reproducir
+  millones de llamadas reales de SQLConnector.get_campaign_data).
+
+El backend es intercambiable con SimPyBackend detrás de SimulationEngine
+(SimulationEngine(backend='numpy')).
+"""
+
+import heapq
+import logging
+import math
+import os
+import sys
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+# Agregar paths
+sys.path.append(str(Path(__file__).parent.parent))
+
+if TYPE_CHECKING:
+    from engines.simulation_engine import SimulationInputs
+
+logger = logging.getLogger(__name__)
+
+def _draw_service_times(rng: np.random.Generator, mean: np.ndarray, std: np.ndarray) -> np.ndarray:
+    """TMO lognormal por llamada (media/desviación por llamada); exponencial donde no hay desviación"""
+    mean = np.asarray(mean, dtype=float)
+    std = np.asarray(std, dtype=float)
+    lognormal = std > 0
+    services = np.empty(mean.size)
+
+    if lognormal.any():
+        sigma2 = np.log1p((std[lognormal] / mean[lognormal]) ** 2)
+        services[lognormal] = rng.lognormal(np.log(mean[lognormal]) - sigma2 / 2, np.sqrt(sigma2))
+    if (~lognormal).any():
+        services[~lognormal] = rng.exponential(mean[~lognormal])
+    return services
+
+def generate_replication(inputs: 'SimulationInputs', rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Generar llegadas y TMO de una réplica como arreglos
+
+    Las llegadas son Poisson constantes a trozos: por cada segmento del perfil se
+    sortea el número de llamadas y se reparten uniformemente dentro del segmento.
+    Los segmentos se alinean con el fin del warmup, igual que en el backend SimPy.
+
+    Returns:
+        Tuple: (llegadas en segundos ordenadas, TMO en segundos, máscara de llamadas medidas)
+    """
+    rates = inputs.arrival_rates()
+    aht = np.asarray(inputs.aht_per_interval, dtype=float)
+    aht_std = np.asarray(inputs.aht_std_per_interval if inputs.aht_std_per_interval is not None
+                         else np.zeros(len(aht)), dtype=float)
+    interval_seconds = inputs.interval_seconds
+    warmup = inputs.warmup_hours * 3600
+    horizon = warmup + inputs.simulation_hours * 3600
+
+    # Segmento m cubre [warmup + m*I, warmup + (m+1)*I) recortado a [0, horizonte]
+    segments = np.arange(math.floor(-warmup / interval_seconds),
+                         math.ceil(inputs.simulation_hours * 3600 / interval_seconds))
+    starts = np.maximum(0.0, warmup + segments * interval_seconds)
+    ends = np.minimum(horizon, warmup + (segments + 1) * interval_seconds)
+    profile_index = segments % len(rates)
+
+    counts = rng.poisson(rates[profile_index] * np.maximum(0.0, ends - starts))
+    call_segment = np.repeat(np.arange(segments.size), counts)
+    arrivals = starts[call_segment] + rng.random(call_segment.size) * (ends - starts)[call_segment]
+
+    # Ordenar dentro de cada segmento (los segmentos ya están en orden)
+    order = np.lexsort((arrivals, call_segment))
+    arrivals = arrivals[order]
+    call_interval = profile_index[call_segment]
+
+    services = _draw_service_times(rng, aht[call_interval], aht_std[call_interval])
+    return arrivals, services, arrivals >= warmup
+
+def _shift_table(agents: Sequence[int], interval_seconds: float) -> np.ndarray:
+    """
+    Momento desde el que cada agente está en turno, visto desde cada intervalo de la dotación
+
+    El agente j está en turno en el intervalo i si j < agentes[i] (mínimo 1 agente); el
+    último intervalo se extiende indefinidamente para atender la cola pendiente al cierre.
+
+    Returns:
+        np.ndarray: (intervalos x agentes) con el inicio en segundos del primer intervalo >= i
+            en que el agente j está en turno (inf si no vuelve a estarlo). Un agente libre en
+            el instante t del intervalo i puede atender desde max(t, tabla[i, j]).
+    """
+    profile = np.maximum(1, np.asarray(agents, dtype=int))
+    on_shift = np.arange(profile.max()) < profile[:, None]
+    interval_starts = np.arange(profile.size) * float(interval_seconds)
+    next_start = np.where(on_shift, interval_starts[:, None], np.inf)
+    return np.minimum.accumulate(next_start[::-1], axis=0)[::-1]
+
+def fifo_waits_batch(arrivals: np.ndarray, services: np.ndarray, agents: Union[int, Sequence[int]],
+                     interval_seconds: Optional[float] = None) -> np.ndarray:
+    """
+    Esperas FIFO de muchas réplicas a la vez (arreglos réplicas x llamadas)
+
+    Las réplicas con menos llamadas se rellenan con llegadas = inf; sus esperas
+    resultan NaN y deben descartarse.
+
+    Con dotación variable cada llamada empieza en max(llegada, libre[j], en turno desde[j])
+    con el agente que la puede atender primero: los agentes que entran al inicio de un
+    intervalo atienden la cola acumulada, y los que salen de turno terminan la llamada en curso.
+
+    Args:
+        arrivals: Llegadas en segundos (réplicas x llamadas), ordenadas por fila
+        services: TMO de cada llamada en segundos
+        agents: Agentes fijos, o dotación por intervalo (el intervalo k cubre
+            [k * interval_seconds, (k + 1) * interval_seconds))
+        interval_seconds: Duración de los intervalos de la dotación variable
+    """
+    replications, calls = arrivals.shape
+    rows = np.arange(replications)
+    waits = np.empty((replications, calls))
+
+    if np.ndim(agents) == 0:
+        free_at = np.zeros((replications, max(1, int(agents))))
+        with np.errstate(invalid='ignore'):
+            for k in range(calls):
+                agent = free_at.argmin(axis=1)
+                start = np.maximum(arrivals[:, k], free_at[rows, agent])
+                waits[:, k] = start - arrivals[:, k]
+                free_at[rows, agent] = start + services[:, k]
+        return waits
+
+    shifts = _shift_table(agents, interval_seconds)
+    last_interval = shifts.shape[0] - 1
+    columns = np.arange(shifts.shape[1])
+    free_at = np.zeros((replications, shifts.shape[1]))
+
+    with np.errstate(invalid='ignore'):
+        for k in range(calls):
+            ready = np.maximum(arrivals[:, k, None], free_at)
+            # fmin: las llegadas de relleno (inf) caen en el último intervalo en vez de NaN
+            interval = np.fmin(ready // interval_seconds, last_interval).astype(np.int64)
+            start_by_agent = np.maximum(ready, shifts[interval, columns])
+            agent = start_by_agent.argmin(axis=1)
+            start = start_by_agent[rows, agent]
+            waits[:, k] = start - arrivals[:, k]
+            free_at[rows, agent] = start + services[:, k]
+    return waits
+
+def fifo_waits_heap(arrivals: Sequence[float], services: Sequence[float], agents: Union[int, Sequence[int]],
+                    interval_seconds: Optional[float] = None) -> np.ndarray:
+    """
+    Esperas FIFO de una historia larga con un heap de disponibilidad de agentes
+
+    Con dotación variable los turnos están anidados (el agente j trabaja si j < agentes[i]):
+    entre los agentes libres el de menor índice es el primero en volver a estar en turno,
+    así que basta un heap de índices libres y otro de agentes ocupados por momento de
+    disponibilidad (misma semántica que fifo_waits_batch).
+
+    Args:
+        arrivals: Llegadas en segundos, ordenadas
+        services: TMO de cada llamada en segundos
+        agents: Agentes fijos, o dotación por intervalo (ver fifo_waits_batch)
+        interval_seconds: Duración de los intervalos de la dotación variable
+
+    Returns:
+        np.ndarray: Espera de cada llamada en segundos
+    """
+    arrivals_list = np.asarray(arrivals, dtype=float).tolist()
+    services_list = np.asarray(services, dtype=float).tolist()
+    waits = [0.0] * len(arrivals_list)
+
+    if np.ndim(agents) == 0:
+        free_at = [0.0] * max(1, int(agents))
+        for i, (arrival, service) in enumerate(zip(arrivals_list, services_list)):
+            start = max(arrival, free_at[0])
+            heapq.heapreplace(free_at, start + service)
+            waits[i] = start - arrival
+        return np.asarray(waits)
+
+    shifts = _shift_table(agents, interval_seconds).tolist()
+    last_interval = len(shifts) - 1
+
+    def on_shift_from(agent: int, moment: float) -> float:
+        return max(moment, shifts[min(int(moment // interval_seconds), last_interval)][agent])
+
+    # Ocupados: (momento en que vuelven a estar libres y en turno, agente); libres: índices
+    busy = [(on_shift_from(agent, 0.0), agent) for agent in range(len(shifts[0]))]
+    busy = [entry for entry in busy if entry[0] < math.inf]
+    heapq.heapify(busy)
+    idle: List[int] = []
+
+    for i, (arrival, service) in enumerate(zip(arrivals_list, services_list)):
+        while busy and busy[0][0] <= arrival:
+            heapq.heappush(idle, heapq.heappop(busy)[1])
+
+        # A igual momento se elige el agente de menor índice (el de turno más largo), como argmin
+        candidate = (on_shift_from(idle[0], arrival), idle[0]) if idle else (math.inf, math.inf)
+        if busy and busy[0] < candidate:
+            start, agent = heapq.heappop(busy)
+        else:
+            start, agent = candidate
+            heapq.heappop(idle)
+
+        waits[i] = start - arrival
+        available = on_shift_from(agent, start + service)
+        if available < math.inf:
+            heapq.heappush(busy, (available, agent))
+
+    return np.asarray(waits)
+
+def _replication_metrics(waits: np.ndarray, answer_time_target: float) -> Dict:
+    """Métricas de una réplica con el mismo formato que el backend SimPy"""
+    return {
+        'calls': int(waits.size),
+        'service_level': float((waits <= answer_time_target).mean()) if waits.size else 1.0,
+        'average_wait_time': float(waits.mean()) if waits.size else 0.0
+    }
+
+class NumpyBackend:
+    """Backend NumPy: réplicas en lotes 2-D, o heap si hay una sola réplica"""
+
+    name = 'numpy'
+
+    def __init__(self, max_workers: Optional[int] = None, batch_size: Optional[int] = None):
+        # max_workers se acepta por compatibilidad con SimPyBackend: el lote ya es vectorizado
+        self.max_workers = max_workers
+        self.batch_size = batch_size or int(os.getenv('SIMULATION_BATCH_SIZE', '256'))
+
+    def run_replications(self, inputs: 'SimulationInputs', seeds: List[np.random.SeedSequence]) -> List[Dict]:
+        # Cada réplica usa su propio flujo aleatorio: el tamaño de lote no cambia los resultados
+        generated = [generate_replication(inputs, np.random.default_rng(seed)) for seed in seeds]
+
+        if len(generated) == 1:
+            arrivals, services, measured = generated[0]
+            waits = fifo_waits_heap(arrivals, services, inputs.agents)
+            return [_replication_metrics(waits[measured], inputs.answer_time_target)]
+
+        results = []
+        for offset in range(0, len(generated), self.batch_size):
+            batch = generated[offset:offset + self.batch_size]
+            calls = max((arrivals.size for arrivals, _, _ in batch), default=0)
+            arrivals_2d = np.full((len(batch), calls), np.inf)
+            services_2d = np.zeros((len(batch), calls))
+            for row, (arrivals, services, _) in enumerate(batch):
+                arrivals_2d[row, :arrivals.size] = arrivals
+                services_2d[row, :services.size] = services
+
+            waits_2d = fifo_waits_batch(arrivals_2d, services_2d, inputs.agents)
+            for row, (arrivals, _, measured) in enumerate(batch):
+                waits = waits_2d[row, :arrivals.size][measured]
+                results.append(_replication_metrics(waits, inputs.answer_time_target))
+        return results
+
+def validate_history(df: pd.DataFrame, answer_time_target: int = 20,
+                     interval_minutes: int = 60, calculator=None) -> Dict:
+    """
+    Reproducir una historia real y comparar TME real vs simulado vs Erlang C
+
+    Las llegadas son hora_inicio_contrata, el TMO real de cada llamada es su
+    servicio y la dotación de cada intervalo es la cantidad de asesores distintos
+    que atendieron en él. Sirve para validar las predicciones de ErlangCalculator
+    contra el tme observado en historias de millones de llamadas.
+
+    Args:
+        df: DataFrame de SQLConnector.get_campaign_data (fecha, asesor, hora_inicio_contrata, tme, tmo)
+        answer_time_target: Tiempo de respuesta objetivo en segundos
+        interval_minutes: Duración de los intervalos de dotación
+        calculator: ErlangCalculator a validar (por defecto la instancia global)
+
+    Returns:
+        Dict: Resumen (SL/ASA real, simulado y Erlang C) y detalle por intervalo
+    """
+    if calculator is None:
+        from engines.erlang_calculator import erlang_calculator as calculator
+
+    try:
+        logger.info(f"🔁 Reproduciendo historia de {len(df):,} llamadas...")
+        start = time.perf_counter()
+
+        history = df[['asesor', 'hora_inicio_contrata', 'tme', 'tmo']].dropna(subset=['hora_inicio_contrata', 'tmo'])
+        history = history.sort_values('hora_inicio_contrata', kind='mergesort')
+        timestamps = pd.to_datetime(history['hora_inicio_contrata'])
+
+        interval_seconds = interval_minutes * 60
+        interval = timestamps.dt.floor(f'{interval_minutes}min')
+        agents_by_interval = history.groupby(interval.values)['asesor'].nunique()
+
+        # Dotación observada por intervalo desde el primero (los intervalos sin llamadas
+        # mantienen la dotación anterior) y llegadas medidas desde su inicio
+        origin = interval.iloc[0]
+        staffing = agents_by_interval.reindex(
+            pd.date_range(origin, interval.iloc[-1], freq=f'{interval_minutes}min')
+        ).ffill().to_numpy()
+        arrivals = (timestamps - origin).dt.total_seconds().to_numpy()
+        services = history['tmo'].to_numpy(dtype=float)
+        observed = history['tme'].to_numpy(dtype=float)
+        simulated = fifo_waits_heap(arrivals, services, staffing, interval_seconds)
+        replay_seconds = time.perf_counter() - start
+
+        # Predicción Erlang C por intervalo con la dotación observada
+        per_interval = pd.DataFrame({
+            'intervalo': interval.values,
+            'tme_real': observed,
+            'tme_simulado': simulated,
+            'tmo': services
+        }).groupby('intervalo').agg(
+            llamadas=('tmo', 'size'),
+            tmo_promedio=('tmo', 'mean'),
+            tme_real=('tme_real', 'mean'),
+            tme_simulado=('tme_simulado', 'mean')
+        )
+        per_interval['agentes'] = agents_by_interval.reindex(per_interval.index).to_numpy()
+        per_interval['trafico'] = per_interval['llamadas'] * per_interval['tmo_promedio'] / interval_seconds
+
+        predicted_sl, predicted_asa = [], []
+        for traffic, agents, aht in per_interval[['trafico', 'agentes', 'tmo_promedio']].itertuples(index=False):
+            prob_wait, service_level = calculator._evaluate_agents(traffic, int(agents), aht, answer_time_target)
+            predicted_sl.append(service_level)
+            predicted_asa.append(prob_wait * aht / (agents - traffic) if agents > traffic else np.nan)
+        per_interval['sl_erlang'] = predicted_sl
+        per_interval['tme_erlang'] = predicted_asa
+
+        calls = per_interval['llamadas']
+        stable = per_interval['tme_erlang'].notna()
+        summary = {
+            'llamadas': int(len(history)),
+            'intervalos': int(len(per_interval)),
+            'intervalos_sobrecargados': int((~stable).sum()),
+            'sl_real': float((observed <= answer_time_target).mean()),
+            'sl_simulado': float((simulated <= answer_time_target).mean()),
+            'sl_erlang': float(np.average(per_interval['sl_erlang'], weights=calls)),
+            'tme_real': float(np.nanmean(observed)),
+            'tme_simulado': float(simulated.mean()),
+            'tme_erlang': float(np.average(per_interval.loc[stable, 'tme_erlang'], weights=calls[stable]))
+                          if stable.any() else float('nan'),
+            'tiempo_replay_segundos': replay_seconds,
+            'tiempo_total_segundos': time.perf_counter() - start
+        }
+
+        logger.info(f"📊 SL real {summary['sl_real']*100:.1f}% | simulado {summary['sl_simulado']*100:.1f}% | "
+                    f"Erlang C {summary['sl_erlang']*100:.1f}% | {summary['tiempo_total_segundos']:.2f}s")
+        return {'summary': summary, 'per_interval': per_interval}
+
+    except Exception as e:
+        logger.error(f"❌ Error validando historia: {e}")
+        raise
+
+def test_numpy_simulation(calls: int = 1_000_000):
+    """Función de testing: réplicas 2-D vs SimPy y replay de una historia sintética"""
+    from engines.simulation_engine import SimulationEngine, SimulationInputs
+
+    print("🧪 Iniciando test de NumPy Simulation...")
+
+    try:
+        inputs = SimulationInputs(
+            calls_per_interval=[0] * 8 + [450] * 12 + [0] * 4,
+            aht_per_interval=[240] * 24,
+            agents=37,
+            answer_time_target=20,
+            num_replications=8
+        )
+        for backend in ('numpy', 'simpy'):
+            results = SimulationEngine(backend=backend).run(inputs).to_dict()
+            print(f"   {backend}: SL {results['service_level']} | ASA {results['average_wait_time']} | "
+                  f"{results['wall_time_seconds']}s")
+
+        # Historia sintética: M/M/N a 100 llamadas/min (400 Erlangs) con 410 agentes y TMO 240s
+        rng = np.random.default_rng(7)
+        arrivals = np.cumsum(rng.exponential(0.6, calls))
+        services = rng.exponential(240, calls)
+        waits = fifo_waits_heap(arrivals, services, 410)
+        history = pd.DataFrame({
+            'fecha': pd.Timestamp('2024-01-01').normalize(),
+            'asesor': np.arange(calls) % 410,
+            'hora_inicio_contrata': pd.Timestamp('2024-01-01') + pd.to_timedelta(arrivals, unit='s'),
+            'tme': waits,
+            'tmo': services
+        })
+        validation = validate_history(history)
+        print("✅ Test completado exitosamente")
+        for key, value in validation['summary'].items():
+            print(f"   {key}: {value}")
+        return True
+
+    except Exception as e:
+        print(f"❌ Test fallido: {e}")
+        logger.error(f"❌ Test fallido: {e}")
+        return False
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(name)s:%(message)s')
+    test_numpy_simulation()
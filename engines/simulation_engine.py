@@ -0,0 +1,291 @@
+"""
+Motor de Simulación de Eventos Discretos (SimPy) para Call Center Dimensioner
+
+Simula llegadas, TMO y cola FIFO a partir del perfil horario/15 min que produce
+DataAnalyzer._analyze_by_intervals. Las réplicas se ejecutan en paralelo en un
+ProcessPoolExecutor y cada una recibe su propio flujo aleatorio derivado de un
+SeedSequence, de modo que los resultados son reproducibles sin importar cuántos
+procesos se usen.
+"""
+
+import logging
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from scipy import stats
+
+# Agregar paths
+sys.path.append(str(Path(__file__).parent.parent))
+
+from engines.numpy_simulation import NumpyBackend
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class SimulationInputs:
+    """Parámetros de entrada para la simulación"""
+    calls_per_interval: Sequence[float]       # Llamadas esperadas por intervalo en un día típico
+    aht_per_interval: Sequence[float]         # TMO promedio por intervalo en segundos
+    agents: int                               # Agentes disponibles
+    interval_minutes: int = 60                # Duración de cada intervalo del perfil
+    answer_time_target: int = 20              # Tiempo de respuesta objetivo en segundos
+    aht_std_per_interval: Optional[Sequence[float]] = None  # Desv. estándar del TMO (lognormal); None = exponencial
+    simulation_hours: float = field(default_factory=lambda: float(os.getenv('SIMULATION_HOURS', '24')))
+    warmup_hours: float = field(default_factory=lambda: float(os.getenv('WARMUP_HOURS', '2')))
+    num_replications: int = field(default_factory=lambda: int(os.getenv('NUM_REPLICATIONS', '10')))
+    random_seed: int = field(default_factory=lambda: int(os.getenv('RANDOM_SEED', '42')))
+
+    @classmethod
+    def from_interval_analysis(cls, interval_analysis: Dict, days: int, agents: int, **kwargs) -> 'SimulationInputs':
+        """
+        Construir el perfil horario desde el resultado de DataAnalyzer._analyze_by_intervals
+
+        Args:
+            interval_analysis: Dict con 'hourly_profile' {hora: {'llamadas', 'tmo_promedio', 'tmo_std', ...}}
+            days: Días del período analizado (los volúmenes del perfil son totales del período)
+            agents: Agentes a simular
+        """
+        hourly_profile = interval_analysis.get('hourly_profile', {})
+        calls = np.zeros(24)
+        aht = np.zeros(24)
+        aht_std = np.zeros(24)
+        for hour, stats_by_hour in hourly_profile.items():
+            hour = int(hour)
+            calls[hour] = stats_by_hour.get('llamadas', 0) / max(1, days)
+            aht[hour] = stats_by_hour.get('tmo_promedio', 0) or 0
+            aht_std[hour] = stats_by_hour.get('tmo_std', 0) or 0
+
+        # Horas sin tráfico heredan el TMO promedio para evitar TMO = 0
+        fallback_aht = float(np.average(aht[calls > 0], weights=calls[calls > 0])) if calls.sum() > 0 else 180.0
+        aht = np.where(aht > 0, aht, fallback_aht)
+
+        return cls(
+            calls_per_interval=calls.tolist(),
+            aht_per_interval=aht.tolist(),
+            aht_std_per_interval=np.nan_to_num(aht_std).tolist(),
+            agents=agents,
+            interval_minutes=60,
+            **kwargs
+        )
+
+    @property
+    def interval_seconds(self) -> int:
+        return self.interval_minutes * 60
+
+    def arrival_rates(self) -> np.ndarray:
+        """Tasa de llegadas por segundo de cada intervalo"""
+        return np.asarray(self.calls_per_interval, dtype=float) / self.interval_seconds
+
+@dataclass
+class SimulationResults:
+    """Resultados agregados de las réplicas"""
+    service_level: Dict            # {'mean', 'std', 'ci_low', 'ci_high'} en fracción
+    average_wait_time: Dict        # {'mean', 'std', 'ci_low', 'ci_high'} en segundos
+    replications: List[Dict]       # Métricas de cada réplica
+    backend: str                   # Backend usado
+    wall_time_seconds: float       # Tiempo de ejecución
+    confidence_level: float = 0.95
+
+    def to_dict(self) -> Dict:
+        """Convertir a diccionario para fácil acceso (SL en %)"""
+        return {
+            'service_level': {k: round(v * 100, 2) for k, v in self.service_level.items()},
+            'average_wait_time': {k: round(v, 2) for k, v in self.average_wait_time.items()},
+            'num_replications': len(self.replications),
+            'calls_per_replication': round(float(np.mean([r['calls'] for r in self.replications])), 1) if self.replications else 0,
+            'backend': self.backend,
+            'wall_time_seconds': round(self.wall_time_seconds, 3),
+            'confidence_level': self.confidence_level
+        }
+
+def _draw_service_times(rng: np.random.Generator, mean: float, std: float, size: int) -> np.ndarray:
+    """TMO lognormal con la media/desviación dadas; exponencial si no hay desviación"""
+    if std and std > 0:
+        sigma2 = math.log(1 + (std / mean) ** 2)
+        return rng.lognormal(math.log(mean) - sigma2 / 2, math.sqrt(sigma2), size)
+    return rng.exponential(mean, size)
+
+def _run_simpy_replication(inputs: SimulationInputs, seed: np.random.SeedSequence) -> Dict:
+    """Ejecutar una réplica SimPy (función de módulo para poder enviarla a otros procesos)"""
+    import simpy
+
+    rng = np.random.default_rng(seed)
+    env = simpy.Environment()
+    agents = simpy.Resource(env, capacity=inputs.agents)
+
+    rates = inputs.arrival_rates()
+    aht = np.asarray(inputs.aht_per_interval, dtype=float)
+    aht_std = np.asarray(inputs.aht_std_per_interval if inputs.aht_std_per_interval is not None
+                         else np.zeros(len(aht)), dtype=float)
+    interval_seconds = inputs.interval_seconds
+    intervals_per_day = len(rates)
+    warmup = inputs.warmup_hours * 3600
+    horizon = warmup + inputs.simulation_hours * 3600
+
+    waits: List[float] = []
+
+    def interval_at(t: float) -> int:
+        # El perfil es cíclico y el día simulado empieza al terminar el warmup
+        return int(((t - warmup) % (interval_seconds * intervals_per_day)) // interval_seconds) % intervals_per_day
+
+    def caller(arrival: float, service: float):
+        with agents.request() as request:
+            yield request
+            if arrival >= warmup:
+                waits.append(env.now - arrival)
+            yield env.timeout(service)
+
+    def source():
+        while env.now < horizon:
+            interval = interval_at(env.now)
+            offset = (env.now - warmup) % interval_seconds
+            boundary = min(horizon, env.now + interval_seconds - (offset if offset < interval_seconds else 0))
+            rate = rates[interval]
+            gap = rng.exponential(1 / rate) if rate > 0 else math.inf
+
+            # Llegadas sin memoria: al cruzar el límite del intervalo se vuelve a muestrear
+            if env.now + gap >= boundary:
+                yield env.timeout(boundary - env.now)
+                continue
+
+            yield env.timeout(gap)
+            service = _draw_service_times(rng, aht[interval], aht_std[interval], 1)[0]
+            env.process(caller(env.now, service))
+
+    env.process(source())
+    env.run()  # Se vacía la cola después del horizonte
+
+    waits_array = np.asarray(waits)
+    return {
+        'calls': int(waits_array.size),
+        'service_level': float((waits_array <= inputs.answer_time_target).mean()) if waits_array.size else 1.0,
+        'average_wait_time': float(waits_array.mean()) if waits_array.size else 0.0
+    }
+
+class SimPyBackend:
+    """Backend SimPy: una réplica por tarea en un ProcessPoolExecutor"""
+
+    name = 'simpy'
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or int(os.getenv('SIMULATION_MAX_WORKERS', str(os.cpu_count() or 1)))
+
+    def run_replications(self, inputs: SimulationInputs, seeds: List[np.random.SeedSequence]) -> List[Dict]:
+        workers = min(self.max_workers, len(seeds))
+        if workers <= 1:
+            return [_run_simpy_replication(inputs, seed) for seed in seeds]
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(_run_simpy_replication, [inputs] * len(seeds), seeds))
+
+SIMULATION_BACKENDS = {
+    'simpy': SimPyBackend,
+    'numpy': NumpyBackend
+}
+
+class SimulationEngine:
+    """Motor de simulación con backends intercambiables"""
+
+    def __init__(self, backend: Optional[str] = None, max_workers: Optional[int] = None):
+        backend = backend or os.getenv('SIMULATION_BACKEND', 'simpy')
+        if backend not in SIMULATION_BACKENDS:
+            raise ValueError(f"Backend de simulación desconocido: {backend}. Opciones: {list(SIMULATION_BACKENDS)}")
+        self.backend = SIMULATION_BACKENDS[backend](max_workers=max_workers)
+
+    def run(self, inputs: SimulationInputs, confidence_level: float = 0.95) -> SimulationResults:
+        """
+        Ejecutar todas las réplicas y calcular intervalos de confianza
+
+        Args:
+            inputs: Parámetros de la simulación
+            confidence_level: Nivel de confianza de los intervalos (t de Student)
+
+        Returns:
+            SimulationResults: Medias e intervalos de confianza de SL y ASA
+        """
+        try:
+            logger.info(f"🎲 Simulando {inputs.num_replications} réplicas ({self.backend.name}) con {inputs.agents} agentes...")
+            start = time.perf_counter()
+
+            seeds = np.random.SeedSequence(inputs.random_seed).spawn(inputs.num_replications)
+            replications = self.backend.run_replications(inputs, seeds)
+
+            results = SimulationResults(
+                service_level=self._confidence_interval(
+                    [r['service_level'] for r in replications], confidence_level, lower=0.0, upper=1.0
+                ),
+                average_wait_time=self._confidence_interval(
+                    [r['average_wait_time'] for r in replications], confidence_level, lower=0.0
+                ),
+                replications=replications,
+                backend=self.backend.name,
+                wall_time_seconds=time.perf_counter() - start,
+                confidence_level=confidence_level
+            )
+
+            logger.info(f"📊 SL simulado: {results.service_level['mean']*100:.1f}% "
+                        f"[{results.service_level['ci_low']*100:.1f}%, {results.service_level['ci_high']*100:.1f}%] | "
+                        f"ASA: {results.average_wait_time['mean']:.1f}s | {results.wall_time_seconds:.2f}s")
+            return results
+
+        except Exception as e:
+            logger.error(f"❌ Error en simulación: {e}")
+            raise
+
+    @staticmethod
+    def _confidence_interval(values: List[float], confidence_level: float,
+                             lower: Optional[float] = None, upper: Optional[float] = None) -> Dict:
+        """Media, desviación e intervalo de confianza t de Student (recortado al rango válido)"""
+        values = np.asarray(values, dtype=float)
+        mean = float(values.mean()) if values.size else 0.0
+        if values.size < 2:
+            return {'mean': mean, 'std': 0.0, 'ci_low': mean, 'ci_high': mean}
+
+        std = float(values.std(ddof=1))
+        half_width = float(stats.t.ppf((1 + confidence_level) / 2, values.size - 1) * std / math.sqrt(values.size))
+        ci_low, ci_high = mean - half_width, mean + half_width
+        if lower is not None:
+            ci_low = max(lower, ci_low)
+        if upper is not None:
+            ci_high = min(upper, ci_high)
+        return {'mean': mean, 'std': std, 'ci_low': ci_low, 'ci_high': ci_high}
+
+# Instancia global
+simulation_engine = SimulationEngine()
+
+def test_simulation_engine():
+    """Función de testing del motor de simulación"""
+    print("🧪 Iniciando test de Simulation Engine...")
+
+    # Perfil de ejemplo: 450 llamadas/hora entre 8h y 20h
+    calls = [0] * 8 + [450] * 12 + [0] * 4
+    inputs = SimulationInputs(
+        calls_per_interval=calls,
+        aht_per_interval=[240] * 24,
+        agents=37,
+        answer_time_target=20,
+        num_replications=8
+    )
+
+    try:
+        results = simulation_engine.run(inputs)
+        print("✅ Test completado exitosamente")
+        for key, value in results.to_dict().items():
+            print(f"   {key}: {value}")
+        return True
+
+    except Exception as e:
+        print(f"❌ Test fallido: {e}")
+        logger.error(f"❌ Test fallido: {e}")
+        return False
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(name)s:%(message)s')
+    test_simulation_engine()
@@ -27,6 +27,7 @@ logger = logging.getLogger(__name__)
 class CallCenterApp:
     def __init__(self):
         self.current_user = None
+        self.prefetcher = None      # Consultas del dashboard lanzadas tras el login
         self.modo_operacion = None  # 'existente' o 'nueva'
         self.tipo_analisis = None   # 'basico', 'intermedio', 'avanzado'
         
@@ -277,6 +278,7 @@ class CallCenterApp:
             success, message = auth_manager.authenticate(password)
             if success:
                 self.current_user = "authenticated"
+                self.start_prefetch()
                 self.show_mode_selection()
             else:
                 self.show_error(message)
@@ -284,6 +286,16 @@ class CallCenterApp:
             logger.error(f"Error en autenticación: {e}")
             self.show_error("❌ Error en el sistema de autenticación")
 
+    def start_prefetch(self):
+        """Lanzar en paralelo las consultas del dashboard mientras se elige el modo"""
+        try:
+            from data.prefetch import DashboardPrefetcher, prefetch_enabled
+            if prefetch_enabled():
+                self.prefetcher = DashboardPrefetcher().start()
+        except Exception as e:
+            # La precarga es una optimización: el dashboard consulta por su cuenta si falla
+            logger.warning(f"No se pudo iniciar la precarga: {e}")
+
     def show_error(self, message):
         """Mostrar mensaje de error"""
         # Crear SnackBar para mostrar error
@@ -732,5 +744,13 @@ if __name__ == "__main__":
     # Crear directorios necesarios
     Path("logs").mkdir(exist_ok=True)
     
+    # Mapear tablas Erlang precalculadas (solo lectura, compartidas entre procesos)
+    from engines.erlang_tables import staffing_tables
+    staffing_tables.preload()
+    
+    # Abrir la conexión de la fuente de datos en segundo plano mientras se muestra el login
+    from data.data_sources import get_data_source
+    get_data_source().warm_up()
+    
     logger.info("Iniciando Call Center Dimensioner con Flet...")
     ft.app(target=main, view=ft.WEB_BROWSER, port=8502)
\ No newline at end of file
@@ -23,6 +23,14 @@ if __name__ == "__main__":
     # Crear directorios necesarios
     Path("logs").mkdir(exist_ok=True)
     
+    # Mapear tablas Erlang precalculadas (solo lectura, compartidas entre procesos)
+    from engines.erlang_tables import staffing_tables
+    staffing_tables.preload()
+    
+    # Abrir la conexión de la fuente de datos en segundo plano mientras se muestra el login
+    from data.data_sources import get_data_source
+    get_data_source().warm_up()
+    
     # Iniciar aplicación web
     ft.app(
         target=main,
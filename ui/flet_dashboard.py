@@ -35,6 +35,7 @@ class MainDashboard:
         self.answer_time_target = 20
         self.shrinkage_pct = 15
         self.date_range_info = None
+        self.campaign_summary = None
         self.analysis_results = None
 
     def show(self):
@@ -255,7 +256,14 @@ class MainDashboard:
                 f"📅 {self.date_range_info.get('fecha_min', '')} → {self.date_range_info.get('fecha_max', '')}",
                 size=10,
                 color="#6c757d"
-            )
+            ),
+            
+            ft.Text(
+                f"📈 Desde {self.campaign_summary.get('fecha_min', '')}: {self.campaign_summary.get('total_llamadas', 0):,} llamadas | "
+                f"TMO {self.campaign_summary.get('tmo_promedio', 0):.0f}s",
+                size=10,
+                color="#6c757d"
+            ) if self.campaign_summary else ft.Container()
         ], spacing=8)
 
     def create_main_content(self):
@@ -848,14 +856,48 @@ class MainDashboard:
             self.show_error(f"❌ Error al generar CSV: {e}")
 
     def load_date_range(self):
-        """Cargar rango de fechas disponibles"""
+        """Cargar rango de fechas disponibles y resumen de campaña"""
         try:
-            from data.sql_connector import sql_connector
-            self.date_range_info = sql_connector.get_available_date_range()
+            from concurrent.futures import ThreadPoolExecutor
+            from functools import partial
+            from data.prefetch import DashboardPrefetcher, prefetch_enabled
             
-            if self.date_range_info:
-                self.start_date = self.date_range_info['fecha_min']
-                self.end_date = self.date_range_info['fecha_max']
+            # Resultados precargados tras el login (se consumen una vez); si no hay,
+            # lanzar la precarga ahora solo si está habilitada
+            prefetcher = getattr(self.app, 'prefetcher', None)
+            self.app.prefetcher = None
+            if prefetcher is None and prefetch_enabled():
+                prefetcher = DashboardPrefetcher().start()
+            
+            if prefetcher is not None:
+                date_range_result = partial(prefetcher.result, 'date_range')
+                summary_result = partial(prefetcher.result, 'summary')
+                executor = None
+            else:
+                # Sin precarga: ambas consultas en paralelo, sin agregados en segundo plano
+                from data.data_sources import get_data_source
+                data_source = get_data_source()
+                executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='dashboard')
+                date_range_future = executor.submit(data_source.get_available_date_range)
+                summary_future = executor.submit(
+                    data_source.get_campaign_summary, int(os.getenv('PREFETCH_SUMMARY_DAYS', '30'))
+                )
+                date_range_result, summary_result = date_range_future.result, summary_future.result
+            
+            try:
+                self.date_range_info = date_range_result()
+                
+                if self.date_range_info:
+                    self.start_date = self.date_range_info['fecha_min']
+                    self.end_date = self.date_range_info['fecha_max']
+                
+                try:
+                    self.campaign_summary = summary_result()
+                except Exception as e:
+                    logger.warning(f"Resumen de campaña no disponible: {e}")
+            finally:
+                if executor is not None:
+                    executor.shutdown(wait=False)
                 
         except Exception as e:
             logger.error(f"Error cargando rango de fechas: {e}")